@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Spectrogram, HRV and baroreflex pipelines for the PhysioNet Autonomic Aging dataset.
+
+Each stage is a module with a `main(argv)`, run through the `aging` command
+(cli.py) or as `python -m aging.<module>`.
+"""
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Baroreflex sensitivity (BRS) with the sequence method.
+
+1. Beat alignment by timestamp: each RR interval [R_k, R_k+1] is paired
+   with the first systolic peak inside it (optionally with the RR interval
+   `lag` beats later); beats without a systolic peak become NaN and break
+   sequences.
+2. Ramp detection: runs of >= `min_beats` beats where SBP and RR change in
+   the same direction on every step (|ΔSBP| >= 1 mmHg, |ΔRR| >= 5 ms by
+   default) are found with run-length logic on the step-sign array.
+3. Per-sequence RR-vs-SBP regression slopes (ms/mmHg) and correlations
+   come from cumulative sums, so every sequence is fitted at once.
+
+Everything is array code (no Python loops over beats or sequences). Whole
+cohorts can be scanned in one call: `scan_cohort` concatenates records
+with NaN separators and splits the result by record.
+"""
+
+import numpy as np
+
+sbp_threshold = 1.0      # mmHg, minimum systolic change per beat
+rr_threshold = 5.0       # ms, minimum RR change per beat
+min_sequence_beats = 3
+min_correlation = 0.8    # sequences with a weaker RR-SBP correlation are rejected
+
+
+# === BEAT ALIGNMENT ===
+def align_beats(rpeak_times, sbp_times, sbp_values, lag=0):
+    """
+    Pair every RR interval (ms) with the systolic peak that falls inside it.
+
+    Returns (beat_times, rr, sbp), one entry per RR interval; sbp is NaN
+    where no systolic peak was found in the interval. With lag > 0 the SBP
+    of beat k is paired with the RR interval k + lag.
+    """
+    r = np.asarray(rpeak_times, dtype=float)
+    sbp_times = np.asarray(sbp_times, dtype=float)
+    sbp_values = np.asarray(sbp_values, dtype=float)
+    rr = np.diff(r) * 1000.0
+    idx = np.searchsorted(sbp_times, r[:-1], side="right")
+    inside = idx < len(sbp_times)
+    inside[inside] &= sbp_times[idx[inside]] < r[1:][inside]
+    sbp = np.full(len(rr), np.nan)
+    sbp[inside] = sbp_values[idx[inside]]
+    if lag:
+        sbp = np.concatenate([np.full(lag, np.nan), sbp[:-lag]])
+    return r[:-1], rr, sbp
+
+
+# === SEQUENCE SCAN ===
+def _runs(step):
+    """Start index, length and value of runs of equal values in a 1-D int array."""
+    if len(step) == 0:
+        empty = np.array([], dtype=int)
+        return empty, empty, empty
+    change = np.flatnonzero(np.diff(step)) + 1
+    starts = np.concatenate([[0], change])
+    lengths = np.diff(np.concatenate([starts, [len(step)]]))
+    return starts, lengths, step[starts]
+
+
+def _ramps(values, threshold, min_beats):
+    """Runs of >= min_beats beats with monotonic steps of at least `threshold` (start, n_beats, sign)."""
+    d = np.diff(values)
+    step = np.where(d >= threshold, 1, np.where(d <= -threshold, -1, 0))
+    starts, lengths, sign = _runs(step)
+    keep = (sign != 0) & (lengths >= min_beats - 1)
+    return starts[keep], lengths[keep] + 1, sign[keep]
+
+
+def scan_sequences(beat_times, rr, sbp, sbp_thr=sbp_threshold, rr_thr=rr_threshold,
+                   min_beats=min_sequence_beats, min_r=min_correlation):
+    """
+    All baroreflex sequences of one aligned beat series.
+
+    Returns a dict of arrays, one entry per accepted sequence: start beat,
+    n_beats, direction (+1 up, -1 down), slope (ms/mmHg), r, t_start, t_end,
+    plus `n_sbp_ramps` (SBP ramps regardless of RR, for the baroreflex
+    effectiveness index).
+    """
+    beat_times = np.asarray(beat_times, dtype=float)
+    rr = np.asarray(rr, dtype=float)
+    sbp = np.asarray(sbp, dtype=float)
+
+    dS, dR = np.diff(sbp), np.diff(rr)
+    up = (dS >= sbp_thr) & (dR >= rr_thr)
+    down = (dS <= -sbp_thr) & (dR <= -rr_thr)
+    starts, lengths, sign = _runs(np.where(up, 1, np.where(down, -1, 0)))
+    keep = (sign != 0) & (lengths >= min_beats - 1)
+    starts, n_beats, sign = starts[keep], lengths[keep] + 1, sign[keep]
+
+    # Least squares of RR on SBP per sequence from cumulative sums over beats
+    x, y = np.nan_to_num(sbp), np.nan_to_num(rr)
+    cs = [np.concatenate([[0.0], np.cumsum(a)]) for a in (x, y, x * x, x * y, y * y)]
+    end = starts + n_beats
+    Sx, Sy, Sxx, Sxy, Syy = (c[end] - c[starts] for c in cs)
+    n = n_beats.astype(float)
+    cov = n * Sxy - Sx * Sy
+    var_x = n * Sxx - Sx * Sx
+    var_y = n * Syy - Sy * Sy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = cov / var_x
+        r = cov / np.sqrt(var_x * var_y)
+    ok = r >= min_r
+
+    n_sbp_ramps = len(_ramps(sbp, sbp_thr, min_beats)[0])
+    last = np.minimum(end - 1, len(beat_times) - 1)
+    return {
+        "start": starts[ok], "n_beats": n_beats[ok], "direction": sign[ok],
+        "slope": slope[ok], "r": r[ok],
+        "t_start": beat_times[starts[ok]] if len(beat_times) else np.array([]),
+        "t_end": beat_times[last[ok]] + rr[last[ok]] / 1000.0 if len(beat_times) else np.array([]),
+        "n_sbp_ramps": n_sbp_ramps,
+    }
+
+
+# === SUMMARIES ===
+def summarize_sequences(seq, edges=None):
+    """
+    BRS summary statistics: mean / median slope overall and per direction,
+    sequence counts, mean r and the baroreflex effectiveness index (BEI =
+    sequences / SBP ramps).
+
+    With `edges` (phase boundaries in s, e.g. the start of deep breathing,
+    Valsalva and tilt), returns one summary per interval [edges[i], edges[i+1]),
+    assigning sequences by their start time.
+    """
+    if edges is not None:
+        phase = np.searchsorted(edges, seq["t_start"], side="right") - 1
+        out = []
+        for i in range(len(edges) - 1):
+            sel = phase == i
+            sub = {k: (v[sel] if isinstance(v, np.ndarray) else v) for k, v in seq.items()}
+            s = summarize_sequences(sub)
+            s.pop("BEI")  # SBP ramps are counted per record, not per phase
+            out.append(s)
+        return out
+
+    slope, direction = seq["slope"], seq["direction"]
+
+    def mean(a):
+        return float(np.mean(a)) if len(a) else np.nan
+
+    return {
+        "BRS_slope": mean(slope),
+        "BRS_median": float(np.median(slope)) if len(slope) else np.nan,
+        "BRS_up": mean(slope[direction > 0]),
+        "BRS_down": mean(slope[direction < 0]),
+        "BRS_r": mean(seq["r"]),
+        "BRS_n_seq": int(len(slope)),
+        "BRS_n_up": int(np.sum(direction > 0)),
+        "BRS_n_down": int(np.sum(direction < 0)),
+        "BEI": len(slope) / seq["n_sbp_ramps"] if seq["n_sbp_ramps"] else np.nan,
+    }
+
+
+def sequence_brs(rpeak_times, sbp_times, sbp_values, lag=0, **kwargs):
+    """Beat alignment + sequence scan + summary for one record."""
+    seq = scan_sequences(*align_beats(rpeak_times, sbp_times, sbp_values, lag), **kwargs)
+    return summarize_sequences(seq), seq
+
+
+def scan_cohort(records, lag=0, **kwargs):
+    """
+    Sequence scan of many records in one vectorized pass.
+
+    `records` maps record ID -> (rpeak_times, sbp_times, sbp_values). Beat
+    series are concatenated with a NaN beat between records (so no sequence
+    spans two records) and the sequences are split back by record.
+    Returns {record ID: sequence dict}.
+    """
+    ids, parts, offsets = list(records), [], [0]
+    for rid in ids:
+        beat_t, rr, sbp = align_beats(*records[rid], lag=lag)
+        parts.append((np.append(beat_t, np.nan), np.append(rr, np.nan), np.append(sbp, np.nan)))
+        offsets.append(offsets[-1] + len(rr) + 1)
+    if not ids:
+        return {}
+    beat_t, rr, sbp = (np.concatenate(a) for a in zip(*parts))
+    seq = scan_sequences(beat_t, rr, sbp, **kwargs)
+
+    ramp_starts = _ramps(sbp, kwargs.get("sbp_thr", sbp_threshold),
+                         kwargs.get("min_beats", min_sequence_beats))[0]
+    # Sequences and ramps are sorted by start beat: record i owns one contiguous slice
+    cut = np.searchsorted(seq["start"], offsets)
+    n_ramps = np.diff(np.searchsorted(ramp_starts, offsets))
+
+    out = {}
+    for i, rid in enumerate(ids):
+        sl = slice(cut[i], cut[i + 1])
+        sub = {k: v[sl] for k, v in seq.items() if isinstance(v, np.ndarray)}
+        sub["start"] = sub["start"] - offsets[i]
+        sub["n_sbp_ramps"] = int(n_ramps[i])
+        out[rid] = sub
+    return out
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Resumable, shardable batch runner for the per-record scripts.
+
+* Deterministic manifest: records are the sorted `.dat` names of the input
+  folder; `--shard i/N` keeps the records whose name hashes (MD5) to
+  shard i, so each record always lands on the same machine no matter how
+  many other records exist.
+* Skip finished work: a record is skipped when all of its outputs exist and
+  are valid (non-empty; PNGs must end with an IEND chunk, which catches
+  files truncated by a crash).
+* Status log: every attempt is appended to a JSON-lines manifest
+  (`manifest-<i>of<N>.jsonl`) with status, attempt, timing, host and error.
+* Retries: failed records are retried up to `--retries` times.
+* Core budget: pooled runs go through scheduler.BudgetExecutor
+  (`--workers` x `--threads` within `--cores`, longest records first).
+* Cohort subsets: `--query` / `--channel` pick records from the cached
+  cohort index (age group, sex, device, channels, length, ...).
+
+    python -m aging.spectrogram_plot --shard 0/4 --workers 8 --retries 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import time
+
+from . import zip_source
+from .scheduler import Budget, BudgetExecutor, plan_budget, longest_first, utilization, timed
+
+
+# === RECORD MANIFEST & SHARDING ===
+def list_records(input_folder, ext=".dat", query=None, channel=None):
+    """
+    Sorted record file names in `input_folder` (deterministic across machines).
+    The folder may be inside the dataset zip; it is then listed from the central directory.
+    With `query` / `channel` the records are selected from the cached cohort
+    index instead (see cohort_index.py), e.g. query="age_group >= 10".
+    """
+    if query or channel:
+        from .cohort_index import load_index
+        return load_index(input_folder).records(query, channel, ext)
+    return sorted(f for f in zip_source.listdir(input_folder) if f.endswith(ext))
+
+
+def parse_shard(text):
+    """'i/N' -> (i, N) with 0 <= i < N; None or '' means no sharding."""
+    if not text:
+        return None
+    try:
+        i, n = (int(v) for v in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {text!r}")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard index must satisfy 0 <= i < N, got {text!r}")
+    return i, n
+
+
+def shard_records(records, shard):
+    """Records assigned to `shard` = (i, N) by a stable hash of the record name."""
+    if shard is None:
+        return list(records)
+    i, n = shard
+    return [r for r in records
+            if int(hashlib.md5(os.path.splitext(r)[0].encode()).hexdigest(), 16) % n == i]
+
+
+def manifest_path(output_folder, shard):
+    name = "manifest.jsonl" if shard is None else f"manifest-{shard[0]}of{shard[1]}.jsonl"
+    return os.path.join(output_folder, name)
+
+
+# === OUTPUT VALIDATION ===
+def output_is_valid(path):
+    """Output exists and is non-empty; PNG files must be complete (end with IEND)."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if size == 0:
+        return False
+    if path.lower().endswith(".png"):
+        with open(path, "rb") as fh:
+            head = fh.read(8)
+            fh.seek(max(size - 12, 0))
+            tail = fh.read(12)
+        return head == b"\x89PNG\r\n\x1a\n" and tail[4:8] == b"IEND"
+    return True
+
+
+# === STATUS MANIFEST ===
+class Manifest:
+    """Append-only JSON-lines log of per-record attempts; the latest entry per record wins."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def entries(self):
+        latest = {}
+        if os.path.exists(self.path):
+            with open(self.path) as fh:
+                for line in fh:
+                    if line.strip():
+                        try:
+                            e = json.loads(line)
+                        except ValueError:
+                            continue  # line cut short by a crash
+                        latest[e["record"]] = e
+        return latest
+
+    def append(self, **entry):
+        entry.setdefault("host", socket.gethostname())
+        entry.setdefault("time", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(entry, default=str) + "\n")
+            fh.flush()
+
+
+# === RUNNER ===
+def _run_round(records, process, budget, cost):
+    """Yield (record, result, error, wall, cpu) per record, on a budgeted pool unless budget is None."""
+    if budget is None:
+        for r in (longest_first(records, cost) if cost else records):
+            yield timed(process, r)
+    else:
+        with BudgetExecutor(budget) as pool:
+            yield from pool.run(process, records, cost)
+
+
+def run_batch(records, process, outputs, manifest, retries=1, n_workers=1, threads=None,
+              cores=None, cost=None, force=False, validate=output_is_valid):
+    """
+    Process every record not already finished and log each attempt.
+
+    `process(record)` does the work (must be a picklable top-level function
+    when run on a pool) and may return a small result (e.g. cache stats);
+    `outputs(record)` lists the files it must produce. A record counts as
+    done when process() returns and all outputs validate.
+
+    n_workers=1 without `threads` runs in-process; otherwise the core budget
+    (`cores`, default all) is split into workers x threads (see
+    scheduler.plan_budget). With `cost(record)` records run longest-first.
+    Returns a summary dict with counts, utilization and {record: result}.
+    """
+    if not isinstance(manifest, Manifest):
+        manifest = Manifest(manifest)
+    todo, skipped = [], 0
+    for r in records:
+        paths = outputs(r)
+        if not force and paths and all(validate(p) for p in paths):
+            skipped += 1
+        else:
+            todo.append(r)
+    print(f"🔧 {len(records)} records: {skipped} already done, {len(todo)} to process.")
+
+    pooled = n_workers != 1 or threads is not None
+    budget = plan_budget(cores, n_workers, threads) if pooled else Budget(1, cores or os.cpu_count() or 1)
+    if pooled:
+        print(f"🧮 Core budget: {budget.workers} workers x {budget.threads} threads")
+
+    results, failed, busy, cpu = {}, [], 0.0, 0.0
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        if not todo:
+            break
+        if attempt > 1:
+            print(f"🔁 Retry {attempt - 1}/{retries} for {len(todo)} failed records")
+        failed = []
+        for record, result, err, wall, cpu_s in _run_round(todo, process, budget if pooled else None, cost):
+            busy += wall
+            cpu += cpu_s
+            if err is None and not all(validate(p) for p in outputs(record)):
+                err = "outputs missing or invalid after processing"
+            manifest.append(record=record, status="ok" if err is None else "failed",
+                            attempt=attempt, seconds=round(wall, 3), cpu_seconds=round(cpu_s, 3),
+                            error=err, outputs=outputs(record))
+            if err is None:
+                results[record] = result
+            else:
+                failed.append(record)
+                print(f"⚠️ {record} failed (attempt {attempt}): {err.splitlines()[0]}")
+        todo = failed
+
+    elapsed = time.perf_counter() - start
+    usage = utilization(budget, elapsed, busy, cpu)
+    print(f"✅ {len(results)} done, {skipped} skipped, {len(failed)} failed in {elapsed:.1f} s")
+    if results or failed:
+        print(f"📈 Utilization: workers busy {usage['worker_occupancy']:.0%}, "
+              f"CPU {usage['cpu_utilization']:.0%} of {budget.cores} cores, "
+              f"{usage['threads_used_per_task']:.2f} threads/task")
+    return {"done": len(results), "skipped": skipped, "failed": failed,
+            "seconds": elapsed, "utilization": usage, "results": results}
+
+
+# === COMMAND LINE ===
+def batch_arguments(description=None, parser=None):
+    """Argument parser with the common batch options (--shard, --workers, --threads, --cores, --retries, --force)."""
+    parser = parser or argparse.ArgumentParser(description=description)
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                        help="process only shard i of N (0-based), e.g. 0/4")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: script default)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="threads per worker for Numba / FFT / BLAS (default: cores / workers)")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="total core budget split into workers x threads (default: all)")
+    parser.add_argument("--retries", type=int, default=1, help="retries per failed record")
+    parser.add_argument("--force", action="store_true", help="re-run records whose outputs exist")
+    parser.add_argument("--query", default=None,
+                        help="cohort index selection, e.g. 'age_group >= 10 and device == 1'")
+    parser.add_argument("--channel", default=None,
+                        help="only records with a channel whose name contains this, e.g. BP")
+    return parser
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible throughput benchmark of the pipeline stages.
+
+A synthetic cohort (synthetic_cohort.py) is generated, or reused when it
+already exists. Each stage is then timed on every record:
+
+    read        read_dat_file (all channels, physical units)
+    normalize   in-place z-score (normalization.zscore)
+    filter      ECG / BP zero-phase band-pass (filter_bank.filter_channels)
+    stft        normalized spectrograms of all channels (spectrogram_plot)
+    features    feature_exytraction.signal_features (filter + QRS + HRV + BP + BRS)
+    render      annotated spectrogram PNG from a cached template (raster_render)
+
+Only the stage's own work is timed; its inputs are prepared beforehand.
+Every stage runs in a fresh spawned process, with threads capped at
+`--threads` (scheduler.thread_env). One record is processed untimed first
+to exclude JIT compilation, FFT plans and backend probes. Stage time is
+the best of `--repeat` passes. The process peak RSS is that stage's
+footprint.
+
+Each run is saved as JSON (RESULTS/benchmarks/run-<time>.json):
+- per stage: seconds, records/s, Msamples/s and peak RSS;
+- the cohort spec;
+- the machine / library fingerprint and the git commit.
+
+It is compared against `baseline.json`. A stage is flagged when it is
+`--tolerance` slower (and by at least `--min-delta` seconds) or
+`--rss-tolerance` heavier, and the exit code is
+then 1, so the check also works as a local pre-merge gate.
+
+    aging benchmark                                  # run + compare with the baseline
+    aging benchmark --save-baseline                  # accept this run as the new baseline
+    aging benchmark --records 50 --duration 1800 --stages read stft
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from . import config
+from .synthetic_cohort import make_cohort
+from .scheduler import thread_env
+
+# === CONFIG ===
+bench_folder = config.results("benchmarks")
+cohort_folder = os.path.join(bench_folder, "cohort")
+baseline_path = os.path.join(bench_folder, "baseline.json")
+STAGES = ("read", "normalize", "filter", "stft", "features", "render")
+default_records = 12
+default_duration_s = 300.0
+default_repeat = 3
+default_tolerance = 0.15        # slower by more than this fraction = regression
+default_rss_tolerance = 0.25    # peak RSS higher by more than this fraction = regression
+default_min_delta_s = 0.05      # ... and slower by at least this much (timer noise floor of tiny stages)
+
+
+# === STAGES (run inside the child process) ===
+def _read(path):
+    from .wfdb_reader import read_dat_file
+    return read_dat_file(path)
+
+
+def _stage_read(path, out_dir):
+    t = time.perf_counter()
+    _read(path)
+    return time.perf_counter() - t
+
+
+def _stage_normalize(path, out_dir):
+    from .normalization import zscore
+    data, _ = _read(path)
+    t = time.perf_counter()
+    zscore(data, out=data)
+    return time.perf_counter() - t
+
+
+def _stage_filter(path, out_dir):
+    from .filter_bank import ECG_BAND, BP_BAND, filter_channels
+    data, fs = _read(path)
+    t = time.perf_counter()
+    filter_channels(data[:, :2], fs, [ECG_BAND, BP_BAND])
+    return time.perf_counter() - t
+
+
+def _stage_stft(path, out_dir):
+    from .normalization import zscore
+    from .spectrogram_plot import compute_spectrograms
+    data, fs = _read(path)
+    zscore(data, out=data)
+    t = time.perf_counter()
+    compute_spectrograms(data, fs)
+    return time.perf_counter() - t
+
+
+def _stage_features(path, out_dir):
+    from .feature_exytraction import load_record, signal_features
+    folder, name = os.path.split(os.path.splitext(path)[0])
+    ecg, bp, fs = load_record(name, folder)
+    t = time.perf_counter()
+    signal_features(ecg, bp, fs)
+    return time.perf_counter() - t
+
+
+def _stage_render(path, out_dir):
+    from .normalization import zscore
+    from .spectrogram_plot import compute_spectrograms
+    from .raster_render import render_template
+    data, fs = _read(path)
+    spectra = compute_spectrograms(zscore(data, out=data), fs)
+    out = os.path.join(out_dir, os.path.basename(path) + ".png")
+    t = time.perf_counter()
+    render_template(spectra, out, f"Spectrograms - {os.path.basename(path)}", cmap="hsv", dpi=100,
+                    xlabel="Time [sec]", cbar_label="Power/Frequency (dB/Hz)")
+    return time.perf_counter() - t
+
+
+STAGE_FUNCS = {"read": _stage_read, "normalize": _stage_normalize, "filter": _stage_filter,
+               "stft": _stage_stft, "features": _stage_features, "render": _stage_render}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (None when it cannot be measured)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024   # bytes on macOS, KiB elsewhere
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 ** 2
+    except ImportError:
+        return None
+
+
+def run_stage(stage, paths, repeat=default_repeat):
+    """Child-process entry: warm up on one record, then best-of-`repeat` total seconds over all records."""
+    import contextlib
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    func = STAGE_FUNCS[stage]
+    with tempfile.TemporaryDirectory() as out_dir, contextlib.redirect_stdout(io.StringIO()):
+        func(paths[0], out_dir)
+        passes = [sum(func(p, out_dir) for p in paths) for _ in range(repeat)]
+    return {"seconds": min(passes), "seconds_all": passes, "peak_rss_mb": peak_rss_mb()}
+
+
+# === RUN ===
+def fingerprint():
+    import numpy
+    import scipy
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {"machine": platform.machine(), "processor": platform.processor() or platform.node(),
+            "cpus": os.cpu_count(), "python": platform.python_version(), "numpy": numpy.__version__,
+            "scipy": scipy.__version__, "numba": numba_version}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(stages=STAGES, n_records=default_records, duration_s=default_duration_s, fs=1000.0,
+                  n_channels=3, seed=0, repeat=default_repeat, threads=1, folder=cohort_folder):
+    """Generate / reuse the cohort and time every stage in its own process; returns the run dict."""
+    files = make_cohort(folder, n_records, duration_s, fs, n_channels, seed)
+    paths = [os.path.join(folder, f) for f in files]
+    n_samples = n_records * int(round(duration_s * fs))
+    run = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "fingerprint": fingerprint(),
+           "cohort": {"n_records": n_records, "duration_s": duration_s, "fs": fs, "n_channels": n_channels,
+                      "seed": seed},
+           "threads": threads, "repeat": repeat, "stages": {}}
+
+    saved = {k: os.environ.get(k) for k in thread_env(threads)}
+    os.environ.update(thread_env(threads))
+    try:
+        for stage in stages:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                res = pool.submit(run_stage, stage, paths, repeat).result()
+            res["records_per_s"] = n_records / res["seconds"] if res["seconds"] else None
+            res["msamples_per_s"] = n_samples / 1e6 / res["seconds"] if res["seconds"] else None
+            res["realtime_x"] = n_records * duration_s / res["seconds"] if res["seconds"] else None
+            run["stages"][stage] = res
+            rss = f"{res['peak_rss_mb']:.0f} MB" if res["peak_rss_mb"] is not None else "n/a"
+            print(f"⏱ {stage:10s} {res['seconds']:8.3f} s  {res['records_per_s']:8.1f} rec/s  "
+                  f"{res['msamples_per_s']:8.1f} MS/s  peak RSS {rss}")
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return run
+
+
+# === BASELINES ===
+def save_run(run, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as fh:
+        json.dump(run, fh, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def load_run(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(run, baseline, tolerance=default_tolerance, rss_tolerance=default_rss_tolerance,
+            min_delta_s=default_min_delta_s):
+    """
+    Per-stage comparison rows: time and RSS ratios against the baseline,
+    flagged beyond the tolerances. Also lists why the runs may not be
+    comparable (different cohort, machine or settings).
+    """
+    caveats = [k for k in ("cohort", "fingerprint", "threads") if run.get(k) != baseline.get(k)]
+    rows = []
+    for stage, cur in run["stages"].items():
+        ref = baseline.get("stages", {}).get(stage)
+        if ref is None:
+            continue
+        ratio = cur["seconds"] / ref["seconds"] if ref["seconds"] else None
+        rss_ratio = (cur["peak_rss_mb"] / ref["peak_rss_mb"]
+                     if cur.get("peak_rss_mb") and ref.get("peak_rss_mb") else None)
+        rows.append({"stage": stage, "seconds": cur["seconds"], "baseline_seconds": ref["seconds"],
+                     "time_ratio": ratio, "rss_ratio": rss_ratio,
+                     "slower": (ratio is not None and ratio > 1 + tolerance
+                                and cur["seconds"] - ref["seconds"] >= min_delta_s),
+                     "heavier": rss_ratio is not None and rss_ratio > 1 + rss_tolerance})
+    return rows, caveats
+
+
+def print_comparison(rows, caveats, baseline):
+    print(f"📊 Against baseline {baseline.get('time')} (commit {baseline.get('commit')}):")
+    if caveats:
+        print(f"⚠️ Baseline differs in {', '.join(caveats)}: ratios are indicative only")
+    for r in rows:
+        flag = "❌" if r["slower"] or r["heavier"] else "✅"
+        rss = f"RSS x{r['rss_ratio']:.2f}" if r["rss_ratio"] is not None else "RSS n/a"
+        print(f"  {flag} {r['stage']:10s} {r['seconds']:8.3f} s vs {r['baseline_seconds']:8.3f} s  "
+              f"(x{r['time_ratio']:.2f}, {rss})")
+
+
+# === MAIN ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic cohort")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--records", type=int, default=default_records)
+    parser.add_argument("--duration", type=float, default=default_duration_s, help="seconds per record")
+    parser.add_argument("--fs", type=float, default=1000.0)
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=default_repeat)
+    parser.add_argument("--threads", type=int, default=1, help="thread cap per stage process")
+    parser.add_argument("--cohort", default=cohort_folder, help="synthetic cohort folder (reused if present)")
+    parser.add_argument("--baseline", default=baseline_path)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=default_tolerance)
+    parser.add_argument("--rss-tolerance", type=float, default=default_rss_tolerance)
+    parser.add_argument("--min-delta", type=float, default=default_min_delta_s,
+                        help="smallest slowdown in seconds that counts as a regression")
+    args = parser.parse_args(argv)
+
+    run = run_benchmark(args.stages, args.records, args.duration, args.fs, args.channels, args.seed,
+                        args.repeat, args.threads, args.cohort)
+    out = os.path.join(bench_folder, f"run-{run['time'].replace(':', '').replace('-', '')}.json")
+    save_run(run, out)
+    print(f"✅ Saved benchmark run: {out}")
+
+    baseline = load_run(args.baseline)
+    regressions = []
+    if baseline is not None:
+        rows, caveats = compare(run, baseline, args.tolerance, args.rss_tolerance, args.min_delta)
+        print_comparison(rows, caveats, baseline)
+        regressions = [r["stage"] for r in rows if r["slower"] or r["heavier"]]
+    else:
+        print(f"ℹ️ No baseline at {args.baseline} (use --save-baseline)")
+    if args.save_baseline:
+        save_run(run, args.baseline)
+        print(f"✅ Saved baseline: {args.baseline}")
+    elif regressions:
+        print(f"❌ Regressions in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Persisted, queryable index of the cohort: subject-info.csv joined with every
+record header.
+
+One row per record, with these columns:
+- ID, age_group, age_min, age_max, sex, bmi, length, device (from subject-info.csv)
+- fs, n_sig, sig_names, n_samples, duration_s, dat_bytes (from the .hea / .dat files)
+
+The index is saved as JSON, one file per data folder, under
+`<results>/cohort_index/`. It is reused without touching the data folder
+while the folder listing (or zip archive) and subject-info.csv are
+unchanged. When they change, the rebuild is incremental: only headers
+whose size/mtime (or zip CRC) changed are parsed again.
+
+    index = load_index(config.data_folder)
+    index.records("age_group >= 10", channel="BP")     # 60+ with a BP channel
+    index.select("device == 1 and duration_s > 1200")
+
+Queries use DataFrame.query syntax; `channel` matches a substring of the
+channel names, case-insensitively.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from . import zip_source
+from .wfdb_reader import read_header
+
+INDEX_VERSION = 1
+index_folder = os.path.join(config.results_folder, "cohort_index")
+subject_info_name = "subject-info.csv"
+
+# Age_group code -> (min, max) age in years, as documented for the dataset
+AGE_GROUPS = {1: (18, 19), 2: (20, 24), 3: (25, 29), 4: (30, 34), 5: (35, 39), 6: (40, 44),
+              7: (45, 49), 8: (50, 54), 9: (55, 59), 10: (60, 64), 11: (65, 69), 12: (70, 74),
+              13: (75, 79), 14: (80, 84), 15: (85, 92)}
+
+SUBJECT_COLUMNS = {"Age_group": "age_group", "Sex": "sex", "BMI": "bmi", "Length": "length",
+                   "Device": "device"}
+
+
+# === SUBJECT METADATA ===
+def normalize_ids(ids):
+    """'1', 1, 1.0 -> '0001' (vectorized)."""
+    return pd.to_numeric(pd.Series(ids), errors="raise").astype(np.int64).astype(str).str.zfill(4)
+
+
+def read_subject_info(path):
+    """subject-info.csv (loose or inside the zip) with zero-padded string IDs."""
+    with zip_source.open_file(path) as fh:
+        metadata = pd.read_csv(fh)
+    metadata["ID"] = normalize_ids(metadata["ID"]).values
+    return metadata
+
+
+# === PER-RECORD ENTRIES ===
+def header_entry(folder, name):
+    """Index fields of record `name` (file base name) read from its header."""
+    base = os.path.join(folder, name)
+    header = read_header(base)
+    dat_files = sorted({s.file_name for s in header.signals})
+    dat_bytes = 0
+    for f in dat_files:
+        path = os.path.join(folder, f)
+        dat_bytes += zip_source.getsize(path) if zip_source.exists(path) else 0
+    return {
+        "record": name,
+        "fs": header.fs,
+        "n_sig": header.n_sig,
+        "sig_names": ";".join(header.sig_name),
+        "n_samples": header.n_samples,
+        "duration_s": header.n_samples / header.fs if header.n_samples >= 0 else np.nan,
+        "dat_files": dat_files,
+        "dat_bytes": dat_bytes,
+    }
+
+
+def record_stamp(folder, entry_or_name):
+    """Stamps of a record's header and data files (detects in-place changes)."""
+    if isinstance(entry_or_name, dict):
+        name, dat_files = entry_or_name["record"], entry_or_name["dat_files"]
+    else:
+        name, dat_files = entry_or_name, [entry_or_name + ".dat"]
+    files = [name + ".hea"] + list(dat_files)
+    return [zip_source.stamp(os.path.join(folder, f)) for f in files]
+
+
+# === INDEX ===
+class CohortIndex:
+    """Cohort table with query helpers; `frame` is the underlying DataFrame."""
+
+    def __init__(self, frame, folder):
+        self.frame = frame
+        self.folder = folder
+
+    def __len__(self):
+        return len(self.frame)
+
+    def select(self, query=None, channel=None):
+        df = self.frame
+        if query:
+            df = df.query(query)
+        if channel:
+            df = df[df["sig_names"].str.contains(channel, case=False, regex=False)]
+        return df
+
+    def records(self, query=None, channel=None, ext=".dat"):
+        """Sorted record file names matching the selection (drop-in for batch_runner.list_records)."""
+        return sorted(r + ext for r in self.select(query, channel)["record"])
+
+    def ids(self, query=None, channel=None):
+        return self.select(query, channel)["ID"].tolist()
+
+
+def index_path(folder):
+    key = hashlib.sha1(os.path.abspath(folder).encode()).hexdigest()[:12]
+    return os.path.join(index_folder, f"{key}.json")
+
+
+def _folder_state(folder):
+    return {"folder": os.path.abspath(folder), "listing": zip_source.folder_stamp(folder),
+            "subject_info": zip_source.stamp(os.path.join(folder, subject_info_name)),
+            "version": INDEX_VERSION}
+
+
+def _load_saved(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _save(path, saved):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(saved, fh)
+    os.replace(tmp, path)
+
+
+def build_index(folder, saved=None):
+    """
+    Entries for every record header in `folder`, reusing the entries of
+    `saved` whose file stamps are unchanged. Returns (entries, n_parsed).
+    """
+    previous = {e["record"]: e for e in (saved or {}).get("entries", [])}
+    entries, parsed = [], 0
+    for fname in sorted(zip_source.listdir(folder)):
+        if not fname.endswith(".hea"):
+            continue
+        name = fname[:-4]
+        old = previous.get(name)
+        if old is not None and old["stamp"] == record_stamp(folder, old):
+            entries.append(old)
+            continue
+        try:
+            entry = header_entry(folder, name)
+        except (ValueError, NotImplementedError, OSError, IndexError) as e:
+            print(f"⚠️ cohort index: skipping {fname}: {e}")
+            continue
+        entry["stamp"] = record_stamp(folder, entry)
+        entries.append(entry)
+        parsed += 1
+    return entries, parsed
+
+
+def _frame(folder, entries):
+    records = pd.DataFrame(entries, columns=["record", "fs", "n_sig", "sig_names", "n_samples",
+                                             "duration_s", "dat_bytes"])
+    records["ID"] = records["record"]
+    if records["record"].str.fullmatch(r"\d+").all():
+        records["ID"] = normalize_ids(records["record"]).values
+
+    meta_path = os.path.join(folder, subject_info_name)
+    if zip_source.exists(meta_path):
+        meta = read_subject_info(meta_path).rename(columns=SUBJECT_COLUMNS)
+        records = records.merge(meta, on="ID", how="left")
+    for col in SUBJECT_COLUMNS.values():
+        if col not in records:
+            records[col] = np.nan
+    groups = records["age_group"]
+    records["age_min"] = groups.map(lambda g: AGE_GROUPS.get(g, (np.nan, np.nan))[0])
+    records["age_max"] = groups.map(lambda g: AGE_GROUPS.get(g, (np.nan, np.nan))[1])
+    first = ["ID", "record", "age_group", "age_min", "age_max", "sex", "bmi", "length", "device"]
+    return records[first + [c for c in records.columns if c not in first]]
+
+
+def load_index(folder=config.data_folder, refresh=False, path=None):
+    """
+    Cohort index of `folder`, from the saved JSON when still valid.
+
+    The saved index is trusted as long as the folder listing and
+    subject-info.csv stamps match (no per-record work at all). Otherwise, or
+    with `refresh=True` (which also catches files modified in place), it is
+    rebuilt incrementally and saved again.
+    """
+    path = path or index_path(folder)
+    saved = _load_saved(path)
+    state = _folder_state(folder)
+    if not refresh and saved is not None and saved.get("state") == state:
+        return CohortIndex(_frame(folder, saved["entries"]), folder)
+
+    if saved is not None and saved.get("state", {}).get("version") != INDEX_VERSION:
+        saved = None
+    entries, parsed = build_index(folder, saved)
+    _save(path, {"state": state, "entries": entries})
+    print(f"🗂 Cohort index: {len(entries)} records ({parsed} headers parsed) -> {path}")
+    return CohortIndex(_frame(folder, entries), folder)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build / query the cohort index")
+    parser.add_argument("--data", default=config.data_folder)
+    parser.add_argument("--query", default=None, help="DataFrame.query expression, e.g. 'age_group >= 10'")
+    parser.add_argument("--channel", default=None, help="keep records with a matching channel name")
+    parser.add_argument("--refresh", action="store_true", help="re-check every record file")
+    args = parser.parse_args(argv)
+    selection = load_index(args.data, args.refresh).select(args.query, args.channel)
+    print(selection.to_string(index=False, max_rows=40))
+    print(f"{len(selection)} records selected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Shared paths of the pipelines.
+
+Each path can be overridden from the environment. The `aging` CLI sets
+these from its --project / --data / --results / --features options before
+it imports a stage, and spawned worker processes inherit them:
+
+    AA_PROJECT_ROOT   project folder holding DATASETS/ and RESULTS/
+                      (default: the working directory; the original
+                      workstation path on Windows)
+    AA_DATA           record folder (may point inside the dataset zip)
+    AA_RESULTS        root of the figure / export folders
+    AA_FEATURES       folder of the feature tables (default: working directory)
+
+Importing this module only reads the environment. Folders are created by the
+stage that writes into them, when it runs.
+"""
+
+import os
+
+windows_project_root = \
+    "C:/research_work_DIMAAG_AI_SSE/work_progress_reports/work_report_2025_2026/my_projects/AUTOMATIC_AGING"
+# A drive-letter path elsewhere is a relative folder named "C:" in the working directory
+project_root = os.environ.get("AA_PROJECT_ROOT") or (windows_project_root if os.name == "nt" else os.getcwd())
+datasets_folder = os.path.join(project_root, "DATASETS")
+data_folder = os.environ.get("AA_DATA", os.path.join(datasets_folder, "AA_DATASETS"))
+results_folder = os.environ.get("AA_RESULTS", os.path.join(project_root, "RESULTS"))
+features_folder = os.environ.get("AA_FEATURES", "")
+
+
+def results(name):
+    """Output folder `name` under the results root."""
+    return os.path.join(results_folder, name)
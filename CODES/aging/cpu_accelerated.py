@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 19:17:43 2025
+
+@author: SREEKANTHVS
+"""
+
+import os
+import numpy as np
+
+from . import config
+from .normalization import zscore
+from .wfdb_reader import read_dat_file, open_record, read_header, has_header
+from .spectrogram_store import SpectrogramStore, compact_dead_fraction
+from .raster_render import render_raster, render_template
+from .spectrogram_cache import worker_cache, stats_delta, merge_stats
+from .spectrogram_engine import (spectrogram, spectrogram_freqs, band_spectrogram, batch_spectrogram,
+                                iter_record_blocks, iter_spectrogram,
+                                iter_normalized_spectrogram, collect)
+from .batch_runner import (list_records, shard_records, manifest_path, run_batch,
+                          batch_arguments)
+from .scheduler import record_cost
+
+# === CONFIGURATION ===
+input_folder = config.data_folder
+output_folder = config.results("filtered_spectrograms")
+stream_block_size = 1_000_000  # samples per block when streaming from disk (None = load whole record)
+band_bins = None  # e.g. 64: evaluate 1–2 Hz directly at this many bins instead of FFT-then-mask
+cache_folder = os.path.join(output_folder, "spectrogram_cache")
+cache_max_bytes = 2 * 1024 ** 3  # size bound of the spectrogram cache (None = no cache)
+export_folder = os.path.join(output_folder, "spectrogram_store_1to2Hz")  # own store: full-band spectra live next door
+export_dtype = "float32"  # chunked dataset export: "float32", "float16" or None (PNG only)
+render_mode = "template"  # "template" (cached annotated figure), "raster" (LUT -> PNG) or "matplotlib"
+
+# === FAST SIGNAL NORMALIZATION ===
+def normalize_signal_numba(data):
+    """Normalize each channel (zero mean, unit variance) in place with the fused Numba kernels."""
+    return zscore(data, out=data)
+
+
+# === COMPUTE NORMALIZED PSD SPECTROGRAM (1–2 Hz FILTERED) ===
+def compute_normalized_spectrogram(data, fs=1000, nperseg=1024, band_bins=band_bins):
+    """
+    With `band_bins` set, only `band_bins` frequencies in 1–2 Hz are evaluated
+    (band-limited DFT bank) and each column is normalized over that band.
+    """
+    if band_bins:
+        f, t, Sxx = band_spectrogram(data, fs, nperseg, nperseg // 2, band=(1.0, 2.0), n_bins=band_bins)
+        return f, t, Sxx / (np.sum(Sxx, axis=0, keepdims=True) + 1e-12)
+
+    f, t, Sxx = spectrogram(data, fs, nperseg, nperseg // 2)
+
+    # Normalize Power Spectral Density
+    Sxx_sum = np.sum(Sxx, axis=0, keepdims=True) + 1e-12
+    Sxx_norm = Sxx / Sxx_sum
+
+    # Frequency-domain filtering: retain only 1–2 Hz
+    freq_mask = (f >= 1.0) & (f <= 2.0)
+    return f[freq_mask], t, Sxx_norm[freq_mask, :]
+
+
+# === BATCHED VARIANT (ALL CHANNELS / RECORDS IN ONE CALL) ===
+def compute_normalized_spectrograms(signals, fs=1000, nperseg=1024, band_bins=band_bins):
+    """
+    Batched compute_normalized_spectrogram: `signals` is a (batch, samples)
+    array or a list of 1-D arrays. Returns a list of (f, t, Sxx) in input order.
+    """
+    band = (1.0, 2.0) if band_bins else None
+    f, times, spectra = batch_spectrogram(signals, fs, nperseg, nperseg // 2, band=band, n_bins=band_bins)
+    freq_mask = np.ones(len(f), dtype=bool) if band_bins else (f >= 1.0) & (f <= 2.0)
+    out = []
+    for t, Sxx in zip(times, spectra):
+        if band_bins:
+            Sxx_norm = Sxx / (np.sum(Sxx, axis=0, keepdims=True) + 1e-12)
+        else:
+            Sxx_norm = Sxx[freq_mask] / (np.sum(Sxx, axis=0, keepdims=True) + 1e-12)
+        out.append((f[freq_mask], t, Sxx_norm))
+    return out
+
+
+# === STREAMING VARIANT (BOUNDED MEMORY) ===
+def compute_normalized_spectrogram_stream(record, channel, nperseg=1024, block_size=stream_block_size,
+                                          band_bins=band_bins):
+    """
+    Same output as compute_normalized_spectrogram, but reads `channel` of a
+    LazyRecord block by block. Per-record z-scoring is skipped: the constant
+    detrend removes the mean and per-column normalization cancels the scale.
+    """
+    band = (1.0, 2.0) if band_bins else None
+    f = spectrogram_freqs(record.fs, nperseg, band, band_bins)
+    blocks = iter_record_blocks(record, channel, block_size)
+    columns = iter_spectrogram(blocks, record.fs, nperseg, nperseg // 2, band=band, n_bins=band_bins)
+    if band_bins:
+        t, Sxx = collect(iter_normalized_spectrogram(columns, f))
+        return f, t, Sxx
+    t, Sxx_filtered = collect(iter_normalized_spectrogram(columns, f, 1.0, 2.0))
+    freq_mask = (f >= 1.0) & (f <= 2.0)
+    return f[freq_mask], t, Sxx_filtered
+
+
+# === MULTI-CHANNEL PLOTTER ===
+def plot_and_save_spectrograms(data, fs, filename):
+    channels = data.T if data.ndim > 1 else data[None, :]
+    save_spectrogram_figure(compute_normalized_spectrograms(channels, fs), filename)
+
+
+def figure_path(filename):
+    return os.path.join(output_folder, f"{os.path.splitext(filename)[0]}_spectrogram_1to2Hz_cpu.png")
+
+
+def save_spectrogram_figure(spectra, filename):
+    """Render precomputed (f, t, Sxx) per channel into one PNG."""
+    out_path = figure_path(filename)
+    title = f"Normalized 1–2 Hz Spectrograms — {filename}"
+    if render_mode == "raster":
+        render_raster(spectra, out_path, cmap='viridis')
+        print(f"✅ Saved spectrogram plot: {out_path}")
+        return
+    if render_mode == "template":
+        render_template(spectra, out_path, title, cmap='viridis', dpi=150, figsize_per_channel=(10, 3.5),
+                        cbar_label='Normalized Power (dB)', rect=(0, 0, 1, 0.95))
+        print(f"✅ Saved spectrogram plot: {out_path}")
+        return
+
+    import matplotlib.pyplot as plt
+    n_channels = len(spectra)
+    fig, axes = plt.subplots(n_channels, 1, figsize=(10, 3.5 * n_channels), sharex=True)
+
+    if n_channels == 1:
+        axes = [axes]
+
+    for ch, (f, t, Sxx_filtered) in enumerate(spectra):
+        im = axes[ch].pcolormesh(t, f, 10 * np.log10(Sxx_filtered + 1e-12),
+                                 shading='gouraud', cmap='viridis')
+        axes[ch].set_ylabel("Freq [Hz]")
+        axes[ch].set_title(f"Channel {ch + 1}")
+        fig.colorbar(im, ax=axes[ch], orientation='vertical', label='Normalized Power (dB)')
+
+    axes[-1].set_xlabel("Time [s]")
+    fig.suptitle(title, fontsize=14)
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+
+    plt.savefig(out_path, dpi=150)
+    plt.close()
+    print(f"✅ Saved spectrogram plot: {out_path}")
+
+
+# === PER-RECORD SPECTRA (CACHED) ===
+def spectrogram_params(fs, nperseg=1024):
+    """Everything besides the record contents that changes the cached spectra."""
+    return {"pipeline": "cpu_1to2Hz", "fs": fs, "nperseg": nperseg, "noverlap": nperseg // 2,
+            "window": ["tukey", 0.25], "band": [1.0, 2.0], "band_bins": band_bins,
+            "normalization": "column_sum"}
+
+
+def compute_record_spectra(path):
+    """Normalized 1–2 Hz spectra of every channel of a record, streamed from disk when possible."""
+    if stream_block_size and has_header(os.path.splitext(path)[0]):
+        try:
+            record = open_record(path)
+            return [compute_normalized_spectrogram_stream(record, ch)
+                    for ch in range(record.n_channels)]
+        except NotImplementedError as e:
+            print(f"  -> streaming unavailable ({e}), loading whole record")
+    data, fs = read_dat_file(path)
+    data = normalize_signal_numba(data)
+    return compute_normalized_spectrograms(data.T, fs)
+
+
+def record_spectra(path, cache=None):
+    """compute_record_spectra, served from `cache` when the record + parameters were seen before."""
+    base = os.path.splitext(path)[0]
+    if cache is None or not has_header(base):
+        return compute_record_spectra(path)
+    params = spectrogram_params(read_header(base).fs)
+    return cache.get_or_compute(path, params, lambda: compute_record_spectra(path))
+
+
+def _get_cache():
+    """This process's spectrogram cache (None when caching is off), shared by all its records."""
+    return worker_cache(cache_folder, cache_max_bytes) if cache_max_bytes else None
+
+
+def process_file(file):
+    """
+    Spectra (cached) -> store export -> PNG for one record; the PNG is written
+    last. Returns this record's cache hit / miss counts.
+    """
+    path = os.path.join(input_folder, file)
+    print(f"\nProcessing {file}...")
+    cache = _get_cache()
+    before = cache.stats() if cache is not None else None
+    spectra = record_spectra(path, cache)
+    if export_dtype:
+        SpectrogramStore(export_folder, export_dtype).append_record(os.path.splitext(file)[0], spectra)
+    save_spectrogram_figure(spectra, file)
+    return stats_delta(cache.stats(), before) if cache is not None else {}
+
+
+# === MAIN LOOP (PARALLELIZED) ===
+def main(argv=None):
+    args = batch_arguments("Normalized 1–2 Hz spectrograms of every record").parse_args(argv)
+    dat_files = shard_records(list_records(input_folder, query=args.query, channel=args.channel),
+                              args.shard)
+
+    if not dat_files:
+        print(f"No .dat files found in '{input_folder}'.")
+        return
+    print(f"🔧 Found {len(dat_files)} files. Processing in parallel on CPU cores...")
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Core budget = workers x threads (default: one single-threaded worker per core),
+    # longest records first
+    summary = run_batch(dat_files, process_file, lambda f: [figure_path(f)],
+                        manifest_path(output_folder, args.shard), retries=args.retries,
+                        n_workers=args.workers, threads=args.threads, cores=args.cores,
+                        cost=lambda f: record_cost(os.path.join(input_folder, f)), force=args.force)
+    if cache_max_bytes and summary["results"]:
+        print(f"📦 Spectrogram cache: {merge_stats(summary['results'].values())}")
+    if export_dtype and args.shard is None:
+        # Sharded runs may share the store with nodes that are still appending
+        reclaimed = SpectrogramStore(export_folder, export_dtype).compact(compact_dead_fraction)
+        if reclaimed:
+            print(f"📦 Compacted spectrogram store: {reclaimed / 1e6:.1f} MB reclaimed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 09:23:09 2025
+
+@author: SREEKANTHVS
+
+Parallel, resumable, checksum-verified dataset downloader.
+
+Per-record files are listed by the dataset's checksum manifest (PhysioNet
+publishes `SHA256SUMS.txt` next to the files). A bounded pool of threads,
+each with its own keep-alive `requests.Session`, downloads files into
+`<name>.part`; an interrupted transfer resumes from the partial file with
+an HTTP Range request. Every completed file is verified against its
+SHA-256 before being renamed into place, and files that are already
+present with the right checksum are skipped (verified checksums are
+memoized by size + mtime in `.download_state.json`, so re-runs do not
+re-hash the dataset).
+
+    python -m aging.data_downloading --dest DATASETS/AA_DATASETS --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config
+
+base_url = 'https://physionet.org/files/autonomic-aging-cardiovascular/1.0.0/'
+manifest_name = 'SHA256SUMS.txt'
+dest_folder = config.data_folder
+zip_url = 'https://www.physionet.org/content/autonomic-aging-cardiovascular/get-zip/1.0.0/'
+zip_output = os.path.join(config.datasets_folder, 'automatic_aging.zip')
+n_connections = 8          # concurrent downloads (one keep-alive connection each)
+chunk_size = 1 << 20       # 1 MiB read/write chunks
+timeout = (10, 60)         # (connect, read) seconds
+max_attempts = 4           # per file, with exponential backoff
+
+_local = threading.local()
+
+
+# === HTTP SESSION ===
+def get_session():
+    """Per-thread keep-alive session (requests.Session is not guaranteed thread-safe)."""
+    if not hasattr(_local, "session"):
+        s = requests.Session()
+        s.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        _local.session = s
+    return _local.session
+
+
+# === CHECKSUMS ===
+def sha256_file(path, h=None):
+    h = h or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h
+
+
+def parse_manifest(text):
+    """'<sha256>  <relative path>' lines -> {relative path: sha256}."""
+    entries = {}
+    for line in text.splitlines():
+        parts = line.strip().split(None, 1)
+        if len(parts) == 2 and len(parts[0]) == 64:
+            entries[parts[1].lstrip('*').strip()] = parts[0].lower()
+    return entries
+
+
+def fetch_manifest(url=base_url, name=manifest_name):
+    r = get_session().get(urljoin(url, name), timeout=timeout)
+    r.raise_for_status()
+    return parse_manifest(r.text)
+
+
+class DownloadState:
+    """Memo of verified files: relpath -> {sha256, size, mtime_ns} (thread-safe, saved atomically)."""
+
+    def __init__(self, dest):
+        self.path = os.path.join(dest, '.download_state.json')
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_verified(self, relpath, local, sha256):
+        e = self.entries.get(relpath)
+        if not e or e['sha256'] != sha256:
+            return False
+        try:
+            st = os.stat(local)
+        except OSError:
+            return False
+        return e['size'] == st.st_size and e['mtime_ns'] == st.st_mtime_ns
+
+    def mark(self, relpath, local, sha256):
+        st = os.stat(local)
+        with self._lock:
+            self.entries[relpath] = {'sha256': sha256, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def save(self):
+        with self._lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+
+# === SINGLE FILE ===
+class RangeMismatch(IOError):
+    """A 206 response does not start at the requested offset."""
+
+
+def content_range_start(value):
+    """'bytes <start>-<end>/<total>' -> start (None if missing or malformed)."""
+    try:
+        unit, spec = (value or '').split(None, 1)
+        return int(spec.split('-', 1)[0]) if unit.lower() == 'bytes' else None
+    except ValueError:
+        return None
+
+
+def download_file(url, local_filename, expected_sha256=None, session=None):
+    """
+    Downloads a file from a given URL and saves it locally.
+
+    Data goes to `<local_filename>.part` first; if that exists (interrupted
+    run) only the missing tail is requested with an HTTP Range header; a server
+    that ignores the Range (200) or answers from another offset (Content-Range
+    mismatch) restarts the file from zero. With `expected_sha256` the finished
+    file is verified before the rename, and a corrupt partial file is discarded
+    and fetched again. Returns True on success.
+    """
+    session = session or get_session()
+    part = local_filename + '.part'
+    os.makedirs(os.path.dirname(local_filename) or '.', exist_ok=True)
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            with session.get(url, stream=True, headers=headers, timeout=timeout) as r:
+                if r.status_code == 416:            # nothing left to fetch: .part is complete
+                    pass
+                else:
+                    r.raise_for_status()
+                    if offset and r.status_code != 206:
+                        offset = 0                  # server ignored Range: start over
+                    elif r.status_code == 206 and content_range_start(r.headers.get('Content-Range')) != offset:
+                        os.remove(part)             # misaligned tail would corrupt the file
+                        raise RangeMismatch(f"Content-Range {r.headers.get('Content-Range')!r} "
+                                            f"does not start at byte {offset}")
+                    with open(part, 'ab' if offset else 'wb') as f:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            f.write(chunk)
+
+            if expected_sha256 and sha256_file(part).hexdigest() != expected_sha256:
+                os.remove(part)
+                raise IOError(f"checksum mismatch for {url}")
+            os.replace(part, local_filename)
+            return True
+        except (requests.exceptions.RequestException, IOError) as e:
+            if attempt == max_attempts:
+                print(f"An error occurred during download of {url}: {e}")
+                return False
+            if not isinstance(e, RangeMismatch):    # restart from zero right away
+                time.sleep(min(2 ** attempt, 30))
+    return False
+
+
+# === WHOLE DATASET ===
+def download_dataset(url=base_url, dest=dest_folder, workers=n_connections, include=None):
+    """
+    Fetch every file of the checksum manifest that is missing or changed.
+
+    `include(relpath) -> bool` can restrict the files (e.g. only .hea/.dat).
+    Returns a summary dict: downloaded, skipped, failed (list of paths).
+    """
+    os.makedirs(dest, exist_ok=True)
+    manifest = fetch_manifest(url)
+    state = DownloadState(dest)
+    todo, skipped = [], 0
+    for relpath, sha in sorted(manifest.items()):
+        if include is not None and not include(relpath):
+            continue
+        local = os.path.join(dest, relpath)
+        if state.is_verified(relpath, local, sha):
+            skipped += 1
+        elif os.path.exists(local) and sha256_file(local).hexdigest() == sha:
+            state.mark(relpath, local, sha)
+            skipped += 1
+        else:
+            todo.append((relpath, local, sha))
+    print(f"🔧 {len(manifest)} files in manifest: {skipped} up to date, {len(todo)} to download.")
+
+    def fetch(item):
+        relpath, local, sha = item
+        ok = download_file(urljoin(url, relpath), local, sha)
+        if ok:
+            state.mark(relpath, local, sha)
+        return relpath, ok
+
+    failed, done, n_bytes = [], 0, 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for fut in as_completed([pool.submit(fetch, item) for item in todo]):
+                relpath, ok = fut.result()
+                if ok:
+                    done += 1
+                    n_bytes += os.path.getsize(os.path.join(dest, relpath))
+                    if done % 100 == 0:
+                        state.save()
+                        print(f"  {done}/{len(todo)} files")
+                else:
+                    failed.append(relpath)
+    finally:
+        state.save()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {done} downloaded ({n_bytes / 1e6:.1f} MB in {elapsed:.1f} s), "
+          f"{skipped} skipped, {len(failed)} failed")
+    return {"downloaded": done, "skipped": skipped, "failed": failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download the Autonomic Aging dataset")
+    parser.add_argument("--url", default=base_url, help="dataset base URL (contains SHA256SUMS.txt)")
+    parser.add_argument("--dest", default=dest_folder)
+    parser.add_argument("--workers", type=int, default=n_connections)
+    parser.add_argument("--zip", action="store_true",
+                        help="download the single dataset zip (resumable, unverified) instead")
+    parser.add_argument("--zip-output", default=zip_output)
+    args = parser.parse_args(argv)
+    if args.zip:
+        download_file(zip_url, args.zip_output)
+    else:
+        download_dataset(args.url, args.dest, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Online ECG spectrogram anomaly scoring.
+
+Implements the band-energy view of the readme's "ECG Spectrogram Anomaly
+Detection" section on top of the streaming STFT (spectrogram_engine):
+
+1. Every spectrogram frame (`window_s` window, one frame per `hop_s`) is
+   reduced to the share of its power in each ECG component band of the
+   readme table (baseline drift < 0.5 Hz, P/T waves 0.5-8 Hz, QRS 8-50 Hz,
+   EMG > 50 Hz), as log10 ratios. The bands are disjoint and bins at the
+   50 Hz mains frequency and its harmonics are left out, so the shares sum
+   to one and hum is not scored as EMG. This is one matrix product per
+   chunk of frames.
+2. Each ratio is scored against a running robust baseline of the same
+   stream: a Huber-clipped exponentially weighted median / MAD
+   (`halflife_s`), initialized from the median of the first `warmup_s`.
+   Clipping keeps anomalous frames from dragging the baseline, and the
+   memory per stream is constant (a few floats per band).
+3. Frames whose largest |robust z| exceeds `threshold` are flagged.
+   Flagged frames less than `merge_gap_s` apart are merged into segments,
+   and segments shorter than `min_segment_s` are dropped. Each segment
+   reports its peak score and the band that drove it, e.g. "emg+" for an
+   EMG share above baseline, or "qrs-" for a QRS share below it when no
+   band rose.
+
+    scorer = AnomalyScorer()
+    for t, Sxx in iter_spectrogram(blocks, fs, nperseg, nperseg - hop):
+        for seg in scorer.push(t, Sxx, f):
+            ...                                  # Segment(start_s, end_s, peak, band)
+    segments = list(scorer.close())
+
+As a stage, `aging anomalies` screens the ECG channels of every record in
+one batch pass. It writes `<record>_anomalies.csv` per record plus a cohort
+`anomaly_segments.csv`, and reports the achieved speed-up over real time.
+"""
+
+import csv
+import os
+import time
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+
+from . import config
+from .wfdb_reader import open_record
+from .spectrogram_engine import iter_record_blocks, iter_spectrogram
+from .batch_runner import (list_records, shard_records, manifest_path, run_batch,
+                          batch_arguments)
+from .scheduler import record_cost
+
+# === CONFIG ===
+input_folder = config.data_folder
+output_folder = config.results("ecg_anomalies")
+ecg_channel = "ECG"          # channels whose name contains this are screened (None = all)
+window_s = 4.0               # STFT window: 0.25 Hz resolution, enough to split off < 0.5 Hz drift
+hop_s = 1.0                  # one scored frame per second
+halflife_s = 120.0           # baseline memory
+warmup_s = 30.0              # frames used to initialize the baseline
+threshold = 5.0              # robust z (|x - median| / (1.4826 MAD)) that flags a frame
+merge_gap_s = 2.0            # flagged frames closer than this form one segment
+min_segment_s = 2.0          # shorter segments are dropped
+huber_c = 3.0                # baseline updates are clipped at this many MADs
+stream_block_size = 1_000_000
+mains_hz = 50.0              # mains frequency (European recordings); None keeps every bin
+mains_notch_hz = 1.0         # bins this close to mains_hz or a harmonic are ignored
+
+# ECG component bands (Hz), from the readme's frequency reference table, made disjoint:
+# P (0.5-10 Hz) and T (1-7 Hz) waves overlap, so they are one band ending where QRS starts
+ECG_BANDS = {"baseline": (0.0, 0.5), "pt_wave": (0.5, 8.0), "qrs": (8.0, 50.0),
+             "emg": (50.0, np.inf)}
+
+Segment = namedtuple("Segment", "start_s end_s peak_score band")
+
+
+# === BAND RATIOS ===
+def band_matrix(f, bands=ECG_BANDS, mains=mains_hz, notch=mains_notch_hz):
+    """
+    (n_freq, n_bands) 0/1 matrix summing PSD bins into each band; bins above
+    0 Hz only, minus the mains notch (`notch` Hz around every multiple of `mains`).
+    """
+    keep = f > 0
+    if mains:
+        keep &= np.abs(f - mains * np.maximum(np.round(f / mains), 1)) > notch
+    M = np.zeros((len(f), len(bands)))
+    for j, (lo, hi) in enumerate(bands.values()):
+        M[:, j] = (f >= lo) & (f < hi) & keep
+    return M
+
+
+def band_log_ratios(Sxx, M):
+    """log10 share of every band in the frame's in-band power: (n_frames, n_bands)."""
+    energy = Sxx.T @ M
+    total = energy.sum(axis=1, keepdims=True) + 1e-20
+    return np.log10(energy / total + 1e-12)
+
+
+# === ROBUST RUNNING BASELINE ===
+class RobustBaseline:
+    """
+    Per-feature running median / MAD with O(1) memory.
+
+    The first `warmup` frames initialize the estimate (exact median / MAD).
+    After that, each frame moves the centre by a Huber-clipped residual,
+    weighted exponentially. The scale moves by a multiplicative sign step,
+    whose fixed point is the median of |residual| (the MAD). An isolated
+    outlier therefore shifts the centre by at most `c` MADs x the smoothing
+    factor, and the scale by one step.
+    """
+
+    def __init__(self, n_features, halflife, warmup, c=huber_c, min_scale=1e-3):
+        self.alpha = 1.0 - 0.5 ** (1.0 / max(halflife, 1e-9))
+        self.c = c
+        self.min_scale = min_scale
+        self.warmup = max(1, int(warmup))
+        self._buffer = np.empty((self.warmup, n_features))
+        self._n = 0
+        self.center = None
+        self.scale = None
+
+    @property
+    def ready(self):
+        return self.center is not None
+
+    def score(self, x):
+        """Signed robust z of each row of `x` (n, features) against the current baseline."""
+        return (x - self.center) / (1.4826 * self.scale)
+
+    def update(self, x):
+        """Fold rows of `x` in, one at a time (the warm-up buffer fills first)."""
+        for row in x:
+            if not self.ready:
+                self._buffer[self._n] = row
+                self._n += 1
+                if self._n == self.warmup:
+                    self.center = np.median(self._buffer, axis=0)
+                    self.scale = np.maximum(np.median(np.abs(self._buffer - self.center), axis=0),
+                                            self.min_scale)
+                    self._buffer = None
+                continue
+            r = row - self.center
+            self.center += self.alpha * np.clip(r, -self.c * self.scale, self.c * self.scale)
+            self.scale *= np.exp(self.alpha * np.sign(np.abs(r) - self.scale))
+            np.maximum(self.scale, self.min_scale, out=self.scale)
+
+
+# === ONLINE SCORER ===
+class AnomalyScorer:
+    """Band-ratio anomaly scoring of one spectrogram column stream; yields closed Segments."""
+
+    def __init__(self, bands=ECG_BANDS, hop=hop_s, halflife=halflife_s, warmup=warmup_s,
+                 threshold=threshold, merge_gap=merge_gap_s, min_segment=min_segment_s):
+        self.bands = list(bands)
+        self._band_ranges = bands
+        self.hop = hop
+        self.threshold = threshold
+        self.merge_gap = merge_gap
+        self.min_segment = min_segment
+        self.baseline = RobustBaseline(len(bands), halflife / hop, warmup / hop)
+        self._M, self._f = None, None
+        self._open = None        # [start, end, peak, band] of the segment being extended
+        self.n_frames = 0
+        self.n_flagged = 0
+
+    def frame_scores(self, t, Sxx, f):
+        """(scores, bands) per frame, updating the baseline; scores are 0 during warm-up."""
+        if self._f is None or len(self._f) != len(f):
+            self._M, self._f = band_matrix(f, self._band_ranges), f
+        x = band_log_ratios(Sxx, self._M)
+        scores = np.zeros(len(x))
+        labels = [None] * len(x)
+        for i, row in enumerate(x):
+            if self.baseline.ready:
+                z = self.baseline.score(row[None])[0]
+                # Disjoint bands, shares sum to one: excess energy in one band lowers the others,
+                # so a band that rose past the threshold names the anomaly
+                j = int(np.argmax(z)) if z.max() > self.threshold else int(np.argmax(np.abs(z)))
+                scores[i] = np.abs(z).max()
+                labels[i] = self.bands[j] + ("+" if z[j] > 0 else "-")
+            self.baseline.update(row[None])
+        return scores, labels
+
+    def push(self, t, Sxx, f):
+        """Score a chunk of columns (`Sxx` is (n_freq, len(t))); yields segments that are complete."""
+        scores, labels = self.frame_scores(t, Sxx, f)
+        self.n_frames += len(t)
+        for ti, score, label in zip(t, scores, labels):
+            if score <= self.threshold:
+                continue
+            self.n_flagged += 1
+            start, end = ti - self.hop / 2, ti + self.hop / 2
+            if self._open is not None and start - self._open[1] <= self.merge_gap:
+                self._open[1] = end
+                if score > self._open[2]:
+                    self._open[2:] = [score, label]
+                continue
+            yield from self._emit()
+            self._open = [start, end, score, label]
+        if self._open is not None and len(t) and t[-1] - self._open[1] > self.merge_gap:
+            yield from self._emit()
+
+    def close(self):
+        """Flush the segment still open at the end of the stream."""
+        yield from self._emit()
+
+    def _emit(self):
+        seg, self._open = self._open, None
+        if seg is not None and seg[1] - seg[0] >= self.min_segment:
+            yield Segment(round(max(seg[0], 0.0), 3), round(seg[1], 3), round(float(seg[2]), 2), seg[3])
+
+
+# === PER RECORD ===
+def score_channel(record, channel, block_size=stream_block_size, **scorer_kw):
+    """Flagged segments of one channel of a LazyRecord, streamed block by block."""
+    nperseg = int(round(window_s * record.fs))
+    hop = max(1, int(round(hop_s * record.fs)))
+    scorer = AnomalyScorer(hop=hop / record.fs, **scorer_kw)
+    f = np.fft.rfftfreq(nperseg, 1 / record.fs)
+    blocks = iter_record_blocks(record, channel, block_size)
+    segments = []
+    for t, Sxx in iter_spectrogram(blocks, record.fs, nperseg, nperseg - hop, window="hann"):
+        segments.extend(scorer.push(t, Sxx, f))
+    segments.extend(scorer.close())
+    return segments, scorer
+
+
+def screened_channels(record, match=ecg_channel):
+    names = record.sig_name or [f"ch{i + 1}" for i in range(record.n_channels)]
+    return [(i, n) for i, n in enumerate(names) if not match or match.lower() in n.lower()]
+
+
+def result_path(file):
+    return os.path.join(output_folder, f"{os.path.splitext(file)[0]}_anomalies.csv")
+
+
+def process_file(file, channel=ecg_channel):
+    """Screen the `channel` (name substring) channels of a record; writes its segment CSV."""
+    start = time.perf_counter()
+    record = open_record(os.path.join(input_folder, file))
+    rows = []
+    frames = flagged = 0
+    for ch, name in screened_channels(record, channel):
+        segments, scorer = score_channel(record, ch)
+        frames += scorer.n_frames
+        flagged += scorer.n_flagged
+        rows += [dict(record=os.path.splitext(file)[0], channel=name, **seg._asdict()) for seg in segments]
+    path = result_path(file)
+    with open(path + ".tmp", "w", newline="") as fh:
+        writer = csv.DictWriter(fh, ["record", "channel", *Segment._fields])
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(path + ".tmp", path)
+    wall = time.perf_counter() - start
+    duration = record.n_samples / record.fs
+    print(f"🩺 {file}: {len(rows)} segments, {flagged}/{frames} frames flagged, "
+          f"{duration / wall:.0f}x real time")
+    return {"segments": len(rows), "duration_s": duration, "seconds": wall}
+
+
+# === MAIN ===
+def main(argv=None):
+    parser = batch_arguments("Online spectrogram anomaly screening of the ECG channels")
+    args = parser.parse_args(argv)
+    channel = args.channel or ecg_channel
+    dat_files = shard_records(list_records(input_folder, query=args.query, channel=channel),
+                              args.shard)
+    if not dat_files:
+        print(f"No .dat files found in '{input_folder}'.")
+        return
+    os.makedirs(output_folder, exist_ok=True)
+    summary = run_batch(dat_files, partial(process_file, channel=channel), lambda f: [result_path(f)],
+                        manifest_path(output_folder, args.shard), retries=args.retries,
+                        n_workers=args.workers, threads=args.threads, cores=args.cores,
+                        cost=lambda f: record_cost(os.path.join(input_folder, f)), force=args.force)
+
+    results = summary["results"].values()
+    if results:
+        duration = sum(r["duration_s"] for r in results)
+        print(f"⏱ {duration / 3600:.1f} h of signal screened at "
+              f"{duration / max(sum(r['seconds'] for r in results), 1e-9):.0f}x real time per worker, "
+              f"{duration / max(summary['seconds'], 1e-9):.0f}x overall")
+
+    # Cohort table from every per-record CSV of this folder (this run and earlier ones)
+    name = "anomaly_segments.csv" if args.shard is None else f"anomaly_segments-{args.shard[0]}of{args.shard[1]}.csv"
+    out = os.path.join(output_folder, name)
+    with open(out, "w", newline="") as fh:
+        writer = csv.DictWriter(fh, ["record", "channel", *Segment._fields])
+        writer.writeheader()
+        for f in dat_files:
+            if os.path.exists(result_path(f)):
+                with open(result_path(f), newline="") as rf:
+                    writer.writerows(csv.DictReader(rf))
+    print(f"✅ Saved anomaly segments: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 28 11:13:14 2025
+
+@author: SREEKANTHVS
+"""
+
+# =============================================================
+# Autonomic Aging (PhysioNet) – ECG + BP Analysis Notebook
+# Author: ChatGPT (GPT-5)
+# =============================================================
+
+# --- Imports ---
+import argparse
+import os
+import glob
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .wfdb_reader import read_dat_file
+from .cohort_index import load_index, read_subject_info
+from .filter_bank import ECG_BAND, BP_BAND, zero_phase, filter_channels
+from .hrv_stream import hrv_trajectory
+from .hrv_frequency import frequency_features, windowed_frequency_features
+from .baroreflex import sequence_brs
+
+# Optional dependencies are only probed here (find_spec does not import them);
+# pyarrow / numba are loaded by the first part write / R-peak detection.
+# Columnar output needs pyarrow; fall back to CSV parts without it
+USE_PARQUET = find_spec("pyarrow") is not None
+# Compiled Pan–Tompkins QRS detector needs numba; fall back to find_peaks without it
+USE_NUMBA_QRS = find_spec("numba") is not None
+
+def warn_missing_optional():
+    """Printed once per cohort run (not at import, which also happens in every pool worker)."""
+    if not USE_PARQUET:
+        print("⚠️ pyarrow not found — writing CSV parts. Install with 'pip install pyarrow' for Parquet output.")
+    if not USE_NUMBA_QRS:
+        print("⚠️ numba not found — using find_peaks for R-peaks. Install with 'pip install numba'.")
+
+# =============================================================
+# 0. Configuration
+# =============================================================
+# Assumes dataset is downloaded from PhysioNet into ./autonomic-aging-cardiovascular-1.0.0
+# You can download via:
+# !wget -r -N -c -np https://physionet.org/files/autonomic-aging-cardiovascular/1.0.0/
+
+base_path = config.data_folder
+meta_path = os.path.join(base_path, "subject-info.csv")
+features_dir = os.path.join(config.features_folder, "autonomic_aging_features")   # incremental part files (one per flush)
+out_csv = os.path.join(config.features_folder, "autonomic_aging_features.csv")    # consolidated table written at the end
+n_workers = None                                # None = one process per CPU core
+flush_every = 50                                # records per part file
+hrv_dir = os.path.join(config.features_folder, "autonomic_aging_hrv_trajectories")     # trajectory part files (None = no trajectories)
+hrv_csv = os.path.join(config.features_folder, "autonomic_aging_hrv_trajectories.csv")  # time-resolved HRV (one row per window)
+hrv_window, hrv_hop, hrv_unit = 120, 30, "s"    # rolling HRV window and hop ("s" or "beats"); >= 120 s so LF (0.04 Hz) is resolved
+
+# =============================================================
+# 1. Load Metadata
+# =============================================================
+def load_metadata(meta_path=meta_path):
+    metadata = read_subject_info(meta_path)
+    print("Metadata loaded:", metadata.shape)
+    return metadata
+
+# =============================================================
+# 2. Load One Record (ECG + BP)
+# =============================================================
+def load_record(record_id, base_path=base_path):
+    """Reads only the ECG (0) and blood pressure (1) channels of one record."""
+    record_path = os.path.join(base_path, str(record_id))
+    signals, fs = read_dat_file(record_path + ".dat", channels=[0, 1])
+    # Assume 0 = ECG, 1 = Blood Pressure
+    return signals[:, 0], signals[:, 1], fs
+
+# =============================================================
+# 3. Preprocessing (Filtering)
+# =============================================================
+def bandpass_filter(sig, fs, low=ECG_BAND[0], high=ECG_BAND[1]):
+    # Cached SOS design, zero-phase along the time axis (1-D or samples x channels)
+    return zero_phase(sig, fs, (low, high))
+
+def preprocess(ecg, bp, fs):
+    # ECG and BP bands applied to the two-channel matrix in one call
+    filtered = filter_channels(np.column_stack([ecg, bp]), fs, [ECG_BAND, BP_BAND])
+    return filtered[:, 0], filtered[:, 1]
+
+# =============================================================
+# 4. ECG Peak Detection and HRV
+# =============================================================
+def detect_rpeaks(ecg_filt, fs):
+    if USE_NUMBA_QRS:
+        from .qrs_detector import detect_qrs
+        return detect_qrs(ecg_filt, fs)
+    from scipy.signal import find_peaks
+    rpeaks, _ = find_peaks(ecg_filt, distance=int(0.6*fs), height=np.std(ecg_filt)*2)
+    return rpeaks
+
+def compute_hrv_features(rr):
+    rr_mean = np.mean(rr)
+    sdnn = np.std(rr)
+    rmssd = np.sqrt(np.mean(np.diff(rr)**2))
+    return {"RR_mean_ms": rr_mean, "SDNN_ms": sdnn, "RMSSD_ms": rmssd}
+
+def rpeak_trajectory(rpeaks, fs, window=hrv_window, hop=hrv_hop, unit=hrv_unit):
+    """Rolling RR_mean / SDNN / RMSSD (plus LF/HF for time windows) from detected R-peaks."""
+    rr = np.diff(rpeaks) / fs * 1000
+    rows = pd.DataFrame(hrv_trajectory(rr, rpeaks[1:] / fs, window, hop, unit))
+    if unit == "s" and len(rows):
+        # LF/HF over the same time windows, all windows in one batched periodogram
+        freq = pd.DataFrame(windowed_frequency_features(rpeaks[1:] / fs, rr, window, hop))
+        rows["key"] = rows["t_start"].round(6)
+        freq["key"] = freq.pop("t_start").round(6)
+        rows = rows.merge(freq.drop(columns="t_end"), on="key", how="left").drop(columns="key")
+    return rows
+
+def record_hrv_trajectory(record_id, base_path=base_path, window=hrv_window, hop=hrv_hop, unit=hrv_unit):
+    """Rolling HRV of a single record (ECG channel only); cohort runs get it from run_cohort's job."""
+    ecg, fs = read_dat_file(os.path.join(base_path, str(record_id)) + ".dat", channels=[0])
+    rpeaks = detect_rpeaks(bandpass_filter(ecg[:, 0], fs), fs)
+    return rpeak_trajectory(rpeaks, fs, window, hop, unit).assign(ID=record_id)
+
+# =============================================================
+# 5. BP Feature Extraction (Systolic / Diastolic)
+# =============================================================
+def compute_bp_features(bp_filt, fs):
+    from scipy.signal import find_peaks
+    systolic_peaks, _ = find_peaks(bp_filt, distance=int(0.5*fs))
+    diastolic_peaks, _ = find_peaks(-bp_filt, distance=int(0.5*fs))
+
+    sbp = bp_filt[systolic_peaks]
+    dbp = bp_filt[diastolic_peaks]
+    bp_features = {
+        "SBP_mean": np.mean(sbp),
+        "DBP_mean": np.mean(dbp),
+        "BP_variability": np.std(sbp)
+    }
+    return bp_features, systolic_peaks
+
+# =============================================================
+# 6. Baroreflex Sensitivity (BRS)
+# =============================================================
+def compute_brs(rpeaks, systolic_peaks, bp_filt, fs):
+    # Sequence method: SBP/RR ramps of >= 3 beats, beats aligned by timestamp
+    summary, _ = sequence_brs(rpeaks / fs, systolic_peaks / fs, bp_filt[systolic_peaks])
+    return summary
+
+# =============================================================
+# 7. Per-Record Feature Extraction
+# =============================================================
+def _analyze(ecg, bp, fs):
+    """(features, R-peak sample indices) of loaded ECG / BP signals."""
+    ecg_filt, bp_filt = preprocess(ecg, bp, fs)
+
+    rpeaks = detect_rpeaks(ecg_filt, fs)
+    rr_intervals = np.diff(rpeaks) / fs * 1000  # in ms
+
+    hrv_features = compute_hrv_features(rr_intervals)
+    hrv_features.update(frequency_features(rpeaks[1:] / fs, rr_intervals))
+    bp_features, systolic_peaks = compute_bp_features(bp_filt, fs)
+    brs = compute_brs(rpeaks, systolic_peaks, bp_filt, fs)
+
+    return {**hrv_features, **bp_features, **brs}, rpeaks
+
+def signal_features(ecg, bp, fs):
+    """Runs filtering, R-peak/HRV, BP and baroreflex steps on loaded ECG / BP signals."""
+    return _analyze(ecg, bp, fs)[0]
+
+def extract_record_features(record_id, base_path=base_path, trajectory=False):
+    """
+    Features of one record (loaded from `base_path`), with its ID. With
+    `trajectory`, returns (features, rolling HRV windows) from the same
+    R-peaks, and the features record the number of windows (HRV_windows).
+    """
+    ecg, bp, fs = load_record(record_id, base_path)
+    features, rpeaks = _analyze(ecg, bp, fs)
+    features["ID"] = record_id
+    if not trajectory:
+        return features
+    windows = rpeak_trajectory(rpeaks, fs).assign(ID=record_id)
+    features["HRV_windows"] = len(windows)
+    return features, windows
+
+def safe_extract(record_id, base_path=base_path, trajectory=False):
+    """Per-record error isolation: never raises, returns (id, result | None, error | None, seconds)."""
+    start = time.perf_counter()
+    try:
+        result = extract_record_features(record_id, base_path, trajectory)
+        return record_id, result, None, time.perf_counter() - start
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}"
+        return record_id, None, err, time.perf_counter() - start
+
+# =============================================================
+# 8. Incremental Columnar Output (Resumable)
+# =============================================================
+def _parts(folder):
+    """Part files of `folder` in write order (names carry the write time)."""
+    return sorted(glob.glob(os.path.join(folder, "part-*.parquet"))
+                  + glob.glob(os.path.join(folder, "part-*.csv")))
+
+def _read_part(path):
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, dtype={"ID": str})
+
+def completed_ids(features_dir=features_dir, trajectories=False):
+    """
+    IDs already written by previous (possibly interrupted) runs. With
+    `trajectories`, only records whose HRV trajectory was written too: their
+    feature rows carry HRV_windows (rows from feature-only runs do not).
+    """
+    done = set()
+    for path in _parts(features_dir):
+        part = _read_part(path)
+        if trajectories:
+            part = part[part["HRV_windows"].notna()] if "HRV_windows" in part else part.iloc[:0]
+        done.update(part["ID"].astype(str))
+    return done
+
+def write_part(rows, features_dir=features_dir):
+    """Writes one part file atomically (tmp + rename), so a crash never leaves a half-written part."""
+    os.makedirs(features_dir, exist_ok=True)
+    ext = "parquet" if USE_PARQUET else "csv"
+    path = os.path.join(features_dir, f"part-{time.time_ns()}.{ext}")
+    df = pd.DataFrame(rows)
+    if USE_PARQUET:
+        df.to_parquet(path + ".tmp", index=False)
+    else:
+        df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return path
+
+def log_errors(errors, features_dir=features_dir):
+    if not errors:
+        return
+    os.makedirs(features_dir, exist_ok=True)
+    path = os.path.join(features_dir, "errors.csv")
+    pd.DataFrame(errors, columns=["ID", "error"]).to_csv(path, mode="a", index=False,
+                                                         header=not os.path.exists(path))
+
+def load_features(features_dir=features_dir):
+    """All part files as one DataFrame (one row per ID, latest part wins)."""
+    parts = _parts(features_dir)
+    if not parts:
+        return pd.DataFrame()
+    frames = [_read_part(p) for p in parts]
+    return pd.concat(frames, ignore_index=True).drop_duplicates("ID", keep="last")
+
+def load_trajectories(hrv_dir=hrv_dir):
+    """All trajectory parts as one DataFrame (one row per ID and window, latest part wins)."""
+    parts = _parts(hrv_dir)
+    if not parts:
+        return pd.DataFrame()
+    frames = [_read_part(p) for p in parts]
+    return pd.concat(frames, ignore_index=True).drop_duplicates(["ID", "t_start"], keep="last")
+
+# =============================================================
+# 9. Cohort-Wide Parallel Engine
+# =============================================================
+def write_parts(rows, windows, features_dir=features_dir, hrv_dir=hrv_dir):
+    """Trajectory part first, then the feature part that marks its records done."""
+    if hrv_dir is not None and windows:
+        write_part(pd.concat(windows, ignore_index=True), hrv_dir)
+    write_part(rows, features_dir)
+
+def run_cohort(record_ids, base_path=base_path, features_dir=features_dir,
+               n_workers=n_workers, flush_every=flush_every, hrv_dir=hrv_dir):
+    """
+    Extracts features for every record ID on a process pool, flushing results
+    to a new part file every `flush_every` records. With `hrv_dir`, the same
+    job also computes the record's rolling HRV trajectory from its R-peaks,
+    written to a part file in `hrv_dir` with every flush. Records already
+    present in `features_dir` (with their trajectory, when requested) are
+    skipped, so an interrupted run resumes where it stopped.
+    Failed records are logged to errors.csv and retried on the next run.
+    """
+    warn_missing_optional()
+    trajectories = hrv_dir is not None
+    done = completed_ids(features_dir, trajectories)
+    todo = [rid for rid in record_ids if str(rid) not in done]
+    print(f"🔧 {len(done)} records already done, {len(todo)} to process.")
+    if not todo:
+        return
+
+    rows, windows, errors, n_ok, n_fail = [], [], [], 0, 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(safe_extract, rid, base_path, trajectories) for rid in todo]
+        for fut in as_completed(futures):
+            record_id, result, err, seconds = fut.result()
+            if err is None:
+                features, record_windows = result if trajectories else (result, None)
+                rows.append(features)
+                if record_windows is not None and len(record_windows):
+                    windows.append(record_windows)
+                n_ok += 1
+            else:
+                errors.append((record_id, err))
+                n_fail += 1
+                print(f"⚠️ {record_id} failed: {err.splitlines()[0]}")
+            if len(rows) >= flush_every:
+                write_parts(rows, windows, features_dir, hrv_dir)
+                rows, windows = [], []
+            if len(errors) >= flush_every:
+                log_errors(errors, features_dir)
+                errors = []
+    if rows:
+        write_parts(rows, windows, features_dir, hrv_dir)
+    log_errors(errors, features_dir)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {n_ok} records done, {n_fail} failed in {elapsed:.1f} s "
+          f"({n_ok / elapsed if elapsed else 0:.1f} records/s)")
+
+# =============================================================
+# 10. Visualization
+# =============================================================
+def plot_record(record_id, base_path=base_path):
+    ecg, bp, fs = load_record(record_id, base_path)
+    ecg_filt, bp_filt = preprocess(ecg, bp, fs)
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(12, 5))
+    plt.subplot(2,1,1)
+    plt.plot(ecg_filt[:10_000])
+    plt.title("Filtered ECG (first 10 seconds)")
+    plt.subplot(2,1,2)
+    plt.plot(bp_filt[:10_000])
+    plt.title("Filtered BP (first 10 seconds)")
+    plt.tight_layout()
+    plt.show()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECG/BP features and HRV trajectories of the cohort")
+    parser.add_argument("--workers", type=int, default=n_workers,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument("--query", default=None,
+                        help="cohort index selection, e.g. 'age_group >= 10 and device == 1'")
+    parser.add_argument("--channel", default=None, help="only records with a matching channel name")
+    args = parser.parse_args(argv)
+
+    if args.query or args.channel:
+        record_ids = load_index(base_path).ids(args.query, args.channel)
+        print(f"🔧 {len(record_ids)} records selected from the cohort index.")
+    else:
+        record_ids = load_metadata()["ID"].tolist()
+    run_cohort(record_ids, n_workers=args.workers)
+
+    features_df = load_features()
+    features_df.to_csv(out_csv, index=False)
+    print(f"✅ Features saved to {out_csv} ({len(features_df)} records)")
+
+    trajectories = load_trajectories()
+    trajectories.to_csv(hrv_csv, index=False)
+    print(f"✅ HRV trajectories saved to {hrv_csv} ({len(trajectories)} windows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""
+Cohort-level spectrograms: per-age-group, per-channel mean and variance of
+the normalized spectrogram, streamed over any number of records.
+
+Every record is brought onto a common grid before it is accumulated:
+- frequency: `n_freq` bins in `band`, evaluated with the band-limited DFT
+  bank of spectrogram_engine. The window is `window_s` seconds at every
+  sampling rate, so records at 500 Hz and 1 kHz share the same grid.
+- time: uniform bins of `time_bin_s` up to `max_duration_s`, or one bin
+  per named test phase (start/end seconds, may overlap or leave gaps).
+
+A record is streamed block by block into its binned dB spectrogram
+(n_time, n_freq). That spectrogram is then folded into a Welford
+accumulator for its (age group, channel) pair and dropped. Memory is one
+grid per pair, whatever the number of records. Accumulators merge
+exactly (Chan et al.), so:
+- worker processes each aggregate a chunk of records and return a partial;
+- shards (`--shard i/N`, e.g. one per node) save theirs as .npz;
+- `--merge` combines saved partials into the final result.
+
+    aging group-spectrogram --workers 8
+    aging group-spectrogram --shard 0/4                 # on each node, then:
+    aging group-spectrogram --merge RESULTS/group_spectrograms/group_spectra-*of4.npz
+    aging group-spectrogram --phases "rest:0-300,late:900-1200"
+"""
+
+import argparse
+import glob
+import json
+import os
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from . import config
+from .wfdb_reader import open_record
+from .spectrogram_engine import iter_record_blocks, iter_spectrogram, iter_normalized_spectrogram
+from .batch_runner import shard_records, batch_arguments
+from .scheduler import BudgetExecutor, plan_budget, record_cost
+
+# === CONFIG ===
+input_folder = config.data_folder
+output_folder = config.results("group_spectrograms")
+band = (0.5, 40.0)          # Hz, common frequency range
+n_freq = 80                 # frequency bins in `band`
+window_s = 1.024            # STFT window (s), 50 % overlap
+time_bin_s = 30.0           # uniform time grid: bin width (s) ...
+max_duration_s = 1800.0     # ... up to this time (later samples are not read)
+phases = None               # or [("rest", 0, 300), ("late", 900, 1200)]: one bin per phase
+stream_block_size = 1_000_000
+chunks_per_worker = 4       # records are split into workers x this many partials
+
+
+# === COMMON GRID ===
+@dataclass(frozen=True)
+class Grid:
+    """Time bins ((start_s, end_s) per bin, with labels) x frequency bins shared by all records."""
+    edges: tuple
+    labels: tuple
+    band: tuple = band
+    n_freq: int = n_freq
+    window_s: float = window_s
+
+    @property
+    def freqs(self):
+        return np.linspace(self.band[0], self.band[1], self.n_freq)
+
+    @property
+    def shape(self):
+        return len(self.edges), self.n_freq
+
+    @property
+    def end_s(self):
+        return max(end for _, end in self.edges)
+
+    def to_json(self):
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, text):
+        d = json.loads(text)
+        return cls(tuple(tuple(e) for e in d["edges"]), tuple(d["labels"]), tuple(d["band"]),
+                   d["n_freq"], d["window_s"])
+
+
+def uniform_grid(bin_s=time_bin_s, max_s=max_duration_s, **kw):
+    edges = tuple((float(s), float(min(s + bin_s, max_s))) for s in np.arange(0, max_s, bin_s))
+    return Grid(edges, tuple(f"{s:g}-{e:g}s" for s, e in edges), **kw)
+
+
+def phase_grid(phases, **kw):
+    return Grid(tuple((float(s), float(e)) for _, s, e in phases),
+                tuple(name for name, _, _ in phases), **kw)
+
+
+def parse_phases(text):
+    """'rest:0-300,late:900-1200' -> [("rest", 0.0, 300.0), ("late", 900.0, 1200.0)]."""
+    out = []
+    for item in text.split(","):
+        name, _, span = item.strip().rpartition(":")
+        start, end = (float(v) for v in span.split("-"))
+        if end <= start:
+            raise argparse.ArgumentTypeError(f"empty phase {item!r}")
+        out.append((name or f"phase{len(out)}", start, end))
+    return out
+
+
+# === PER-RECORD BINNING (STREAMED) ===
+def record_grid(record, channel, grid, block_size=stream_block_size):
+    """
+    Mean normalized dB spectrogram of one channel in every time bin of
+    `grid`: (n_time, n_freq), NaN where the record has no column in a bin.
+    Only samples up to the end of the last bin are read.
+    """
+    nperseg = max(8, int(round(grid.window_s * record.fs)))
+    starts, ends = np.array(grid.edges).T
+    sums = np.zeros(grid.shape)
+    counts = np.zeros(len(starts))
+    blocks = iter_record_blocks(record, channel, block_size, sampto=int(np.ceil(grid.end_s * record.fs)))
+    columns = iter_spectrogram(blocks, record.fs, nperseg, nperseg // 2, band=grid.band, n_bins=grid.n_freq)
+    for t, Sxx in iter_normalized_spectrogram(columns, grid.freqs):
+        inside = ((t[:, None] >= starts) & (t[:, None] < ends)).astype(float)   # (columns, bins)
+        sums += inside.T @ (10 * np.log10(Sxx + 1e-12)).T
+        counts += inside.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts[:, None]
+
+
+# === MERGEABLE MOMENTS ===
+class Welford:
+    """Cell-wise running count / mean / M2 of equally shaped arrays; NaN cells are skipped."""
+
+    def __init__(self, shape):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, x):
+        valid = ~np.isnan(x)
+        x = np.where(valid, x, self.mean)       # skipped cells get a zero update
+        self.count += valid
+        delta = x - self.mean
+        self.mean += np.divide(delta, self.count, out=np.zeros_like(delta), where=valid)
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other):
+        """Chan et al. pairwise combination; exact regardless of how records were split."""
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        safe = np.maximum(n, 1)
+        self.mean = self.mean + delta * other.count / safe
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / safe
+        self.count = n
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance across records (NaN where fewer than two records contributed)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def masked_mean(self):
+        return np.where(self.count > 0, self.mean, np.nan)
+
+
+class GroupSpectra:
+    """Welford accumulators keyed by (age group, channel name) on one Grid."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.stats = {}
+        self.records = {}       # age group -> records accumulated
+        self.failed = []
+
+    def add(self, group, channel, binned):
+        key = (int(group), channel)
+        if key not in self.stats:
+            self.stats[key] = Welford(self.grid.shape)
+        self.stats[key].update(binned)
+
+    def add_record(self, path, group, channel=None):
+        """
+        Accumulate every channel of a record (or those whose name contains
+        `channel`). The record counts towards its group only if at least one
+        channel put a value in some bin; returns whether it did.
+        """
+        record = open_record(path)
+        names = record.sig_name or [f"ch{i + 1}" for i in range(record.n_channels)]
+        accumulated = False
+        for ch, name in enumerate(names):
+            if channel and channel.lower() not in name.lower():
+                continue
+            binned = record_grid(record, ch, self.grid)
+            if np.isnan(binned).all():
+                continue
+            self.add(group, name, binned)
+            accumulated = True
+        if accumulated:
+            self.records[int(group)] = self.records.get(int(group), 0) + 1
+        return accumulated
+
+    def merge(self, other):
+        if other.grid != self.grid:
+            raise ValueError("cannot merge group spectra computed on different grids")
+        for key, acc in other.stats.items():
+            if key in self.stats:
+                self.stats[key].merge(acc)
+            else:
+                self.stats[key] = acc
+        for group, n in other.records.items():
+            self.records[group] = self.records.get(group, 0) + n
+        self.failed.extend(other.failed)
+        return self
+
+    # --- persistence (partials of workers / nodes) ---
+    def save(self, path):
+        keys = sorted(self.stats)
+        arrays = {"grid": np.array(self.grid.to_json()),
+                  "meta": np.array(json.dumps({"keys": keys, "records": self.records,
+                                               "failed": self.failed}))}
+        for i, key in enumerate(keys):
+            acc = self.stats[key]
+            arrays.update({f"count_{i}": acc.count, f"mean_{i}": acc.mean, f"m2_{i}": acc.m2})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            out = cls(Grid.from_json(str(data["grid"])))
+            meta = json.loads(str(data["meta"]))
+            for i, (group, channel) in enumerate(meta["keys"]):
+                acc = Welford(out.grid.shape)
+                acc.count, acc.mean, acc.m2 = data[f"count_{i}"], data[f"mean_{i}"], data[f"m2_{i}"]
+                out.stats[(group, channel)] = acc
+        out.records = {int(g): n for g, n in meta["records"].items()}
+        out.failed = meta["failed"]
+        return out
+
+
+# === WORKER ===
+def aggregate_chunk(task):
+    """Partial GroupSpectra of a chunk: task = (grid, folder, channel, [(record file, age group), ...])."""
+    grid, folder, channel, items = task
+    part = GroupSpectra(grid)
+    for file, group in items:
+        try:
+            part.add_record(os.path.join(folder, file), group, channel)
+        except Exception as e:
+            print(f"⚠️ {file}: {type(e).__name__}: {e}")
+            part.failed.append(file)
+    return part
+
+
+def split_chunks(items, n_chunks, cost):
+    """Greedy longest-first packing of records into `n_chunks` chunks of similar total cost."""
+    chunks = [[] for _ in range(max(1, min(n_chunks, len(items))))]
+    loads = [0] * len(chunks)
+    for item in sorted(items, key=cost, reverse=True):
+        i = loads.index(min(loads))
+        chunks[i].append(item)
+        loads[i] += cost(item)
+    return chunks
+
+
+def aggregate(items, grid, folder=input_folder, channel=None, workers=1, threads=None, cores=None):
+    """
+    GroupSpectra of `items` ((record file, age group) pairs). Partials are
+    merged as workers return them, so only one partial per worker is ever
+    held besides the running total.
+    """
+    total = GroupSpectra(grid)
+    if workers == 1 and threads is None:
+        return total.merge(aggregate_chunk((grid, folder, channel, items)))
+
+    budget = plan_budget(cores, workers, threads)
+    print(f"🧮 Core budget: {budget.workers} workers x {budget.threads} threads")
+    sizes = {file: record_cost(os.path.join(folder, file)) for file, _ in items}
+    tasks = [(grid, folder, channel, chunk)
+             for chunk in split_chunks(items, budget.workers * chunks_per_worker,
+                                       lambda item: sizes[item[0]])]
+    with BudgetExecutor(budget) as pool:
+        for task, part, err, wall, _ in pool.run(aggregate_chunk, tasks):
+            if err:
+                print(f"❌ chunk of {len(task[3])} records failed: {err}")
+                total.failed.extend(file for file, _ in task[3])
+            else:
+                total.merge(part)
+    print(f"⏱ {pool.report()}")
+    return total
+
+
+# === OUTPUT ===
+def result_path(shard=None):
+    name = "group_spectra.npz" if shard is None else f"group_spectra-{shard[0]}of{shard[1]}.npz"
+    return os.path.join(output_folder, name)
+
+
+def plot_group_spectra(result, out_path, max_groups=None):
+    """
+    One row per channel: time-averaged mean spectrum of every age group
+    (left) and the oldest minus youngest group mean spectrogram (right).
+    """
+    import matplotlib.pyplot as plt
+
+    channels = sorted({ch for _, ch in result.stats})
+    groups = sorted({g for g, _ in result.stats})[:max_groups]
+    f = result.grid.freqs
+    fig, axes = plt.subplots(len(channels), 2, figsize=(14, 3.5 * len(channels)), squeeze=False)
+    colors = plt.cm.viridis(np.linspace(0, 1, max(len(groups), 2)))
+    for row, channel in enumerate(channels):
+        ax = axes[row, 0]
+        for color, group in zip(colors, groups):
+            acc = result.stats.get((group, channel))
+            if acc is None:
+                continue
+            with np.errstate(invalid="ignore"):
+                spectrum = np.nansum(acc.mean * acc.count, axis=0) / acc.count.sum(axis=0)
+            ax.plot(f, spectrum, color=color, label=f"group {group} (n={result.records.get(group, 0)})")
+        ax.set_title(f"{channel} — mean spectrum per age group")
+        ax.set_xlabel("Freq [Hz]")
+        ax.set_ylabel("Normalized Power (dB)")
+        ax.legend(fontsize=7, ncol=2)
+
+        ax = axes[row, 1]
+        present = [g for g in groups if (g, channel) in result.stats]
+        if len(present) >= 2:
+            diff = (result.stats[(present[-1], channel)].masked_mean
+                    - result.stats[(present[0], channel)].masked_mean)
+            im = ax.pcolormesh(np.arange(len(result.grid.edges)), f, diff.T,
+                               shading="nearest", cmap="coolwarm")
+            fig.colorbar(im, ax=ax, label="dB")
+            ax.set_title(f"{channel} — group {present[-1]} minus group {present[0]}")
+            ticks = np.arange(len(result.grid.labels))
+            step = max(1, len(ticks) // 10)
+            ax.set_xticks(ticks[::step])
+            ax.set_xticklabels(result.grid.labels[::step], rotation=45, ha="right", fontsize=7)
+        else:
+            ax.axis("off")
+    fig.tight_layout()
+    plt.savefig(out_path, dpi=150)
+    plt.close()
+    print(f"✅ Saved group spectra plot: {out_path}")
+
+
+def finish(result, path, render=True):
+    result.save(path)
+    print(f"✅ Saved {len(result.stats)} group/channel accumulators "
+          f"({sum(result.records.values())} records, {len(result.failed)} failed): {path}")
+    if render and result.stats:
+        plot_group_spectra(result, os.path.splitext(path)[0] + ".png")
+
+
+# === MAIN ===
+def main(argv=None):
+    parser = batch_arguments("Per-age-group mean / variance spectrograms of the cohort")
+    parser.add_argument("--phases", type=parse_phases, default=phases,
+                        help="one time bin per test phase, e.g. 'rest:0-300,late:900-1200'")
+    parser.add_argument("--bin", type=float, default=time_bin_s, help="uniform time bin width (s)")
+    parser.add_argument("--max-duration", type=float, default=max_duration_s)
+    parser.add_argument("--merge", nargs="+", default=None, metavar="NPZ",
+                        help="merge saved partials (e.g. one per shard) instead of computing")
+    args = parser.parse_args(argv)
+
+    if args.merge:
+        paths = sorted({p for pattern in args.merge for p in glob.glob(pattern)})
+        if not paths:
+            print(f"No partials match {args.merge}.")
+            return
+        result = GroupSpectra.load(paths[0])
+        for p in paths[1:]:
+            result.merge(GroupSpectra.load(p))
+        print(f"🔗 Merged {len(paths)} partials.")
+        finish(result, result_path())
+        return
+
+    from .cohort_index import load_index
+    selection = load_index(input_folder).select(args.query, args.channel).dropna(subset=["age_group"])
+    groups = dict(zip(selection["record"] + ".dat", selection["age_group"].astype(int)))
+    files = shard_records(sorted(groups), args.shard)
+    if not files:
+        print(f"No records with an age group found in '{input_folder}'.")
+        return
+    grid = phase_grid(args.phases) if args.phases else uniform_grid(args.bin, args.max_duration)
+    print(f"🔧 {len(files)} records -> {len(set(groups[f] for f in files))} age groups, "
+          f"grid {grid.shape[0]} time x {grid.shape[1]} freq bins")
+    os.makedirs(output_folder, exist_ok=True)
+    result = aggregate([(f, groups[f]) for f in files], grid, input_folder, args.channel,
+                       workers=args.workers or 1, threads=args.threads, cores=args.cores)
+    finish(result, result_path(args.shard), render=args.shard is None)
+
+
+if __name__ == "__main__":
+    main()
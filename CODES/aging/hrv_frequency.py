@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Frequency-domain HRV (LF, HF, LF/HF) from unevenly sampled RR tachograms.
+
+The Lomb–Scargle periodogram is evaluated directly on the beat times (no
+resampling, no Welch), vectorized over a whole batch of series: segments
+from many records and/or sliding windows are padded into one (batch, beats)
+matrix with a validity mask, and every frequency of every segment is
+computed with a handful of array reductions, in memory-bounded chunks.
+
+    freqs, psd = lomb_scargle_psd(times, rr_series)        # lists of 1-D arrays
+    rows = band_powers(freqs, psd)                         # LF/HF per segment
+
+PSD units are ms²/Hz (variance-preserving one-sided scaling), so band powers
+are in ms² like in Kubios / the Task Force (1996) definitions.
+"""
+
+import numpy as np
+
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+default_freqs = np.arange(0.0033, 0.4 + 1e-9, 0.001)   # Hz
+default_chunk_elements = 20_000_000                    # batch * freqs * beats per chunk
+min_beats = 3                                          # fewer beats per segment -> NaN features
+
+
+def pad_segments(times, values):
+    """Stack ragged (t, x) series into (batch, n_max) arrays plus a boolean mask."""
+    n = np.array([len(v) for v in values])
+    n_max = int(n.max()) if len(n) else 0
+    T = np.zeros((len(values), n_max))
+    X = np.zeros((len(values), n_max))
+    mask = np.arange(n_max) < n[:, None]
+    for i, (t, x) in enumerate(zip(times, values)):
+        T[i, :len(t)] = t
+        X[i, :len(x)] = x
+    return T, X, mask
+
+
+def _phasors(T, freqs):
+    """
+    exp(2πi·f·t) for every frequency and sample. On a uniform frequency grid
+    the phasors follow by recurrence (one complex multiply per element instead
+    of a complex exponential).
+    """
+    df = np.diff(freqs)
+    if len(freqs) < 3 or not np.allclose(df, df[0], rtol=1e-9, atol=0):
+        return np.exp((2j * np.pi) * freqs[None, :, None] * T[:, None, :])
+    z = np.empty((T.shape[0], len(freqs), T.shape[1]), dtype=complex)
+    z[:, 0] = np.exp((2j * np.pi) * freqs[0] * T)
+    step = np.exp((2j * np.pi) * df[0] * T)
+    for k in range(1, len(freqs)):
+        np.multiply(z[:, k - 1], step, out=z[:, k])
+    return z
+
+
+def _lomb_scargle_chunk(T, X, mask, freqs):
+    """Classical (mean-subtracted) Lomb–Scargle power for a chunk of padded segments."""
+    w = mask.astype(float)
+    n = w.sum(axis=1)
+    Xc = (X - (X * w).sum(axis=1, keepdims=True) / np.maximum(n, 1)[:, None]) * w
+
+    z = _phasors(T, freqs)                                             # (batch, freq, beats)
+    Z1 = np.matmul(z, Xc[:, :, None].astype(complex))[..., 0]          # Σ x·e^{iωt}
+    Z2 = np.matmul(z * z, w[:, :, None].astype(complex))[..., 0]       # Σ e^{2iωt}
+    C, S = Z1.real, Z1.imag
+    CC = 0.5 * (n[:, None] + Z2.real)
+    SS = n[:, None] - CC
+    CS = 0.5 * Z2.imag
+    # Equivalent to the tau-shifted form: P = ½ (SS·C² − 2·CS·C·S + CC·S²) / (CC·SS − CS²)
+    den = CC * SS - CS * CS
+    with np.errstate(invalid="ignore", divide="ignore"):
+        P = 0.5 * (SS * C * C - 2 * CS * C * S + CC * S * S) / den
+    return np.where(den > 1e-12 * n[:, None] ** 2, P, 0.0)
+
+
+def lomb_scargle_psd(times, values, freqs=default_freqs, chunk_elements=default_chunk_elements):
+    """
+    One-sided Lomb–Scargle PSD of many unevenly sampled series at once.
+
+    `times` / `values` are lists of 1-D arrays (s, and e.g. RR in ms), or
+    already padded 2-D arrays. Returns (freqs, psd) with psd of shape
+    (n_segments, n_freqs) in units of values² / Hz; rows of segments with
+    fewer than `min_beats` beats (including empty ones) are NaN.
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        T, X = np.asarray(times, dtype=float), values.astype(float)
+        mask = ~np.isnan(X)
+        X = np.nan_to_num(X)
+    else:
+        T, X, mask = pad_segments(times, values)
+    n = mask.sum(axis=1)
+    span = (np.where(mask, T, -np.inf).max(axis=1, initial=-np.inf)
+            - np.where(mask, T, np.inf).min(axis=1, initial=np.inf))
+
+    psd = np.zeros((len(X), len(freqs)))
+    step = max(1, chunk_elements // max(len(freqs) * X.shape[1], 1))
+    for lo in range(0, len(X), step):
+        sl = slice(lo, lo + step)
+        psd[sl] = _lomb_scargle_chunk(T[sl], X[sl], mask[sl], freqs)
+    # P ~ A²N/4 for a sinusoid of amplitude A; 2·P·span/N integrates to the variance.
+    # Fewer than `min_beats` beats -> NaN PSD
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(n >= min_beats, 2 * span / np.maximum(n, 1), np.nan)
+    return freqs, psd * scale[:, None]
+
+
+def band_powers(freqs, psd, lf=LF_BAND, hf=HF_BAND, span=None):
+    """
+    LF / HF power (trapezoid over the PSD), LF/HF ratio, normalized units and HF peak, per segment.
+
+    With `span` (s, per segment), the HF peak is NaN for segments shorter
+    than one period of the lowest HF frequency, which cannot resolve it.
+    """
+    psd = np.atleast_2d(psd)
+
+    def power(band):
+        sel = (freqs >= band[0]) & (freqs <= band[1])
+        return np.trapezoid(psd[:, sel], freqs[sel], axis=1)
+
+    lf_p, hf_p = power(lf), power(hf)
+    hf_sel = (freqs >= hf[0]) & (freqs <= hf[1])
+    # No peak without a finite, non-zero HF spectrum (too few beats, or a constant tachogram)
+    hf_peak = freqs[hf_sel][np.argmax(np.nan_to_num(psd[:, hf_sel]), axis=1)]
+    resolved = np.isfinite(hf_p) & (hf_p > 0)
+    if span is not None:
+        resolved &= np.asarray(span, dtype=float) * hf[0] >= 1.0
+    hf_peak = np.where(resolved, hf_peak, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "LF_ms2": lf_p,
+            "HF_ms2": hf_p,
+            "LF_HF": lf_p / hf_p,
+            "LF_nu": 100 * lf_p / (lf_p + hf_p),
+            "HF_nu": 100 * hf_p / (lf_p + hf_p),
+            "HF_peak_Hz": hf_peak,
+        }
+
+
+def sliding_segments(t, rr, window=120.0, hop=30.0):
+    """
+    Split one tachogram into windows [start, start + window) on a hop-spaced
+    grid starting at the first beat's onset (same grid as hrv_stream time windows).
+    Returns (starts, list of t, list of rr).
+    """
+    t = np.asarray(t, dtype=float)
+    rr = np.asarray(rr, dtype=float)
+    if len(t) == 0:
+        return np.array([]), [], []
+    origin = t[0] - rr[0] / 1000.0
+    starts = origin + hop * np.arange(max(int(np.floor((t[-1] - origin - window) / hop)) + 1, 0))
+    lo = np.searchsorted(t, starts, side="left")
+    hi = np.searchsorted(t, starts + window, side="left")
+    return starts, [t[a:b] for a, b in zip(lo, hi)], [rr[a:b] for a, b in zip(lo, hi)]
+
+
+def frequency_features(t, rr, freqs=default_freqs):
+    """LF/HF features of a single whole tachogram (t in s, rr in ms); NaN for fewer than `min_beats` beats."""
+    t = np.asarray(t, dtype=float)
+    f, psd = lomb_scargle_psd([t], [np.asarray(rr, dtype=float)], freqs)
+    span = t[-1] - t[0] if len(t) else 0.0
+    return {k: float(v[0]) for k, v in band_powers(f, psd, span=[span]).items()}
+
+
+def windowed_frequency_features(t, rr, window=120.0, hop=30.0, freqs=default_freqs, min_beats=10):
+    """LF/HF per sliding window of one tachogram, all windows in one batched periodogram."""
+    starts, ts, rrs = sliding_segments(t, rr, window, hop)
+    keep = [i for i, x in enumerate(rrs) if len(x) >= min_beats]
+    rows = {"t_start": starts[keep], "t_end": starts[keep] + window}
+    if keep:
+        f, psd = lomb_scargle_psd([ts[i] for i in keep], [rrs[i] for i in keep], freqs)
+        rows.update(band_powers(f, psd, span=[ts[i][-1] - ts[i][0] for i in keep]))
+    return rows
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental sliding-window HRV (time domain).
+
+RR intervals are pushed one beat at a time; the window keeps running sums
+of RR, RR² and squared successive differences, so each new beat costs O(1)
+(every beat enters and leaves the window exactly once) and windows are
+never recomputed from scratch. Windows are either a number of beats or a
+duration in seconds, with a configurable hop.
+
+    hrv = SlidingHRV(window=60, hop=10, unit="s")
+    for rr in rr_stream:                  # RR intervals in ms
+        for row in hrv.push(rr):
+            ...                           # one dict per completed window
+
+Metrics match `compute_hrv_features` in feature_exytraction.py (RR_mean_ms,
+SDNN_ms with ddof=0, RMSSD_ms) evaluated on the beats of each window.
+"""
+
+from collections import deque
+
+import numpy as np
+
+WINDOW_UNITS = ("beats", "s")
+
+
+class SlidingHRV:
+    """Rolling RR_mean / SDNN / RMSSD over beat- or time-based windows."""
+
+    def __init__(self, window=60, hop=10, unit="s", min_beats=3):
+        if unit not in WINDOW_UNITS:
+            raise ValueError(f"unit must be one of {WINDOW_UNITS}, got {unit!r}")
+        if window <= 0 or hop <= 0:
+            raise ValueError("window and hop must be positive")
+        self.window = window
+        self.hop = hop
+        self.unit = unit
+        self.min_beats = min_beats
+        self.reset()
+
+    def reset(self):
+        self._beats = deque()   # (beat time [s], RR [ms]) inside the window
+        self._offset = None     # shift applied to RR before summing (numerical stability)
+        self._sum = 0.0
+        self._sum2 = 0.0
+        self._sum_d2 = 0.0      # sum of squared successive differences inside the window
+        self._time = 0.0        # time of the last pushed beat [s]
+        self._n_pushed = 0
+        self._n_emitted = 0     # beat windows emitted so far
+        self._next_emit = None  # end time of the next time window [s]
+
+    # === RUNNING SUMS ===
+    def _add(self, t, rr):
+        if self._offset is None:
+            self._offset = rr
+        x = rr - self._offset
+        if self._beats:
+            d = rr - self._beats[-1][1]
+            self._sum_d2 += d * d
+        self._beats.append((t, rr))
+        self._sum += x
+        self._sum2 += x * x
+
+    def _drop_oldest(self):
+        _, rr = self._beats.popleft()
+        x = rr - self._offset
+        self._sum -= x
+        self._sum2 -= x * x
+        if self._beats:
+            d = self._beats[0][1] - rr
+            self._sum_d2 -= d * d
+
+    def _snapshot(self):
+        n = len(self._beats)
+        mean_x = self._sum / n
+        var = max(self._sum2 / n - mean_x * mean_x, 0.0)
+        rmssd = np.sqrt(max(self._sum_d2, 0.0) / (n - 1)) if n > 1 else np.nan
+        t_start = self._beats[0][0] - self._beats[0][1] / 1000.0
+        return {"t_start": t_start, "t_end": self._beats[-1][0], "n_beats": n,
+                "RR_mean_ms": mean_x + self._offset, "SDNN_ms": np.sqrt(var), "RMSSD_ms": rmssd}
+
+    # === STREAMING ===
+    def push(self, rr, t=None):
+        """
+        Add one RR interval (ms), ending at beat time `t` (s; defaults to the
+        running sum of RR). Returns the list of windows completed by this beat.
+        """
+        rr = float(rr)
+        t = self._time + rr / 1000.0 if t is None else float(t)
+        self._time = t
+        self._n_pushed += 1
+        out = []
+
+        if self.unit == "beats":
+            self._add(t, rr)
+            if len(self._beats) > self.window:
+                self._drop_oldest()
+            if self._n_pushed == self.window + (self._n_emitted * self.hop):
+                self._n_emitted += 1
+                if len(self._beats) >= self.min_beats:
+                    out.append(self._snapshot())
+            return out
+
+        # Time windows [end - window, end) on a hop-spaced grid; a beat past
+        # the end of one or more windows closes them before it is added.
+        if self._next_emit is None:
+            self._next_emit = t - rr / 1000.0 + self.window
+        while t >= self._next_emit:
+            start = self._next_emit - self.window
+            while self._beats and self._beats[0][0] < start:
+                self._drop_oldest()
+            if len(self._beats) >= self.min_beats:
+                row = self._snapshot()
+                row["t_start"], row["t_end"] = start, self._next_emit
+                out.append(row)
+            self._next_emit += self.hop
+        self._add(t, rr)
+        return out
+
+    def extend(self, rr, t=None):
+        """Push many RR intervals; returns all completed windows."""
+        out = []
+        if t is None:
+            for v in rr:
+                out.extend(self.push(v))
+        else:
+            for v, ti in zip(rr, t):
+                out.extend(self.push(v, ti))
+        return out
+
+
+def hrv_trajectory(rr, t=None, window=60, hop=10, unit="s", min_beats=3):
+    """HRV windows of a whole RR series (ms), with optional beat times `t` (s)."""
+    return SlidingHRV(window, hop, unit, min_beats).extend(rr, t)
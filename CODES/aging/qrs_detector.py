@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Numba-compiled Pan–Tompkins style QRS detector.
+
+One pass per channel: 5-point derivative -> squaring -> moving-window
+integration (150 ms) -> adaptive signal/noise peak thresholds with a 200 ms
+refractory period and search-back for missed beats. Detected QRS complexes
+are then located on the input ECG (max within the integration window).
+Batches of records run in parallel (`prange` over records) and the compiled
+kernels are compiled on first use and cached on disk (`cache=True`), so
+importing the module does not load numba and worker processes do not
+re-JIT on startup.
+
+The detector is about as fast as the `find_peaks` detector it replaces in
+feature_exytraction.py (both are a small part of a record's feature time,
+next to the zero-phase filters). It is used for accuracy: the adaptive
+thresholds and search-back keep low-amplitude and noisy beats that a
+fixed 2-sigma height misses. The feature pass runs one record per process,
+so it calls `detect_qrs`. `detect_qrs_batch` is for in-process callers
+with many channels and only helps with several cores.
+
+Run `python -m aging.qrs_detector` for an accuracy / throughput benchmark
+against `find_peaks`.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+integration_window_s = 0.150   # moving-window integration length
+refractory_s = 0.200           # minimum distance between two QRS complexes
+learning_s = 2.0               # initial threshold estimation period
+
+
+# === KERNELS ===
+@lru_cache(maxsize=None)
+def _kernels():
+    """Compiled on first use (numba is not imported with this module)."""
+    from numba import njit, prange
+
+    @njit(cache=True, fastmath=True)
+    def pan_tompkins(x, n, fs, peaks):
+        """Detect QRS complexes in x[:n]; writes R-peak indices to `peaks`, returns their count."""
+        win = max(int(integration_window_s * fs), 1)
+        refractory = int(refractory_s * fs)
+        learn = min(int(learning_s * fs), n)
+
+        # --- Learning phase: thresholds from the first `learn` samples ---
+        ring = np.zeros(win)    # last `win` squared derivative samples
+        acc = 0.0
+        mwi_max = 0.0
+        mwi_sum = 0.0
+        for i in range(learn):
+            d = 0.0
+            if i >= 4:
+                d = (2 * x[i] + x[i - 1] - x[i - 3] - 2 * x[i - 4]) * fs / 8.0
+            acc += d * d - ring[i % win]
+            ring[i % win] = d * d
+            m = acc / win
+            mwi_sum += m
+            if m > mwi_max:
+                mwi_max = m
+        spki = 0.25 * mwi_max
+        npki = 0.5 * mwi_sum / max(learn, 1)
+        thr1 = npki + 0.25 * (spki - npki)
+
+        # --- Detection pass ---
+        count = 0
+        last_qrs = -refractory - 1
+        rr_avg = 0.0
+        best_val = 0.0          # best sub-threshold candidate since last QRS (for search-back)
+        best_idx = -1
+        ring[:] = 0.0
+        acc = 0.0
+        m2 = 0.0                # mwi[i-2]
+        m1 = 0.0                # mwi[i-1]
+        for i in range(n):
+            d = 0.0
+            if i >= 4:
+                d = (2 * x[i] + x[i - 1] - x[i - 3] - 2 * x[i - 4]) * fs / 8.0
+            acc += d * d - ring[i % win]
+            ring[i % win] = d * d
+            m = acc / win
+
+            # local maximum of the integrated signal at i-1
+            if i >= 2 and m1 > m2 and m1 >= m:
+                p = i - 1
+                is_qrs = False
+                if m1 > thr1 and p - last_qrs > refractory:
+                    is_qrs = True
+                    spki = 0.125 * m1 + 0.875 * spki
+                else:
+                    npki = 0.125 * m1 + 0.875 * npki
+                    if p - last_qrs > refractory and m1 > 0.5 * thr1 and m1 > best_val:
+                        best_val = m1
+                        best_idx = p
+
+                # Search-back: no beat for 1.66 x mean RR -> accept best candidate
+                if not is_qrs and count >= 2 and best_idx >= 0 and p - last_qrs > 1.66 * rr_avg:
+                    p = best_idx
+                    spki = 0.25 * best_val + 0.75 * spki
+                    is_qrs = True
+
+                if is_qrs:
+                    # Locate the R peak on the input ECG within the integration window
+                    lo = max(p - win, 0)
+                    r = lo
+                    for k in range(lo, p + 1):
+                        if x[k] > x[r]:
+                            r = k
+                    if count == 0 or r - peaks[count - 1] > refractory:
+                        if count >= 1:
+                            rr = r - peaks[count - 1]
+                            rr_avg = rr if count == 1 else 0.875 * rr_avg + 0.125 * rr
+                        peaks[count] = r
+                        count += 1
+                    last_qrs = p
+                    best_val = 0.0
+                    best_idx = -1
+                thr1 = npki + 0.25 * (spki - npki)
+
+            m2 = m1
+            m1 = m
+        return count
+
+
+    @njit(parallel=True, cache=True)
+    def pan_tompkins_batch(X, lengths, fs, peaks, counts):
+        for r in prange(X.shape[0]):
+            counts[r] = pan_tompkins(X[r], lengths[r], fs, peaks[r])
+
+    return pan_tompkins, pan_tompkins_batch
+
+
+# === PUBLIC API ===
+def detect_qrs(ecg, fs):
+    """R-peak sample indices of one (band-passed) ECG channel."""
+    x = np.ascontiguousarray(ecg, dtype=np.float64)
+    refractory = max(int(refractory_s * fs), 1)
+    peaks = np.empty(len(x) // refractory + 2, dtype=np.int64)
+    pan_tompkins, _ = _kernels()
+    n = pan_tompkins(x, len(x), float(fs), peaks)
+    return peaks[:n].copy()
+
+
+def detect_qrs_batch(signals, fs):
+    """
+    R-peak indices for many ECG channels at once (records run in parallel).
+    `signals` is a list of 1-D arrays (any lengths) or a 2-D (records, samples) array.
+    """
+    lengths = np.array([len(s) for s in signals], dtype=np.int64)
+    if isinstance(signals, np.ndarray) and signals.ndim == 2:
+        X = np.ascontiguousarray(signals, dtype=np.float64)
+    else:
+        X = np.zeros((len(signals), lengths.max() if len(lengths) else 0))
+        for i, s in enumerate(signals):
+            X[i, :len(s)] = s
+    refractory = max(int(refractory_s * fs), 1)
+    peaks = np.empty((len(lengths), X.shape[1] // refractory + 2), dtype=np.int64)
+    counts = np.zeros(len(lengths), dtype=np.int64)
+    _, pan_tompkins_batch = _kernels()
+    pan_tompkins_batch(X, lengths, float(fs), peaks, counts)
+    return [peaks[i, :counts[i]].copy() for i in range(len(lengths))]
+
+
+# === BENCHMARK ===
+def synthetic_ecg(n_samples, fs, rng, hr_bpm=70.0, hrv=0.05, noise=0.05, wander=0.3):
+    """Synthetic ECG (P/QRS/T Gaussians + baseline wander + noise) and its true R-peak indices."""
+    t = np.arange(n_samples) / fs
+    beats = []
+    pos = 0.5
+    while pos < t[-1] - 0.5:
+        beats.append(pos)
+        pos += 60.0 / hr_bpm * (1 + hrv * rng.standard_normal())
+    beats = np.array(beats)
+    ecg = np.zeros(n_samples)
+    for amp, offset, width in ((0.15, -0.18, 0.025), (-0.1, -0.03, 0.008), (1.0, 0.0, 0.010),
+                               (-0.2, 0.03, 0.008), (0.3, 0.28, 0.06)):
+        centres = ((beats + offset) * fs).astype(int)
+        half = int(4 * width * fs)
+        kernel = amp * np.exp(-0.5 * (np.arange(-half, half + 1) / (width * fs)) ** 2)
+        impulses = np.zeros(n_samples)
+        impulses[centres[(centres >= 0) & (centres < n_samples)]] = 1
+        ecg += np.convolve(impulses, kernel, mode="same")
+    ecg += wander * np.sin(2 * np.pi * 0.25 * t) + noise * rng.standard_normal(n_samples)
+    return ecg, np.round(beats * fs).astype(int)
+
+
+def match_peaks(detected, truth, tolerance):
+    """Sensitivity and positive predictivity with a +/- `tolerance` samples window."""
+    if len(truth) == 0 or len(detected) == 0:
+        return 0.0, 0.0
+    idx = np.clip(np.searchsorted(detected, truth), 1, len(detected) - 1)
+    nearest = np.minimum(np.abs(detected[idx] - truth), np.abs(detected[idx - 1] - truth))
+    tp = int(np.sum(nearest <= tolerance))
+    return tp / len(truth), min(tp / len(detected), 1.0)
+
+
+if __name__ == "__main__":
+    import time
+    from scipy.signal import butter, filtfilt, find_peaks
+
+    fs = 1000
+    n_records, minutes = 16, 10
+    rng = np.random.default_rng(0)
+    b, a = butter(2, [0.5 / (fs / 2), 40 / (fs / 2)], btype='band')
+    records, truths = [], []
+    for _ in range(n_records):
+        ecg, truth = synthetic_ecg(minutes * 60 * fs, fs, rng, hr_bpm=rng.uniform(55, 95),
+                                   noise=rng.uniform(0.02, 0.15))
+        records.append(filtfilt(b, a, ecg))
+        truths.append(truth)
+    n_samples = sum(len(r) for r in records)
+    tol = int(0.05 * fs)
+
+    t0 = time.perf_counter()
+    detect_qrs_batch([r[:fs * 5] for r in records[:2]], fs)
+    print(f"JIT warm-up (or cache load): {time.perf_counter() - t0:.2f} s")
+
+    def best_of(fn, repeat=5):
+        secs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            res = fn()
+            secs.append(time.perf_counter() - t0)
+        return res, min(secs)
+
+    runs = (
+        ("find_peaks", best_of(lambda: [find_peaks(x, distance=int(0.6 * fs), height=np.std(x) * 2)[0]
+                                        for x in records])),
+        ("detect_qrs", best_of(lambda: [detect_qrs(x, fs) for x in records])),
+        ("detect_qrs_batch", best_of(lambda: detect_qrs_batch(records, fs))),
+    )
+    for name, (res, secs) in runs:
+        se, ppv = np.mean([match_peaks(d, tr, tol) for d, tr in zip(res, truths)], axis=0)
+        print(f"{name:>16}: Se={se:.4f} PPV={ppv:.4f}  {secs:.3f} s  "
+              f"({n_samples / secs / 1e6:.1f} M samples/s, {n_records / secs:.1f} records/s)")
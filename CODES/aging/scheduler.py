@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Thread-budget-aware process pool for the per-record pipelines.
+
+A global core budget is split into `workers` processes x `threads` per
+worker. Each worker is started with every thread pool capped at `threads`
+(OpenMP/BLAS via environment + threadpoolctl when installed, Numba via
+NUMBA_NUM_THREADS / set_num_threads, scipy.fft via AA_FFT_WORKERS, or
+spectrogram_engine.default_workers once imported) and with the non-interactive Agg
+Matplotlib backend, so N workers never spawn N x cores threads.
+
+Records are submitted longest-first by their header size (samples x
+channels) so the largest records do not end up as stragglers at the tail
+of the run. Every task reports its wall and CPU time, from which the pool
+reports the achieved utilization of the budget:
+
+    budget = plan_budget(cores=32, threads=4)            # -> 8 workers x 4 threads
+    with BudgetExecutor(budget) as pool:
+        for record, result, err, wall, cpu in pool.run(process, records, cost=record_cost):
+            ...
+    print(pool.report())
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMBA_NUM_THREADS")
+
+
+# === BUDGET ===
+@dataclass(frozen=True)
+class Budget:
+    workers: int
+    threads: int
+
+    @property
+    def cores(self):
+        return self.workers * self.threads
+
+
+def plan_budget(cores=None, workers=None, threads=None):
+    """
+    Split `cores` (default: all) into workers x threads. Give either count
+    (the other is derived) or neither (one single-threaded worker per core).
+    """
+    cores = cores or os.cpu_count() or 1
+    if workers and threads:
+        return Budget(workers, threads)
+    if threads:
+        return Budget(max(1, cores // threads), threads)
+    if workers:
+        return Budget(workers, max(1, cores // workers))
+    return Budget(cores, 1)
+
+
+def thread_env(threads):
+    """Environment capping every native thread pool at `threads` and selecting Agg."""
+    env = {name: str(threads) for name in THREAD_ENV_VARS}
+    env["AA_FFT_WORKERS"] = str(threads)      # read by spectrogram_engine at import
+    env["MPLBACKEND"] = "Agg"
+    return env
+
+
+# === WORKER SIDE ===
+def _init_worker(threads):
+    """
+    Runs once per worker: enforce the thread cap on pools that are already
+    loaded. Libraries not imported yet pick the cap up from the environment,
+    so the worker does not pay for importing stages it may never run.
+    """
+    os.environ.update(thread_env(threads))
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+    if "numba" in sys.modules:
+        import numba
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    engine = sys.modules.get(f"{__package__}.spectrogram_engine")
+    if engine is not None:
+        engine.default_workers = threads
+    if "matplotlib" in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+
+
+def timed(process, record):
+    """Run one record; returns (record, result, error, wall seconds, CPU seconds of all threads)."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        result, err = process(record), None
+    except Exception as e:
+        result, err = None, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}"
+    return record, result, err, time.perf_counter() - wall, time.process_time() - cpu
+
+
+# === ORDERING ===
+def record_cost(path):
+    """
+    Work estimate of a record: samples x channels from its header, else the .dat
+    size (unreadable or unsupported header, or unknown length n_samples = -1).
+    """
+    from .wfdb_reader import read_header
+    base = os.path.splitext(path)[0]
+    try:
+        header = read_header(base)
+        if header.n_samples > 0:
+            return header.n_samples * max(header.n_sig, 1)
+    except (OSError, ValueError, NotImplementedError):
+        pass
+    try:
+        from . import zip_source
+        return zip_source.getsize(base + ".dat")
+    except OSError:
+        return 0
+
+
+def longest_first(records, cost):
+    return sorted(records, key=cost, reverse=True)
+
+
+# === EXECUTOR ===
+class BudgetExecutor:
+    """ProcessPoolExecutor sized and initialized from a Budget, with utilization accounting."""
+
+    def __init__(self, budget, start_method="spawn"):
+        self.budget = budget
+        self.start_method = start_method
+        self.busy = 0.0      # summed task wall time
+        self.cpu = 0.0       # summed task CPU time (all threads)
+        self.tasks = 0
+        self.elapsed = 0.0
+        self._pool = None
+
+    def __enter__(self):
+        # Spawned workers inherit the environment at creation: thread caps apply before numpy loads
+        saved = {k: os.environ.get(k) for k in thread_env(1)}
+        os.environ.update(thread_env(self.budget.threads))
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.budget.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker, initargs=(self.budget.threads,))
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown()
+        self.elapsed = time.perf_counter() - self._start
+
+    def run(self, process, records, cost=None):
+        """Yield (record, result, error, wall, cpu) as tasks finish, submitting longest-first."""
+        if cost is not None:
+            records = longest_first(records, cost)
+        futures = [self._pool.submit(timed, process, r) for r in records]
+        for fut in as_completed(futures):
+            out = fut.result()
+            self.busy += out[3]
+            self.cpu += out[4]
+            self.tasks += 1
+            yield out
+        self.elapsed = time.perf_counter() - self._start
+
+    def report(self):
+        elapsed = self.elapsed or (time.perf_counter() - self._start)
+        return dict(utilization(self.budget, elapsed, self.busy, self.cpu), tasks=self.tasks)
+
+
+def utilization(budget, elapsed, busy, cpu):
+    """
+    Achieved use of a budget: worker occupancy (task wall time / workers x
+    elapsed), CPU utilization (task CPU time / cores x elapsed) and the mean
+    number of busy threads per task (CPU / wall).
+    """
+    return {
+        "workers": budget.workers, "threads": budget.threads, "elapsed_s": round(elapsed, 3),
+        "worker_occupancy": busy / (elapsed * budget.workers) if elapsed else 0.0,
+        "cpu_utilization": cpu / (elapsed * budget.cores) if elapsed else 0.0,
+        "threads_used_per_task": cpu / busy if busy else 0.0,
+    }
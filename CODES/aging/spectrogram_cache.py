@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed on-disk cache of spectrogram tensors.
+
+Entries are keyed by the checksum of the record files (.hea + .dat) plus
+every parameter that changes the result (fs, nperseg, noverlap, window,
+band mask, normalization, ...). Each entry is one compressed `.npz` chunk
+holding the per-channel `f`, `t` and `Sxx` arrays. The cache is size-bounded
+with LRU eviction (entry mtime is bumped on every hit), and is safe to share
+between worker processes: entries are written atomically and there is no
+central index file to race on. Each process keeps a running total of the
+cache size and only rescans the entries when that total passes the budget;
+eviction then frees down to `evict_low_water` of it, so a full cache is not
+rescanned on every write. Unreadable entries (truncated or corrupt archives)
+are cache misses and get rewritten.
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from . import zip_source
+
+default_max_bytes = 2 * 1024 ** 3  # 2 GiB
+evict_low_water = 0.9              # eviction frees down to this fraction of max_bytes
+_CHUNK = 1 << 20
+
+
+def _hash_file(path, h):
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(block)
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class SpectrogramCache:
+    """Size-bounded LRU cache of (f, t, Sxx) lists, one entry per record + parameter set."""
+
+    def __init__(self, cache_dir, max_bytes=default_max_bytes, compress=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_written = 0
+        self._total = None     # running size of the entries, from the first scan on
+        os.makedirs(os.path.join(cache_dir, "entries"), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, "checksums"), exist_ok=True)
+
+    # === KEYS ===
+    def record_checksum(self, record_path):
+        """
+        BLAKE2b of the record's .hea and .dat files.
+
+        Memoized on disk by (path, size, mtime) so unchanged records are
+        hashed only once across runs. Records inside a zip are keyed by the
+        member names, sizes and CRC-32s of the central directory instead,
+        which identifies their contents without decompressing anything.
+        """
+        base = os.path.splitext(record_path)[0]
+        loc = zip_source.resolve(base)
+        if loc is not None:
+            archive, member = loc
+            h = hashlib.blake2b(digest_size=20)
+            for name in (member + ".hea", member + ".dat"):
+                if archive.exists(name):
+                    h.update(f"{name}:{archive.size(name)}:{archive.crc(name):08x};".encode())
+            return h.hexdigest()
+        files = [p for p in (base + ".hea", base + ".dat") if os.path.exists(p)]
+        stamp = [(os.path.getsize(p), os.stat(p).st_mtime_ns) for p in files]
+        memo = os.path.join(self.cache_dir, "checksums",
+                            hashlib.sha1(os.path.abspath(base).encode()).hexdigest() + ".json")
+        try:
+            with open(memo) as fh:
+                saved = json.load(fh)
+            if saved["stamp"] == [list(s) for s in stamp]:
+                return saved["checksum"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        h = hashlib.blake2b(digest_size=20)
+        for p in files:
+            _hash_file(p, h)
+        checksum = h.hexdigest()
+
+        def write(tmp):
+            with open(tmp, "w") as fh:
+                json.dump({"stamp": stamp, "checksum": checksum}, fh)
+        _atomic_write(memo, write)
+        return checksum
+
+    @staticmethod
+    def make_key(checksum, params):
+        """Cache key for a record checksum + parameter dict (order-independent)."""
+        blob = json.dumps({"record": checksum, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, "entries", key[:2], key + ".npz")
+
+    # === GET / PUT ===
+    def get(self, key):
+        """Return the cached list of (f, t, Sxx) or None."""
+        path = self._entry_path(key)
+        try:
+            with np.load(path) as npz:
+                n = int(npz["n_channels"])
+                spectra = [(npz[f"f{ch}"], npz[f"t{ch}"], npz[f"Sxx{ch}"]) for ch in range(n)]
+            os.utime(path)  # LRU: a hit makes the entry most recently used
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return spectra
+
+    def put(self, key, spectra):
+        """Store a list of (f, t, Sxx) and evict least recently used entries if over budget."""
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"n_channels": np.array(len(spectra))}
+        for ch, (f, t, Sxx) in enumerate(spectra):
+            arrays[f"f{ch}"], arrays[f"t{ch}"], arrays[f"Sxx{ch}"] = f, t, Sxx
+        save = np.savez_compressed if self.compress else np.savez
+
+        def write(tmp):
+            with open(tmp, "wb") as fh:
+                save(fh, **arrays)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        _atomic_write(path, write)
+        size = os.path.getsize(path)
+        self.bytes_written += size
+        if self._total is None:
+            self._total = self.size_bytes()
+        else:
+            self._total += size - replaced
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, record_path, params, compute):
+        """
+        Return cached spectra for `record_path` + `params`, else call
+        `compute()` (which must return a list of (f, t, Sxx)) and store it.
+        """
+        key = self.make_key(self.record_checksum(record_path), params)
+        spectra = self.get(key)
+        if spectra is None:
+            spectra = compute()
+            self.put(key, spectra)
+        return spectra
+
+    # === EVICTION / STATS ===
+    def _entries(self):
+        root = os.path.join(self.cache_dir, "entries")
+        for sub in os.listdir(root):
+            subdir = os.path.join(root, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.endswith(".npz"):
+                    p = os.path.join(subdir, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue  # evicted concurrently by another worker
+                    yield st.st_mtime, st.st_size, p
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Rescan the entries and, if they exceed max_bytes, delete the least
+        recently used ones until `evict_low_water` of max_bytes is reached.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * evict_low_water if total > self.max_bytes else total
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+                self.evictions += 1
+            except OSError:
+                pass
+            total -= size
+        self._total = total
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes_written": self.bytes_written,
+        }
+
+
+_COUNTERS = ("hits", "misses", "evictions", "bytes_written")
+
+
+@lru_cache(maxsize=None)
+def worker_cache(cache_dir, max_bytes=default_max_bytes):
+    """
+    One SpectrogramCache per process and (folder, budget), reused by every
+    record the process handles, so its running size total carries over.
+    """
+    return SpectrogramCache(cache_dir, max_bytes)
+
+
+def _with_hit_rate(counts):
+    lookups = counts["hits"] + counts["misses"]
+    counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+    return counts
+
+
+def stats_delta(after, before):
+    """Counters of one job on a shared cache: stats() after minus stats() before it."""
+    return _with_hit_rate({k: after[k] - before.get(k, 0) for k in _COUNTERS})
+
+
+def merge_stats(stats_list):
+    """Sum per-job stats dicts (stats_delta) returned by several worker processes."""
+    total = dict.fromkeys(_COUNTERS, 0)
+    for s in stats_list:
+        for k in total:
+            total[k] += s.get(k, 0)
+    return _with_hit_rate(total)
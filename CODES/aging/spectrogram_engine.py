@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming STFT engine for arbitrarily long recordings.
+
+Reads a record in fixed-size blocks, carries the `nperseg - step` overlap
+between blocks and yields spectrogram columns as it goes. Output matches
+`scipy.signal.spectrogram` (PSD mode, one-sided, density scaling, constant
+detrend) column for column, while peak memory is bounded by the block size
+instead of the recording length.
+
+Passing `band=(fmin, fmax)` switches to a band-limited ("zoom") mode: only
+`n_bins` frequencies inside the band are evaluated, through a precomputed
+windowed DFT bank (equivalent to a Goertzel bank, applied as one GEMM per
+chunk of frames) instead of a full rfft followed by a mask.
+
+The full-band frame -> PSD step is pluggable (NumPy, scipy.fft, Numba or
+CuPy, see stft_backends.py). The default is "scipy_fft"; $AA_STFT_BACKEND
+selects another backend, or "auto" for the fastest one that matches SciPy
+on this machine.
+`spectrogram()` is the one-shot entry point over the same backends.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+from scipy import fft as sp_fft
+
+from .wfdb_reader import open_record
+from .stft_backends import resolve_backend
+
+default_block_size = 1_000_000   # samples per streamed block (~17 min at 1 kHz)
+default_frame_chunk = 4096       # frames tapered + FFT'd at once inside a block
+default_band_bins = 64           # frequencies evaluated in band-limited mode
+default_workers = int(os.environ.get("AA_FFT_WORKERS", -1))  # scipy.fft worker threads for batched transforms (-1 = all cores; set per worker by scheduler.py)
+default_max_pad = 0.1            # max fraction of a batch that may be zero padding
+default_backend = os.environ.get("AA_STFT_BACKEND", "scipy_fft")  # frame -> PSD backend; "auto" = fastest probed (see stft_backends.py)
+
+
+# === STFT PARAMETERS (SAME DEFAULTS AS scipy.signal.spectrogram) ===
+def stft_params(fs, nperseg, noverlap=None, window=("tukey", 0.25), dtype=np.float64):
+    """Resolve window, step, frequency axis and PSD scale the way SciPy does."""
+    if noverlap is None:
+        noverlap = nperseg // 8
+    if noverlap >= nperseg:
+        raise ValueError("noverlap must be less than nperseg.")
+    from scipy.signal import get_window
+    outdtype = np.result_type(dtype, np.complex64)
+    win = get_window(window, nperseg)
+    if np.result_type(win, np.complex64) != outdtype:
+        win = win.astype(np.finfo(outdtype).dtype)   # real counterpart of SciPy's complex cast
+    scale = 1.0 / (fs * (win * win).sum())
+    freqs = sp_fft.rfftfreq(nperseg, 1 / fs)
+    return win, nperseg - noverlap, freqs, scale, outdtype
+
+
+@lru_cache(maxsize=32)
+def _band_bank(fs, nperseg, fmin, fmax, n_bins, window, sym):
+    """Windowed DFT bank [w*cos | -w*sin] of shape (nperseg, 2*n_bins) for the band."""
+    from scipy.signal import get_window
+    win = get_window(window, nperseg, fftbins=not sym)
+    freqs = np.linspace(fmin, fmax, n_bins)
+    phase = 2 * np.pi * np.outer(np.arange(nperseg), freqs) / fs
+    bank = np.hstack([win[:, None] * np.cos(phase), -win[:, None] * np.sin(phase)])
+    return freqs, bank
+
+
+def band_bank(fs, nperseg, band, n_bins=default_band_bins, window=("tukey", 0.25), sym=False):
+    """
+    Frequencies and DFT bank for band-limited mode (cached per parameter set).
+    `sym=True` uses the symmetric window (e.g. np.hanning) instead of SciPy's periodic one.
+    """
+    return _band_bank(float(fs), int(nperseg), float(band[0]), float(band[1]), int(n_bins),
+                      window, bool(sym))
+
+
+def spectrogram_freqs(fs, nperseg, band=None, n_bins=default_band_bins):
+    """Frequency axis produced by iter_spectrogram for these parameters."""
+    if band is None:
+        return sp_fft.rfftfreq(nperseg, 1 / fs)
+    return np.linspace(band[0], band[1], n_bins)
+
+
+def _frames_to_band_psd(frames, freqs, bank, scale, fs, outdtype, xp=np):
+    """
+    Detrended band PSD of a (..., n_frames, nperseg) block through the DFT bank.
+    With `xp=cupy` (and `bank` on the device) the product runs on the GPU.
+    """
+    seg = xp.array(frames, dtype=bank.dtype)  # contiguous copy so the product goes through BLAS
+    seg -= seg.mean(axis=-1, keepdims=True)
+    Y = seg @ bank
+    n_bins = len(freqs)
+    P = Y[..., :n_bins] ** 2 + Y[..., n_bins:] ** 2
+    P *= scale
+    # One-sided doubling, except at DC and Nyquist which have no mirror image
+    P[..., xp.asarray((freqs > 0) & (freqs < fs / 2))] *= 2
+    return xp.swapaxes(P.astype(np.finfo(outdtype).dtype), -1, -2)
+
+
+def _frames_to_psd(frames, win, scale, nperseg, outdtype, workers=None, backend=None, window=("tukey", 0.25)):
+    """
+    Detrend, taper and FFT a (..., n_frames, nperseg) block; returns (..., n_freq, n_frames).
+    `backend` is a stft_backends name or "auto" (default: `default_backend`).
+    """
+    psd = resolve_backend(backend or default_backend, frames, np.finfo(outdtype).dtype, workers, window)
+    return psd(frames, win, scale, nperseg, outdtype, workers)
+
+
+# === ONE-SHOT STFT (ANY BACKEND) ===
+def spectrogram(x, fs, nperseg=256, noverlap=None, window=("tukey", 0.25), backend=None, workers=None):
+    """
+    scipy.signal.spectrogram (PSD, one-sided, density, constant detrend) of
+    `x` along its last axis, through a selectable backend: "scipy" (the
+    reference itself), any stft_backends name, or "auto" (fastest verified).
+    Returns (f, t, Sxx) with Sxx of shape (..., n_freq, n_frames).
+    """
+    backend = backend or default_backend
+    x = np.asarray(x)
+    if backend == "scipy":
+        from scipy import signal
+        return signal.spectrogram(x, fs, window=window, nperseg=nperseg, noverlap=noverlap)
+    win, step, f, scale, outdtype = stft_params(fs, nperseg, noverlap, window, x.dtype)
+    if x.shape[-1] < nperseg:
+        return f, np.empty(0), np.empty(x.shape[:-1] + (len(f), 0), dtype=np.finfo(outdtype).dtype)
+    frames = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[..., ::step, :]
+    Sxx = _frames_to_psd(frames, win, scale, nperseg, outdtype, workers, backend, window)
+    t = (np.arange(frames.shape[-2]) * step + nperseg / 2) / float(fs)
+    return f, t, Sxx
+
+
+# === STREAMING CORE ===
+def iter_spectrogram(blocks, fs, nperseg=256, noverlap=None, window=("tukey", 0.25),
+                     frame_chunk=default_frame_chunk, band=None, n_bins=default_band_bins, backend=None):
+    """
+    Stream an STFT over an iterable of 1-D sample blocks.
+
+    Yields (t, Sxx) pairs where `t` holds the centre times of the columns
+    produced from the current block and `Sxx` is (n_freq, len(t)).
+    The frequency axis is `spectrogram_freqs(fs, nperseg, band, n_bins)`.
+    """
+    if band is not None:
+        freqs, bank = band_bank(fs, nperseg, band, n_bins, window)
+    win, step, _, scale, outdtype = None, None, None, None, None
+    carry = None
+    consumed = 0  # absolute sample index of carry[0]
+
+    for block in blocks:
+        block = np.asarray(block)
+        if win is None:
+            win, step, _, scale, outdtype = stft_params(fs, nperseg, noverlap, window, block.dtype)
+            carry = block[:0]
+        buf = np.concatenate([carry, block]) if len(carry) else block
+        if len(buf) < nperseg:
+            carry = buf
+            continue
+
+        n_frames = (len(buf) - nperseg) // step + 1
+        frames = np.lib.stride_tricks.sliding_window_view(buf, nperseg)[::step]
+        for i in range(0, n_frames, frame_chunk):
+            j = min(i + frame_chunk, n_frames)
+            if band is None:
+                Sxx = _frames_to_psd(frames[i:j], win, scale, nperseg, outdtype, backend=backend, window=window)
+            else:
+                Sxx = _frames_to_band_psd(frames[i:j], freqs, bank, scale, fs, outdtype)
+            t = (consumed + np.arange(i, j) * step + nperseg / 2) / float(fs)
+            yield t, Sxx
+
+        carry = buf[n_frames * step:].copy()
+        consumed += n_frames * step
+
+
+def iter_record_blocks(record, channel, block_size=default_block_size, sampfrom=0, sampto=None):
+    """Yield physical-unit blocks of one channel of a LazyRecord."""
+    sampto = record.n_samples if sampto is None else min(sampto, record.n_samples)
+    for start in range(sampfrom, sampto, block_size):
+        yield record.physical([channel], start, min(start + block_size, sampto))[:, 0]
+
+
+def stream_record_spectrogram(record_path, channel, nperseg=256, noverlap=None,
+                              window=("tukey", 0.25), block_size=default_block_size,
+                              band=None, n_bins=default_band_bins):
+    """Stream spectrogram columns of one channel straight from a WFDB record on disk."""
+    rec = open_record(record_path)
+    blocks = iter_record_blocks(rec, channel, block_size)
+    yield from iter_spectrogram(blocks, rec.fs, nperseg, noverlap, window,
+                                band=band, n_bins=n_bins)
+
+
+def band_spectrogram(x, fs, nperseg=256, noverlap=None, band=(1.0, 2.0),
+                     n_bins=default_band_bins, window=("tukey", 0.25)):
+    """
+    Band-limited PSD spectrogram of an in-memory 1-D signal.
+
+    Returns (f, t, Sxx) like scipy.signal.spectrogram, but `f` holds `n_bins`
+    evenly spaced frequencies in `band` and only those are computed.
+    """
+    x = np.asarray(x)
+    t, Sxx = collect(iter_spectrogram([x], fs, nperseg, noverlap, window,
+                                      band=band, n_bins=n_bins), n_bins)
+    return spectrogram_freqs(fs, nperseg, band, n_bins), t, Sxx
+
+
+def iter_normalized_spectrogram(columns, f, fmin=None, fmax=None):
+    """
+    Per-column PSD normalization (+ optional band mask) on a column stream.
+
+    Normalization is column-local, so it commutes with streaming.
+    """
+    mask = np.ones(len(f), dtype=bool)
+    if fmin is not None:
+        mask &= f >= fmin
+    if fmax is not None:
+        mask &= f <= fmax
+    for t, Sxx in columns:
+        Sxx_norm = Sxx / (np.sum(Sxx, axis=0, keepdims=True) + 1e-12)
+        yield t, Sxx_norm[mask, :]
+
+
+# === BATCHED STFT (MANY CHANNELS / RECORDS IN ONE CALL) ===
+def bucket_by_length(lengths, max_pad=default_max_pad):
+    """
+    Group signal indices into buckets whose members are within `max_pad` of
+    the bucket's longest length, so padding each bucket to its longest
+    member wastes at most that fraction.
+    """
+    order = np.argsort(lengths, kind="stable")[::-1]
+    buckets, current, longest = [], [], 0
+    for idx in order:
+        if current and lengths[idx] < (1 - max_pad) * longest:
+            buckets.append(current)
+            current = []
+        if not current:
+            longest = lengths[idx]
+        current.append(int(idx))
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def batch_spectrogram(signals, fs, nperseg=256, noverlap=None, window=("tukey", 0.25),
+                      band=None, n_bins=default_band_bins, workers=None,
+                      max_pad=default_max_pad, backend=None):
+    """
+    STFT of a whole stack of signals in one vectorized call per length bucket.
+
+    `signals` is a (batch, samples) array (e.g. `data.T` for all channels of a
+    record) or a list of 1-D arrays of different lengths (channels from several
+    records). Windowing and the FFT (`backend`, with `workers` threads) run
+    over the full bucket at once. Returns (f, t, Sxx) where `t` and `Sxx` are lists
+    in input order; each (t[i], Sxx[i]) equals scipy.signal.spectrogram of
+    signals[i] (or the band-limited variant when `band` is given).
+    """
+    workers = default_workers if workers is None else workers
+    if isinstance(signals, np.ndarray) and signals.ndim == 2:
+        buckets = [list(range(signals.shape[0]))]
+        lengths = [signals.shape[1]] * signals.shape[0]
+    else:
+        signals = [np.asarray(x) for x in signals]
+        lengths = [len(x) for x in signals]
+        buckets = bucket_by_length(lengths, max_pad)
+
+    if isinstance(signals, np.ndarray):
+        dtype = signals.dtype
+    else:
+        dtype = np.result_type(*signals) if signals else np.float64
+    win, step, f, scale, outdtype = stft_params(fs, nperseg, noverlap, window, dtype)
+    if band is not None:
+        f, bank = band_bank(fs, nperseg, band, n_bins, window)
+
+    t_out, S_out = [None] * len(lengths), [None] * len(lengths)
+    for bucket in buckets:
+        if isinstance(signals, np.ndarray):
+            stack = signals
+        else:
+            stack = np.zeros((len(bucket), max(lengths[i] for i in bucket)), dtype=dtype)
+            for row, idx in enumerate(bucket):
+                stack[row, :lengths[idx]] = signals[idx]
+        if stack.shape[1] < nperseg:
+            for idx in bucket:
+                t_out[idx], S_out[idx] = np.empty(0), np.empty((len(f), 0), dtype=np.finfo(outdtype).dtype)
+            continue
+
+        frames = np.lib.stride_tricks.sliding_window_view(stack, nperseg, axis=-1)[:, ::step]
+        if band is None:
+            Sxx = _frames_to_psd(frames, win, scale, nperseg, outdtype, workers, backend, window)
+        else:
+            Sxx = _frames_to_band_psd(frames, f, bank, scale, fs, outdtype)
+
+        t_all = (np.arange(frames.shape[1]) * step + nperseg / 2) / float(fs)
+        for row, idx in enumerate(bucket):
+            n_frames = max((lengths[idx] - nperseg) // step + 1, 0)
+            t_out[idx], S_out[idx] = t_all[:n_frames], Sxx[row, :, :n_frames]
+    return f, t_out, S_out
+
+
+def collect(columns, n_freq=None):
+    """Concatenate a column stream into (t, Sxx) arrays."""
+    ts, Ss = [], []
+    for t, Sxx in columns:
+        ts.append(t)
+        Ss.append(Sxx)
+    if not ts:
+        return np.empty(0), np.empty((n_freq or 0, 0))
+    return np.concatenate(ts), np.concatenate(Ss, axis=1)
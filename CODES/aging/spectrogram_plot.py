@@ -0,0 +1,143 @@
+import os
+import numpy as np
+
+from . import config
+from .wfdb_reader import read_dat_file, read_header, has_header
+from .normalization import zscore
+from .spectrogram_engine import batch_spectrogram
+from .spectrogram_store import SpectrogramStore, compact_dead_fraction
+from .raster_render import render_raster, render_template
+from .spectrogram_cache import worker_cache, stats_delta, merge_stats
+from .batch_runner import (list_records, shard_records, manifest_path, run_batch,
+                          batch_arguments)
+from .scheduler import record_cost
+
+# === CONFIG ===
+input_folder = config.data_folder                               # Folder containing .dat and .hea files
+output_folder = config.results("filtered_spectrograms")         # Folder to save spectrogram plots
+
+cache_folder = os.path.join(output_folder, "spectrogram_cache")
+cache_max_bytes = 2 * 1024 ** 3  # size bound of the spectrogram cache (None = no cache)
+export_folder = os.path.join(output_folder, "spectrogram_store")
+export_dtype = "float32"  # chunked dataset export: "float32", "float16" or None (PNG only)
+render_mode = "template"  # "template" (cached annotated figure), "raster" (LUT -> PNG) or "matplotlib"
+
+# === FUNCTION TO NORMALIZE DATA ===
+def normalize_signal(data):
+    """Normalize each channel to zero mean and unit variance."""
+    return zscore(data)
+
+# === FUNCTION TO COMPUTE NORMALIZED SPECTROGRAMS ===
+def compute_spectrograms(data, fs):
+    """Normalized spectrogram of every channel as a list of (f, t, Sxx_norm)."""
+    # All channels go through one batched STFT call
+    channels = data.T if data.ndim > 1 else data[None, :]
+    f, times, spectra = batch_spectrogram(channels, fs=fs, nperseg=1024)
+
+    out = []
+    for t, Sxx in zip(times, spectra):
+        Sxx_sum = np.sum(Sxx, axis=0, keepdims=True)
+        out.append((f, t, Sxx / (Sxx_sum + 1e-12)))
+    return out
+
+# Parameters that key the spectrogram cache (together with the record checksum)
+def spectrogram_params(fs):
+    return {"pipeline": "spectrogram_plot", "fs": fs, "nperseg": 1024, "noverlap": 128,
+            "window": ["tukey", 0.25], "band": None, "normalization": "column_sum"}
+
+# === FUNCTION TO PLOT MULTI-CHANNEL SPECTROGRAM ===
+def plot_and_save_spectrograms(data, fs, filename):
+    """Plots each channel’s spectrogram as a separate subplot."""
+    save_spectrogram_figure(compute_spectrograms(data, fs), filename)
+
+def figure_path(filename):
+    return os.path.join(output_folder, f"{os.path.splitext(filename)[0]}_spectrogram.png")
+
+def save_spectrogram_figure(spectra, filename):
+    """Renders precomputed (f, t, Sxx_norm) per channel into one PNG."""
+    out_path = figure_path(filename)
+    if render_mode == 'raster':
+        render_raster(spectra, out_path, cmap='hsv')
+        print(f"✅ Saved spectrogram plot: {out_path}")
+        return
+    if render_mode == 'template':
+        render_template(spectra, out_path, f"Spectrograms - {filename}", cmap='hsv', dpi=100,
+                        xlabel='Time [sec]', cbar_label='Power/Frequency (dB/Hz)')
+        print(f"✅ Saved spectrogram plot: {out_path}")
+        return
+
+    import matplotlib.pyplot as plt
+    n_channels = len(spectra)
+    fig, axes = plt.subplots(n_channels, 1, figsize=(10, 4 * n_channels), sharex=True)
+
+    if n_channels == 1:
+        axes = [axes]  # Make iterable for single channel
+
+    for ch, (f, t, Sxx_norm) in enumerate(spectra):
+        im = axes[ch].pcolormesh(t, f, 10 * np.log10(Sxx_norm + 1e-12), shading='gouraud',cmap='hsv')
+        axes[ch].set_ylabel('Freq [Hz]')
+        axes[ch].set_title(f'Channel {ch + 1}')
+        fig.colorbar(im, ax=axes[ch], orientation='vertical', label='Power/Frequency (dB/Hz)')
+
+    axes[-1].set_xlabel('Time [sec]')
+    fig.suptitle(f"Spectrograms - {filename}", fontsize=14)
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+
+    plt.savefig(out_path, dpi=100)
+    plt.close()
+    print(f"✅ Saved spectrogram plot: {out_path}")
+
+def load_and_compute(path):
+    """Reads, normalizes and computes the spectrograms of one record."""
+    data, fs = read_dat_file(path)
+    return compute_spectrograms(zscore(data, out=data), fs)   # freshly read: normalize in place
+
+# === PER-RECORD JOB ===
+def _get_cache():
+    """This process's spectrogram cache (None when caching is off), shared by all its records."""
+    return worker_cache(cache_folder, cache_max_bytes) if cache_max_bytes else None
+
+def process_record(file):
+    """
+    Spectra (cached) -> store export -> PNG for one record; the PNG is written
+    last. Returns this record's cache hit / miss counts.
+    """
+    path = os.path.join(input_folder, file)
+    print(f"\nProcessing {file}...")
+    cache = _get_cache()
+    before = cache.stats() if cache is not None else None
+    base = os.path.splitext(path)[0]
+    if cache is not None and has_header(base):
+        params = spectrogram_params(read_header(base).fs)
+        spectra = cache.get_or_compute(path, params, lambda: load_and_compute(path))
+    else:
+        spectra = load_and_compute(path)
+    if export_dtype:
+        SpectrogramStore(export_folder, export_dtype).append_record(os.path.splitext(file)[0], spectra)
+    save_spectrogram_figure(spectra, file)
+    return stats_delta(cache.stats(), before) if cache is not None else {}
+
+# === MAIN LOOP ===
+def main(argv=None):
+    args = batch_arguments("Normalized spectrograms of every record").parse_args(argv)
+    dat_files = shard_records(list_records(input_folder, query=args.query, channel=args.channel),
+                              args.shard)
+
+    if not dat_files:
+        print(f"No .dat files found in '{input_folder}'.")
+        return
+    os.makedirs(output_folder, exist_ok=True)
+    summary = run_batch(dat_files, process_record, lambda f: [figure_path(f)],
+                        manifest_path(output_folder, args.shard), retries=args.retries,
+                        n_workers=args.workers or 1, threads=args.threads, cores=args.cores,
+                        cost=lambda f: record_cost(os.path.join(input_folder, f)), force=args.force)
+    if cache_max_bytes and summary["results"]:
+        print(f"📦 Spectrogram cache: {merge_stats(summary['results'].values())}")
+    if export_dtype and args.shard is None:
+        # Sharded runs may share the store with nodes that are still appending
+        reclaimed = SpectrogramStore(export_folder, export_dtype).compact(compact_dead_fraction)
+        if reclaimed:
+            print(f"📦 Compacted spectrogram store: {reclaimed / 1e6:.1f} MB reclaimed")
+
+if __name__ == "__main__":
+    main()
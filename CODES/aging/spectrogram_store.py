@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Chunked on-disk array store for per-record spectrograms.
+
+Each (subject, channel) spectrogram is one contiguous chunk appended to a
+raw shard file; a JSON-lines index records where it lives. Every writer
+process appends to its own shard (`data-<pid>.bin` + `index-<pid>.jsonl`),
+so parallel workers need no locking, and readers memory-map chunks for
+random access without loading the rest of the store.
+
+Re-running a record appends a new chunk. Every index line carries its
+write time (`seq`, ns), and the most recent entry of a key wins whatever
+shard it is in. `compact()` rewrites only the live chunks into one shard
+once enough of the store is superseded.
+
+    store = SpectrogramStore(path, dtype="float16")
+    store.append_record("0001", spectra)          # list of (f, t, Sxx) per channel
+    f, t, Sxx = store.get("0001", 0)              # Sxx is a read-only np.memmap
+    store.compact(min_dead_fraction=0.25)         # no writers running
+"""
+
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+STORE_DTYPES = ("float16", "float32")
+compact_dead_fraction = 0.25   # pipelines compact the store when this share of its bytes is superseded
+
+
+class SpectrogramStore:
+    """Append-only chunked store indexed by subject ID, channel and kind."""
+
+    def __init__(self, root, dtype="float32"):
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"dtype must be one of {STORE_DTYPES}, got {dtype!r}")
+        self.root = root
+        self.dtype = dtype
+        self._index = None
+        os.makedirs(root, exist_ok=True)
+
+    # === WRITING ===
+    def _shard_paths(self):
+        pid = os.getpid()
+        return (os.path.join(self.root, f"data-{pid}.bin"),
+                os.path.join(self.root, f"index-{pid}.jsonl"))
+
+    def append(self, subject_id, channel, f, t, Sxx, kind="spectrogram"):
+        """Append one (n_freq, n_time) array as a chunk and index it."""
+        data_path, index_path = self._shard_paths()
+        chunk = np.ascontiguousarray(Sxx, dtype=self.dtype)
+        with open(data_path, "ab") as fh:
+            offset = fh.tell()
+            fh.write(chunk.tobytes())
+
+        t = np.asarray(t, dtype=np.float64)
+        entry = {"subject": str(subject_id), "channel": int(channel), "kind": kind, "seq": time.time_ns(),
+                 "shard": os.path.basename(data_path), "offset": offset,
+                 "shape": list(chunk.shape), "dtype": self.dtype,
+                 "f": np.asarray(f, dtype=np.float64).tolist()}
+        steps = np.diff(t)
+        if len(t) > 1 and np.allclose(steps, steps[0]):
+            entry.update(t0=float(t[0]), dt=float(steps[0]), n_t=len(t))
+        else:
+            entry["t"] = t.tolist()
+
+        # Index line is written after the data, so a crash never indexes a partial chunk
+        with open(index_path, "a") as fh:
+            fh.write(json.dumps(entry) + "\n")
+        if self._index is not None:
+            self._index[(entry["subject"], entry["channel"], kind)] = entry
+
+    def append_record(self, subject_id, spectra, kind="spectrogram"):
+        """Append every channel of a record, given as a list of (f, t, Sxx)."""
+        for ch, (f, t, Sxx) in enumerate(spectra):
+            self.append(subject_id, ch, f, t, Sxx, kind)
+
+    # === READING ===
+    def _entries(self):
+        """Every index line of every shard (superseded ones included)."""
+        for path in glob.glob(os.path.join(self.root, "index-*.jsonl")):
+            with open(path) as fh:
+                for line in fh:
+                    if line.strip():
+                        yield json.loads(line)
+
+    @property
+    def index(self):
+        """Merged index of all shards; for duplicate keys the most recent entry (`seq`) wins."""
+        if self._index is None:
+            self._index = {}
+            for e in self._entries():
+                key = (e["subject"], e["channel"], e["kind"])
+                old = self._index.get(key)
+                # Within a shard, lines are in write order (ties and seq-less lines: later line wins)
+                if old is None or e.get("seq", 0) >= old.get("seq", 0):
+                    self._index[key] = e
+        return self._index
+
+    def refresh(self):
+        """Re-read the shard indexes (e.g. after other processes appended)."""
+        self._index = None
+
+    def keys(self, kind="spectrogram"):
+        return sorted(k[:2] for k in self.index if k[2] == kind)
+
+    def subjects(self, kind="spectrogram"):
+        return sorted({k[0] for k in self.index if k[2] == kind})
+
+    def __contains__(self, key):
+        subject, channel = key[:2]
+        kind = key[2] if len(key) > 2 else "spectrogram"
+        return (str(subject), int(channel), kind) in self.index
+
+    def get(self, subject_id, channel, kind="spectrogram"):
+        """Return (f, t, Sxx) with Sxx memory-mapped straight from the shard."""
+        e = self.index[(str(subject_id), int(channel), kind)]
+        Sxx = np.memmap(os.path.join(self.root, e["shard"]), dtype=e["dtype"], mode="r",
+                        offset=e["offset"], shape=tuple(e["shape"]))
+        if "t" in e:
+            t = np.asarray(e["t"])
+        else:
+            t = e["t0"] + e["dt"] * np.arange(e["n_t"])
+        return np.asarray(e["f"]), t, Sxx
+
+    def get_record(self, subject_id, kind="spectrogram"):
+        """All channels of one subject as a list of (f, t, Sxx)."""
+        channels = sorted(ch for s, ch, k in self.index if s == str(subject_id) and k == kind)
+        return [self.get(subject_id, ch, kind) for ch in channels]
+
+    # === COMPACTION ===
+    def _chunk_bytes(self, e):
+        return int(np.prod(e["shape"])) * np.dtype(e["dtype"]).itemsize
+
+    def dead_fraction(self):
+        """Share of the shard bytes held by superseded chunks."""
+        total = sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.root, "data-*.bin")))
+        live = sum(self._chunk_bytes(e) for e in self.index.values())
+        return 1.0 - live / total if total else 0.0
+
+    def compact(self, min_dead_fraction=0.0):
+        """
+        Copy the live chunks into one new shard and delete the old shards.
+        Must not run while other processes append. Entries keep their `seq`,
+        so an interrupted compaction only leaves duplicates that resolve to
+        the same chunks. Returns the bytes reclaimed.
+        """
+        self.refresh()
+        if not self.index or self.dead_fraction() <= min_dead_fraction:
+            return 0
+        old = glob.glob(os.path.join(self.root, "data-*.bin")) + \
+            glob.glob(os.path.join(self.root, "index-*.jsonl"))
+        before = sum(os.path.getsize(p) for p in old if p.endswith(".bin"))
+        name = f"compact-{time.time_ns()}"
+        data_path = os.path.join(self.root, f"data-{name}.bin")
+        entries = []
+        with open(data_path, "wb") as out:
+            for key in sorted(self.index):
+                e = dict(self.index[key])
+                src = os.path.join(self.root, e["shard"])
+                with open(src, "rb") as fh:
+                    fh.seek(e["offset"])
+                    chunk = fh.read(self._chunk_bytes(e))
+                e.update(shard=os.path.basename(data_path), offset=out.tell())
+                out.write(chunk)
+                entries.append(e)
+        # The new index becomes visible only once complete (tmp + rename)
+        index_path = os.path.join(self.root, f"index-{name}.jsonl")
+        with open(index_path + ".tmp", "w") as fh:
+            fh.writelines(json.dumps(e) + "\n" for e in entries)
+        os.replace(index_path + ".tmp", index_path)
+        for p in sorted(old, key=lambda p: not p.endswith(".jsonl")):   # indexes first, then data
+            os.remove(p)
+        self.refresh()
+        return before - os.path.getsize(data_path)
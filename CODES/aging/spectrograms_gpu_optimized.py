@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 19:13:18 2025
+
+@author: SREEKANTHVS
+"""
+
+
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from . import config
+from .wfdb_reader import read_dat_file
+from .normalization import zscore
+from .spectrogram_engine import stft_params, band_bank, _frames_to_psd, _frames_to_band_psd
+from .batch_runner import (list_records, shard_records, manifest_path, run_batch,
+                          batch_arguments)
+
+# === CONFIG ===
+input_folder = config.data_folder
+output_folder = config.results("gpu_filtered_spectrograms")
+
+# === GPU BACKEND ===
+@lru_cache(maxsize=None)
+def get_xp():
+    """CuPy when available, else NumPy. Probed on first use, not at import (CUDA init is slow)."""
+    try:
+        import cupy as cp
+        print("✅ CuPy GPU acceleration enabled.")
+        return cp
+    except ImportError:
+        print("⚠️ CuPy not found — running on CPU. Install with 'pip install cupy-cuda12x'")
+        return np
+
+# === NORMALIZATION ===
+def normalize_signal(data):
+    """Normalize to zero mean, unit variance."""
+    xp = get_xp()
+    if xp is np:
+        return zscore(data)
+    data_gpu = xp.asarray(data)
+    mean = xp.mean(data_gpu, axis=0)
+    std = xp.std(data_gpu, axis=0) + 1e-8
+    data_gpu = (data_gpu - mean) / std
+    return xp.asnumpy(data_gpu) if xp is not np else data_gpu
+
+
+# === GPU Spectrogram ===
+def compute_spectrogram_gpu(signal_data, fs=1000, nperseg=1024, noverlap=None, window=("tukey", 0.25),
+                            frame_chunk=4096, band=None, n_bins=64):
+    """
+    Normalized spectrogram on the GPU: the "cupy" STFT backend when CuPy is
+    available, else the fastest CPU backend (see stft_backends.py).
+    Same conventions as scipy.signal.spectrogram and the CPU pipelines
+    (window, detrend, one-sided density scaling, frame-centre time axis);
+    the overlap defaults to half a window as before.
+    Frames are transformed `frame_chunk` at a time so the full windowed
+    frame matrix is never materialized.
+    With `band=(fmin, fmax)`, only `n_bins` frequencies inside the band are
+    evaluated through a windowed DFT bank (one matrix product per chunk).
+    A (samples, channels) input is transformed for all channels in one batched
+    call. Returns (f, t, Sxx_norm) with Sxx_norm of shape (channels, freqs, frames)
+    (or (freqs, frames) for 1-D input), every column normalized to unit sum.
+    """
+    xp = get_xp()
+    x = np.asarray(signal_data)
+    x = x.T if x.ndim > 1 else x                     # (channels, samples)
+    noverlap = nperseg // 2 if noverlap is None else noverlap
+    win, step, freqs, scale, outdtype = stft_params(fs, nperseg, noverlap, window, x.dtype)
+    if band is not None:
+        freqs, bank = band_bank(fs, nperseg, band, n_bins, window)
+        bank = xp.asarray(bank)
+
+    # Strided (zero-copy) view of the segments
+    frames = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[..., ::step, :]
+    n_frames = frames.shape[-2]
+
+    # FFT (or band DFT bank), one chunk of frames at a time
+    Sxx = np.empty(x.shape[:-1] + (len(freqs), n_frames), dtype=np.finfo(outdtype).dtype)
+    for i in range(0, n_frames, frame_chunk):
+        chunk = frames[..., i:i + frame_chunk, :]
+        if band is None:
+            Sxx[..., i:i + frame_chunk] = _frames_to_psd(chunk, win, scale, nperseg, outdtype,
+                                                         backend="cupy" if xp is not np else None, window=window)
+        else:
+            P = _frames_to_band_psd(chunk, freqs, bank, scale, fs, outdtype, xp)
+            Sxx[..., i:i + frame_chunk] = xp.asnumpy(P) if xp is not np else P
+
+    # Normalize PSD (each column over frequency)
+    Sxx /= np.sum(Sxx, axis=-2, keepdims=True) + 1e-12
+    t = (np.arange(n_frames) * step + nperseg / 2) / float(fs)
+    return freqs, t, Sxx
+
+
+# === PLOT & SAVE ===
+def figure_path(filename):
+    return os.path.join(output_folder, f"{os.path.splitext(filename)[0]}_spectrogram_gpu.png")
+
+
+def plot_and_save_spectrograms(data, fs, filename):
+    import matplotlib.pyplot as plt
+    n_channels = data.shape[1] if data.ndim > 1 else 1
+    fig, axes = plt.subplots(n_channels, 1, figsize=(10, 4 * n_channels), sharex=True)
+    if n_channels == 1:
+        axes = [axes]
+
+    # One batched transform for all channels
+    f, t, Sxx_all = compute_spectrogram_gpu(data, fs=fs, nperseg=1024)
+
+    for ch in range(n_channels):
+        Sxx_norm = Sxx_all[ch] if data.ndim > 1 else Sxx_all
+
+        im = axes[ch].pcolormesh(t, f, 10 * np.log10(Sxx_norm + 1e-12),
+                                 shading='gouraud', cmap='inferno')
+        axes[ch].set_ylabel("Freq [Hz]")
+        axes[ch].set_title(f"Channel {ch + 1}")
+        fig.colorbar(im, ax=axes[ch], orientation='vertical', label='Power (dB)')
+
+    axes[-1].set_xlabel("Time [s]")
+    fig.suptitle(f"Spectrograms (GPU Accelerated) — {filename}", fontsize=14)
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+
+    out_path = figure_path(filename)
+    plt.savefig(out_path, dpi=150)
+    plt.close()
+    print(f"✅ Saved GPU spectrogram plot: {out_path}")
+
+
+def process_file(file):
+    print(f"\nProcessing {file}...")
+    data, fs = read_dat_file(os.path.join(input_folder, file))
+    data = normalize_signal(data)
+    plot_and_save_spectrograms(data, fs, file)
+
+
+# === MAIN ===
+def main(argv=None):
+    args = batch_arguments("GPU spectrograms of every record").parse_args(argv)
+    dat_files = shard_records(list_records(input_folder, query=args.query, channel=args.channel),
+                              args.shard)
+    if not dat_files:
+        print(f"No .dat files found in '{input_folder}'.")
+        return
+    os.makedirs(output_folder, exist_ok=True)
+    # One process by default: all records share the GPU
+    run_batch(dat_files, process_file, lambda f: [figure_path(f)],
+              manifest_path(output_folder, args.shard), retries=args.retries,
+              n_workers=args.workers or 1, threads=args.threads, cores=args.cores, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Interchangeable STFT backends for spectrogram_engine, with automatic
+selection by micro-benchmark.
+
+A backend turns a (..., n_frames, nperseg) view of signal frames into a
+one-sided PSD of shape (..., n_freq, n_frames): constant detrend, taper,
+rfft, |X|^2 x scale, doubling of every bin except DC (and Nyquist). Every
+spectrogram of the pipelines (spectrogram_engine.spectrogram,
+iter_spectrogram, batch_spectrogram and the GPU stage) goes through the
+same step, so they only differ in speed:
+
+- "numpy"     numpy.fft.rfft
+- "scipy_fft" scipy.fft.rfft with `workers` threads
+- "numba"     one parallel Numba pass detrends + tapers the frames into a
+              contiguous buffer, scipy.fft transforms it, and a second pass
+              fuses |X|^2, scale and doubling (needs numba)
+- "cupy"      the same steps on the GPU (needs cupy and a device)
+
+The reference is scipy.signal.spectrogram itself ("scipy", only through
+spectrogram_engine.spectrogram, which hands it the whole signal).
+
+The pipelines use "scipy_fft" unless AA_STFT_BACKEND names another backend.
+backend="auto" (opt-in) picks the fastest backend for the (nperseg, batch,
+frames, dtype, window) bucket of a call on this machine. Every available
+backend is checked against the SciPy reference and timed, and backends
+that disagree are never chosen. `aging stft-probe` runs the probes and
+records the choices in `probe_cache_path` (JSON, keyed by a CPU / library
+fingerprint). "auto" reads that file; a bucket it does not hold is probed
+in memory for the process, and nothing is written.
+
+    python -m aging.stft_backends --nperseg 1024 --batch 3   # equivalence + timing table, saves choices
+"""
+
+import hashlib
+import json
+import os
+import platform
+import time
+from functools import lru_cache
+from importlib.util import find_spec
+
+import numpy as np
+from scipy import fft as sp_fft
+
+from . import config
+
+USE_NUMBA = find_spec("numba") is not None
+USE_CUPY = find_spec("cupy") is not None
+BACKEND_NAMES = ("numpy", "scipy_fft", "numba", "cupy")
+
+probe_cache_path = os.environ.get("AA_STFT_PROBE", os.path.join(config.results_folder, "stft_probe.json"))
+probe_frames = 256          # frames per probed signal (enough to rank, cheap to run)
+probe_repeat = 5            # timing = best of this many runs
+check_rtol = {np.dtype(np.float64): 1e-9, np.dtype(np.float32): 2e-3}
+
+_choices = {}
+
+
+# === SHARED STEPS ===
+def _one_sided(P, nperseg):
+    if nperseg % 2:
+        P[..., 1:] *= 2
+    else:
+        P[..., 1:-1] *= 2
+    return P
+
+
+def _real_dtype(outdtype):
+    return np.finfo(outdtype).dtype
+
+
+# === BACKENDS ===
+def psd_numpy(frames, win, scale, nperseg, outdtype, workers=None):
+    seg = (frames - frames.mean(axis=-1, keepdims=True)) * win
+    X = np.fft.rfft(seg, n=nperseg, axis=-1)
+    P = (X.real ** 2 + X.imag ** 2).astype(_real_dtype(outdtype), copy=False)
+    P *= scale
+    return np.swapaxes(_one_sided(P, nperseg), -1, -2)
+
+
+def psd_scipy_fft(frames, win, scale, nperseg, outdtype, workers=None):
+    seg = frames - frames.mean(axis=-1, keepdims=True)
+    seg = seg * win
+    X = sp_fft.rfft(seg, n=nperseg, axis=-1, workers=workers)
+    P = np.conjugate(X) * X
+    P *= scale
+    return np.swapaxes(_one_sided(P, nperseg).astype(outdtype).real, -1, -2)
+
+
+@lru_cache(maxsize=None)
+def _numba_kernels():
+    """Compiled on first use (numba is not imported with this module)."""
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def taper(frames, win, out):
+        n_sig, n_frames, n = frames.shape
+        for job in prange(n_sig * n_frames):
+            b, i = job // n_frames, job % n_frames
+            m = 0.0
+            for k in range(n):
+                m += frames[b, i, k]
+            m /= n
+            for k in range(n):
+                out[b, i, k] = (frames[b, i, k] - m) * win[k]
+
+    @njit(parallel=True, cache=True)
+    def power(X, scale, nyquist, out):
+        n_sig, n_frames, n_freq = X.shape
+        for job in prange(n_sig * n_frames):
+            b, i = job // n_frames, job % n_frames
+            for k in range(n_freq):
+                v = X[b, i, k]
+                p = (v.real * v.real + v.imag * v.imag) * scale
+                if k > 0 and not (nyquist and k == n_freq - 1):
+                    p *= 2
+                out[b, i, k] = p
+
+    return taper, power
+
+
+def psd_numba(frames, win, scale, nperseg, outdtype, workers=None):
+    taper, power = _numba_kernels()
+    lead = frames.shape[:-2]
+    f3 = frames.reshape((-1,) + frames.shape[-2:]) if frames.ndim != 3 else frames
+    real = _real_dtype(outdtype)
+    seg = np.empty(f3.shape, dtype=real)
+    taper(f3, win.astype(real, copy=False), seg)
+    X = sp_fft.rfft(seg, n=nperseg, axis=-1, workers=workers, overwrite_x=True)
+    P = np.empty(X.shape, dtype=real)
+    power(X, real.type(scale), nperseg % 2 == 0, P)
+    return np.swapaxes(P.reshape(lead + P.shape[-2:]), -1, -2)
+
+
+def psd_cupy(frames, win, scale, nperseg, outdtype, workers=None):
+    import cupy as cp
+    seg = cp.asarray(frames)
+    seg = (seg - seg.mean(axis=-1, keepdims=True)) * cp.asarray(win)
+    X = cp.fft.rfft(seg, n=nperseg, axis=-1)
+    P = (X.real ** 2 + X.imag ** 2).astype(_real_dtype(outdtype), copy=False)
+    P *= scale
+    return np.swapaxes(cp.asnumpy(_one_sided(P, nperseg)), -1, -2)
+
+
+BACKENDS = {"numpy": psd_numpy, "scipy_fft": psd_scipy_fft, "numba": psd_numba, "cupy": psd_cupy}
+
+
+@lru_cache(maxsize=None)
+def available_backends():
+    """Backends whose dependencies import (CuPy also needs a usable device)."""
+    names = ["numpy", "scipy_fft"]
+    if USE_NUMBA:
+        names.append("numba")
+    if USE_CUPY:
+        try:
+            import cupy as cp
+            cp.cuda.runtime.getDeviceCount()
+            names.append("cupy")
+        except Exception:
+            pass
+    return tuple(names)
+
+
+# === EQUIVALENCE CHECK ===
+def check_backend(name, nperseg=256, noverlap=None, window=("tukey", 0.25), dtype=np.float64,
+                  n_samples=None, seed=0):
+    """Max relative error of a backend against scipy.signal.spectrogram on random input."""
+    from scipy import signal
+    from .spectrogram_engine import stft_params
+
+    rng = np.random.default_rng(seed)
+    n_samples = n_samples or nperseg * 12 + nperseg // 3
+    x = (rng.standard_normal((2, n_samples)) + 0.5).astype(dtype)
+    fs = 1000.0
+    win, step, _, scale, outdtype = stft_params(fs, nperseg, noverlap, window, x.dtype)
+    frames = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[:, ::step]
+    got = np.asarray(BACKENDS[name](frames, win, scale, nperseg, outdtype))
+    _, _, ref = signal.spectrogram(x, fs, window=window, nperseg=nperseg, noverlap=nperseg - step)
+    if got.shape != ref.shape:
+        return np.inf
+    return float(np.max(np.abs(got - ref)) / np.max(np.abs(ref)))
+
+
+def passes_check(name, nperseg, dtype, window=("tukey", 0.25)):
+    return check_backend(name, nperseg, window=window, dtype=dtype) <= check_rtol.get(np.dtype(dtype), 1e-9)
+
+
+# === SELECTION ===
+def _bucket(n):
+    """Next power of two (keeps the number of probed shapes small)."""
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+def _fingerprint():
+    import scipy
+    return "|".join([platform.machine(), platform.processor() or platform.node(), str(os.cpu_count()),
+                     np.__version__, scipy.__version__])
+
+
+def _window_key(window):
+    """Readable key of a window spec ("tukey-0.25"); a digest for explicit window arrays."""
+    if isinstance(window, (str, tuple)):
+        return "-".join(str(w) for w in (window if isinstance(window, tuple) else (window,)))
+    return "array-" + hashlib.sha1(np.asarray(window, dtype=np.float64).tobytes()).hexdigest()[:12]
+
+
+def _probe_key(nperseg, n_signals, n_frames, dtype, workers, window=("tukey", 0.25)):
+    return (f"nperseg={nperseg},batch={_bucket(n_signals)},frames={_bucket(min(n_frames, probe_frames))},"
+            f"dtype={np.dtype(dtype).name},workers={workers},window={_window_key(window)}")
+
+
+def _load_cache():
+    try:
+        with open(probe_cache_path) as fh:
+            data = json.load(fh)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_choice(key, name):
+    data = _load_cache()
+    data.setdefault(_fingerprint(), {})[key] = name
+    try:
+        os.makedirs(os.path.dirname(probe_cache_path) or ".", exist_ok=True)
+        tmp = f"{probe_cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(data, fh, indent=1)
+        os.replace(tmp, probe_cache_path)
+    except OSError:
+        pass        # read-only results folder: keep the in-process choice only
+
+
+def probe(nperseg, n_signals=1, n_frames=probe_frames, dtype=np.float64, workers=None,
+          window=("tukey", 0.25), backends=None):
+    """
+    {backend: best-of-N seconds} for a (n_signals, n_frames, nperseg) frame
+    batch; backends that fail the SciPy equivalence check map to None.
+    """
+    from .spectrogram_engine import stft_params
+
+    rng = np.random.default_rng(1)
+    step = nperseg - nperseg // 8
+    n_frames = min(n_frames, probe_frames)
+    x = rng.standard_normal((_bucket(n_signals), (n_frames - 1) * step + nperseg)).astype(dtype)
+    win, step, _, scale, outdtype = stft_params(1000.0, nperseg, nperseg // 8, window, x.dtype)
+    frames = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[:, ::step]
+
+    timings = {}
+    for name in backends or available_backends():
+        if not passes_check(name, nperseg, dtype, window):
+            timings[name] = None
+            continue
+        fn = BACKENDS[name]
+        fn(frames, win, scale, nperseg, outdtype, workers)          # warm-up (JIT, FFT plans)
+        best = np.inf
+        for _ in range(probe_repeat):
+            t = time.perf_counter()
+            fn(frames, win, scale, nperseg, outdtype, workers)
+            best = min(best, time.perf_counter() - t)
+        timings[name] = best
+    return timings
+
+
+def fastest(timings):
+    valid = {k: v for k, v in timings.items() if v is not None}
+    return min(valid, key=valid.get) if valid else "scipy_fft"
+
+
+def select_backend(nperseg, n_signals=1, n_frames=probe_frames, dtype=np.float64, workers=None,
+                   window=("tukey", 0.25)):
+    """
+    Fastest verified backend for this call shape: in-process cache, then the
+    JSON cache written by the stft-probe command, then an in-memory probe.
+    """
+    key = _probe_key(nperseg, n_signals, n_frames, dtype, workers, window)
+    if key not in _choices:
+        name = _load_cache().get(_fingerprint(), {}).get(key)
+        _choices[key] = name if name in available_backends() else \
+            fastest(probe(nperseg, n_signals, n_frames, dtype, workers, window))
+    return _choices[key]
+
+
+def resolve_backend(name, frames, dtype, workers=None, window=("tukey", 0.25)):
+    """Backend function for `name` ("auto" selects) and a (..., n_frames, nperseg) frame view."""
+    if name == "auto":
+        n_signals = int(np.prod(frames.shape[:-2])) if frames.ndim > 2 else 1
+        name = select_backend(frames.shape[-1], n_signals, frames.shape[-2], dtype, workers, window)
+    if name not in BACKENDS:
+        raise ValueError(f"unknown STFT backend {name!r}; choose from {BACKEND_NAMES + ('auto',)}")
+    return BACKENDS[name]
+
+
+# === REPORT ===
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check and time the STFT backends against scipy.signal.spectrogram, "
+                                                 "and record the fastest for backend=\"auto\"")
+    parser.add_argument("--nperseg", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--batch", type=int, default=3, help="signals per call (e.g. channels of a record)")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument("--workers", type=int, default=None,
+                        help="FFT threads per call (default: the pipelines' spectrogram_engine.default_workers)")
+    args = parser.parse_args(argv)
+    from .spectrogram_engine import default_workers
+    workers = default_workers if args.workers is None else args.workers    # same key as batch_spectrogram
+    for nperseg in args.nperseg:
+        timings = probe(nperseg, args.batch, dtype=np.dtype(args.dtype), workers=workers)
+        print(f"nperseg={nperseg}, batch={args.batch}, {args.dtype}, workers={workers}:")
+        for name, secs in timings.items():
+            err = check_backend(name, nperseg, dtype=np.dtype(args.dtype))
+            status = f"{secs * 1e3:8.2f} ms" if secs is not None else "  FAILED  "
+            print(f"  {name:10s} {status}   max rel. error vs SciPy {err:.1e}")
+        choice = fastest(timings)
+        _save_choice(_probe_key(nperseg, args.batch, probe_frames, args.dtype, workers), choice)
+        print(f"  -> auto selects {choice} (saved to {probe_cache_path})")
+
+
+if __name__ == "__main__":
+    main()
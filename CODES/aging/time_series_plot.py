@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 15:06:36 2025
+
+@author: SREEKANTHVS
+"""
+
+import os
+from functools import partial
+
+import numpy as np
+
+from . import config
+from .wfdb_reader import read_dat_file
+from .normalization import zscore
+from .timeseries_pyramid import load_pyramid, draw_minmax
+from .batch_runner import (list_records, shard_records, manifest_path, run_batch,
+                          batch_arguments)
+
+# === Configuration ===
+input_folder = config.data_folder                  # Folder with .dat/.hea files
+output_folder = config.results("time_series")
+
+lowcut, highcut = 1.0, 2.0                   # Frequency band (Hz)
+nperseg = 1024                               # Window length for FFT
+plot_mode = "pyramid"                        # "pyramid": whole record (or --start/--end) from a cached min/max pyramid
+plot_samples = 10000                         # "snippet": only this many samples are read and plotted
+pyramid_folder = os.path.join(output_folder, "pyramids")
+figsize, dpi = (10, 6), 300                  # 10 in x 300 dpi -> 3000 buckets drawn per channel
+colors = ['r', 'b', 'k']                     # cycled for records with more channels
+
+def figure_path(file, window=(None, None), snippet=False):
+    """One file name per mode, so the skip check never takes a snippet for a pyramid plot (or back)."""
+    start, end = window
+    suffix = "_full"                             # whole record from the pyramid
+    if snippet:
+        suffix = ""                              # snippet plots keep the original name
+    elif end is not None:
+        suffix = f"_{start or 0:g}-{end:g}s"
+    elif start is not None:
+        suffix = f"_{start:g}s-end"
+    return os.path.join(output_folder, file.replace(".dat", f"_timeseries{suffix}.png"))
+
+def process_file(file, window=(None, None)):
+    """Whole record (or `window` = (start, end) s) drawn from its min/max pyramid at the figure's pixel width."""
+    import matplotlib.pyplot as plt
+    pyr = load_pyramid(os.path.join(input_folder, file), pyramid_folder)
+    n_channels = len(pyr.levels[0][0])
+    width = figsize[0] * dpi
+
+    # === 1️⃣ Plot and Save Time-Series (normalized with the whole-record mean/std) ===
+    plt.figure(figsize=figsize)
+    for i in range(n_channels):
+        t, lo, hi = pyr.window(i, *window, width=width)
+        std = pyr.std[i] if pyr.std[i] > 0 else 1.0
+        lo, hi = (lo - pyr.mean[i]) / std, None if lo is hi else (hi - pyr.mean[i]) / std
+        plt.subplot(n_channels, 1, i + 1)
+        draw_minmax(plt.gca(), t, lo, lo if hi is None else hi, linewidth=0.8, color=colors[i % len(colors)])
+        plt.title(f"{file} — Channel {i+1}")
+        plt.ylabel("Amplitude (Normalized)")
+        plt.xlabel("Time (s)")
+        plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    time_plot_path = figure_path(file, window)
+    plt.savefig(time_plot_path, dpi=dpi)
+    plt.close()
+    print(f"✅ Saved time-series plot: {time_plot_path}")
+
+def plot_snippet(file):
+    """First `plot_samples` samples of every channel (the pre-pyramid plot)."""
+    import matplotlib.pyplot as plt
+    filepath = os.path.join(input_folder, file)
+    data, fs = read_dat_file(filepath, sampto=plot_samples)
+
+    # Normalize each channel (float32 is plenty for plotting)
+    data = zscore(data, dtype=np.float32)
+
+    n_channels = data.shape[1] if data.ndim > 1 else 1
+    time = np.arange(data.shape[0]) / fs
+
+    # === 1️⃣ Plot and Save Time-Series ===
+    plt.figure(figsize=figsize)
+    for i in range(n_channels):
+        plt.subplot(n_channels, 1, i + 1)
+        plt.plot(time[1:plot_samples], data[1:plot_samples, i], linewidth=0.8, color=colors[i % len(colors)])
+        plt.title(f"{file} — Channel {i+1}")
+        plt.ylabel("Amplitude (Normalized)")
+        plt.xlabel("Time (s)")
+        plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    time_plot_path = figure_path(file, snippet=True)
+    plt.savefig(time_plot_path, dpi=dpi)
+    plt.close()
+    print(f"✅ Saved time-series plot: {time_plot_path}")
+
+# === Main processing loop ===
+def main(argv=None):
+    parser = batch_arguments("Time-series plots of every record")
+    parser.add_argument("--start", type=float, default=None, help="window start (s); default: record start")
+    parser.add_argument("--end", type=float, default=None, help="window end (s); default: record end")
+    parser.add_argument("--snippet", action="store_true",
+                        help=f"plot only the first {plot_samples} samples (no pyramid)")
+    args = parser.parse_args(argv)
+    snippet = args.snippet or plot_mode == "snippet"
+    window = (None, None) if snippet else (args.start, args.end)
+    dat_files = shard_records(list_records(input_folder, query=args.query, channel=args.channel),
+                              args.shard)
+    os.makedirs(output_folder, exist_ok=True)
+    process = plot_snippet if snippet else partial(process_file, window=window)
+    run_batch(dat_files, process, lambda f: [figure_path(f, window, snippet)],
+              manifest_path(output_folder, args.shard), retries=args.retries,
+              n_workers=args.workers or 1, threads=args.threads, cores=args.cores, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-resolution min/max pyramid of a record, for drawing full-length time
+series at pixel-limited cost.
+
+Level 0 holds the (min, max) of every `leaf` consecutive samples of each
+channel. Each next level holds the (min, max) of `factor` buckets of the
+level below, until a level has at most `top_buckets` buckets.
+
+To draw a window W pixels wide, the coarsest level that still has >= W
+buckets in the window is read: about 2 W values per channel, however long
+the window is. The buckets are drawn as one filled min-max envelope,
+which at that resolution looks the same as plotting every sample. Peaks
+such as R waves or artefacts are never averaged away, as they would be by
+mean or LTTB decimation. Windows shorter than `leaf` x W samples are read raw from the
+record.
+
+The pyramid is built in one streamed pass over the record. It is saved
+under `<folder>/<record>/` as one .npy per level plus meta.json, which is
+written last. Loaded levels are memory-mapped, so a zoom window only
+touches its own slice. A pyramid is rebuilt when the stamp of the record's
+header or data files changes.
+
+    pyr = load_pyramid("DATA/0001.dat", "RESULTS/time_series/pyramids")
+    t, lo, hi = pyr.window(channel=0, t0=600, t1=660, width=3000)
+"""
+
+import json
+import os
+
+import numpy as np
+
+from . import zip_source
+from .wfdb_reader import open_record, read_header
+from .normalization import channel_moments
+
+PYRAMID_VERSION = 1
+default_leaf = 16            # samples per level-0 bucket
+default_factor = 4           # buckets merged per level
+default_top_buckets = 1024   # the coarsest level has at most this many buckets
+default_block_size = 1 << 20  # samples read per block while building
+
+
+# === REDUCTION ===
+def _minmax(x, span):
+    """(n_buckets, channels, 2) min/max of consecutive `span`-row buckets; NaNs are skipped."""
+    n_full = len(x) // span * span
+    parts = []
+    if n_full:
+        full = x[:n_full].reshape(-1, span, *x.shape[1:])
+        parts.append(np.stack([np.fmin.reduce(full, axis=1), np.fmax.reduce(full, axis=1)], axis=-1))
+    if n_full < len(x):
+        tail = x[n_full:]
+        parts.append(np.stack([np.fmin.reduce(tail, axis=0), np.fmax.reduce(tail, axis=0)], axis=-1)[None])
+    return np.concatenate(parts)
+
+
+def _coarsen(level, factor):
+    """Next pyramid level: min of the minima and max of the maxima of `factor` buckets."""
+    lo = _minmax(level[..., 0], factor)[..., 0]
+    hi = _minmax(level[..., 1], factor)[..., 1]
+    return np.stack([lo, hi], axis=-1)
+
+
+def record_stamps(base):
+    header = read_header(base)
+    folder = os.path.dirname(base)
+    files = [base + ".hea"] + [os.path.join(folder, f) for f in sorted({s.file_name for s in header.signals})]
+    return [zip_source.stamp(f) for f in files]
+
+
+# === BUILD ===
+def build_pyramid(record, leaf=default_leaf, factor=default_factor, top_buckets=default_top_buckets,
+                  block_size=default_block_size):
+    """
+    Levels of a LazyRecord (finest first, float32) and per-channel (mean, std)
+    of the whole record, from one streamed pass.
+    """
+    n, n_ch = record.n_samples, record.n_channels
+    level0 = np.empty((-(-n // leaf), n_ch, 2), dtype=np.float32)
+    block = max(leaf, block_size // leaf * leaf)
+    count, mean, m2 = np.zeros(n_ch), np.zeros(n_ch), np.zeros(n_ch)
+    for start in range(0, n, block):
+        x = record.physical(None, start, min(start + block, n))
+        b_mean, b_std, b_count = channel_moments(x)
+        # Chan et al. merge of the block moments into the running ones
+        total = count + b_count
+        delta = b_mean - mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            w = np.where(total > 0, b_count / total, 0.0)
+        mean = mean + delta * w
+        m2 = m2 + b_std ** 2 * b_count + delta ** 2 * count * w
+        count = total
+        level0[start // leaf:start // leaf + -(-len(x) // leaf)] = _minmax(x, leaf)
+
+    levels = [level0]
+    while len(levels[-1]) > top_buckets:
+        levels.append(_coarsen(levels[-1], factor))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(m2 / count)
+    return levels, mean, std
+
+
+# === PYRAMID ===
+class Pyramid:
+    """Saved pyramid of one record; levels are memory-mapped."""
+
+    def __init__(self, folder, meta, record_path=None):
+        self.folder = folder
+        self.meta = meta
+        self.record_path = record_path
+        self.fs = meta["fs"]
+        self.n_samples = meta["n_samples"]
+        self.leaf, self.factor = meta["leaf"], meta["factor"]
+        self.mean, self.std = np.array(meta["mean"]), np.array(meta["std"])
+        self.sig_name = meta["sig_name"]
+        self.levels = [np.load(os.path.join(folder, f"level_{k}.npy"), mmap_mode="r")
+                       for k in range(meta["n_levels"])]
+        self._record = None
+
+    @property
+    def duration(self):
+        return self.n_samples / self.fs
+
+    def span(self, level):
+        """Samples per bucket at `level`."""
+        return self.leaf * self.factor ** level
+
+    def level_for(self, n_samples, width):
+        """Coarsest level with at least `width` buckets over `n_samples` samples (None: read raw)."""
+        level = None
+        for k in range(len(self.levels)):
+            if n_samples / self.span(k) >= width:
+                level = k
+        return level
+
+    def window(self, channel, t0=None, t1=None, width=3000):
+        """
+        (t, lo, hi) of `channel` over [t0, t1) s, at about `width` buckets.
+        Raw samples when the window is too short for level 0 (then lo is hi).
+        """
+        i0 = 0 if t0 is None else max(0, int(t0 * self.fs))
+        i1 = self.n_samples if t1 is None else min(self.n_samples, int(np.ceil(t1 * self.fs)))
+        level = self.level_for(max(i1 - i0, 0), width)
+        if level is None:
+            if self._record is None:
+                self._record = open_record(self.record_path)
+            x = self._record.physical([channel], i0, i1, dtype=np.float32)[:, 0]
+            return np.arange(i0, i1) / self.fs, x, x
+        span = self.span(level)
+        b0, b1 = i0 // span, -(-i1 // span)
+        buckets = np.asarray(self.levels[level][b0:b1, channel])
+        t = (np.arange(b0, b1) * span + span / 2) / self.fs
+        return t, buckets[:, 0], buckets[:, 1]
+
+
+def pyramid_folder(record_path, folder):
+    return os.path.join(folder, os.path.splitext(os.path.basename(record_path))[0])
+
+
+def load_pyramid(record_path, folder, leaf=default_leaf, factor=default_factor,
+                 top_buckets=default_top_buckets, rebuild=False):
+    """Pyramid of a record (path with or without .dat), built and saved on first use or when stale."""
+    base = os.path.splitext(record_path)[0]
+    out = pyramid_folder(record_path, folder)
+    meta_path = os.path.join(out, "meta.json")
+    stamps = record_stamps(base)
+    params = {"version": PYRAMID_VERSION, "leaf": leaf, "factor": factor, "top_buckets": top_buckets}
+    if not rebuild and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            if meta["stamps"] == stamps and all(meta[k] == v for k, v in params.items()):
+                return Pyramid(out, meta, base)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    record = open_record(base)
+    levels, mean, std = build_pyramid(record, leaf, factor, top_buckets)
+    os.makedirs(out, exist_ok=True)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)         # invalid until every level is written again
+    for k, level in enumerate(levels):
+        tmp = os.path.join(out, f"level_{k}.tmp.npy")
+        np.save(tmp, level)
+        os.replace(tmp, os.path.join(out, f"level_{k}.npy"))
+    meta = dict(params, stamps=stamps, fs=record.fs, n_samples=record.n_samples, n_levels=len(levels),
+                sig_name=list(record.sig_name), mean=mean.tolist(), std=std.tolist())
+    with open(meta_path + ".tmp", "w") as fh:
+        json.dump(meta, fh)
+    os.replace(meta_path + ".tmp", meta_path)
+    return Pyramid(out, meta, base)
+
+
+# === DRAWING ===
+def draw_minmax(ax, t, lo, hi, **kwargs):
+    """
+    Draw pyramid buckets as one filled min-max envelope, outlined with the
+    line width (raw samples: plain line). One polygon rasterizes much faster
+    than thousands of vertical strokes.
+    """
+    if lo is hi:
+        return ax.plot(t, lo, **kwargs)
+    return ax.fill_between(t, lo, hi, **kwargs)
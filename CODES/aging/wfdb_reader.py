@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Zero-copy WFDB record reader shared by all pipelines.
+
+Parses the `.hea` header directly and memory-maps the `.dat` payload as a
+typed view (e.g. format 16 -> int16). Gain and baseline are only applied to
+the channels / sample range the caller asks for, so reading the first 10 s of
+one channel never touches the rest of the file.
+
+Records may also live inside the dataset zip (see zip_source): stored
+members are memory-mapped at their offset in the archive, deflated ones
+are stream-decompressed up to the requested range only.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+
+from importlib.util import find_spec
+
+import numpy as np
+
+from . import zip_source
+
+# wfdb is the fallback for formats not handled here. It is only probed at
+# import (it pulls in pandas and matplotlib) and imported on first fallback.
+USE_WFDB = find_spec("wfdb") is not None
+
+default_fs = 1000  # Hz, used when neither header nor wfdb is available
+
+# === WFDB STORAGE FORMATS ===
+# Formats that map onto a fixed-width numpy dtype (memory-mappable as-is).
+# Value: (dtype, offset subtracted to obtain the two's-complement digital value)
+VIEW_FORMATS = {
+    "16": ("<i2", 0),
+    "61": (">i2", 0),
+    "80": ("u1", 128),
+    "160": ("<u2", 32768),
+    "32": ("<i4", 0),
+}
+# Bit-packed formats: decoded on the requested byte range only
+PACKED_FORMATS = {"212"}
+
+INVALID_SAMPLE_VALUE = {
+    "16": -(2 ** 15),
+    "61": -(2 ** 15),
+    "80": -(2 ** 7),
+    "160": -(2 ** 15),
+    "32": -(2 ** 31),
+    "212": -(2 ** 11),
+}
+
+_GAIN_RE = re.compile(r"^([-+\d.eE]+)(?:\((-?\d+)\))?(?:/(.*))?$")
+_FMT_RE = re.compile(r"^(\d+)(?:x(\d+))?(?::(\d+))?(?:\+(\d+))?$")
+
+
+@dataclass
+class SignalSpec:
+    """One signal line of a `.hea` header."""
+    file_name: str
+    fmt: str
+    gain: float
+    baseline: int
+    units: str
+    adc_zero: int
+    byte_offset: int = 0
+    name: str = ""
+
+
+@dataclass
+class RecordHeader:
+    """Parsed `.hea` header of a single-segment WFDB record."""
+    record_name: str
+    n_sig: int
+    fs: float
+    n_samples: int
+    signals: list = field(default_factory=list)
+    comments: list = field(default_factory=list)
+
+    @property
+    def sig_name(self):
+        return [s.name for s in self.signals]
+
+
+# === HEADER PARSING ===
+def parse_header_lines(lines):
+    """Parse the text lines of a `.hea` header into a RecordHeader."""
+    comments = [ln.strip()[1:].strip() for ln in lines if ln.strip().startswith("#")]
+    lines = [ln.strip() for ln in lines if ln.strip() and not ln.strip().startswith("#")]
+    if not lines:
+        raise ValueError("empty header")
+
+    rec = lines[0].split()
+    if "/" in rec[0]:
+        raise NotImplementedError("multi-segment records are not supported")
+    n_sig = int(rec[1])
+    fs = float(re.split(r"[/(]", rec[2])[0]) if len(rec) > 2 else 250.0
+    n_samples = int(rec[3]) if len(rec) > 3 else -1
+
+    signals = []
+    for ln in lines[1:1 + n_sig]:
+        tok = ln.split()
+        m = _FMT_RE.match(tok[1])
+        if m is None:
+            raise ValueError(f"bad format field '{tok[1]}'")
+        fmt, spf, _, offset = m.groups()
+        if spf not in (None, "1"):
+            raise NotImplementedError("multi-frequency records are not supported")
+
+        gain, baseline, units = 200.0, None, "NU"
+        if len(tok) > 2:
+            g = _GAIN_RE.match(tok[2])
+            gain = float(g.group(1)) or 200.0
+            baseline = int(g.group(2)) if g.group(2) is not None else None
+            units = g.group(3) or units
+        adc_zero = int(tok[4]) if len(tok) > 4 else 0
+        signals.append(SignalSpec(
+            file_name=tok[0],
+            fmt=fmt,
+            gain=gain,
+            baseline=adc_zero if baseline is None else baseline,
+            units=units,
+            adc_zero=adc_zero,
+            byte_offset=int(offset or 0),
+            name=" ".join(tok[8:]) if len(tok) > 8 else f"ch{len(signals)}",
+        ))
+
+    return RecordHeader(rec[0], n_sig, fs, n_samples, signals, comments)
+
+
+def read_header(base):
+    """Read and parse `<base>.hea` (loose file or zip member)."""
+    return parse_header_lines(zip_source.read_text(base + ".hea").splitlines())
+
+
+def has_header(base):
+    """True if `<base>.hea` exists, on disk or inside a zip."""
+    return zip_source.exists(base + ".hea")
+
+
+# === LAZY RECORD ===
+class LazyRecord:
+    """
+    Memory-mapped view of a WFDB record.
+
+    Nothing is decoded until `digital()` / `physical()` is called, and then
+    only for the requested channels and sample range.
+    """
+
+    def __init__(self, base, header=None):
+        self.base = base
+        self.header = header if header is not None else read_header(base)
+        self.fs = self.header.fs
+        self._groups = self._group_signals()
+        self.n_samples = self._infer_n_samples()
+        self._views = {}
+        self._members = {}
+
+    @property
+    def n_channels(self):
+        return self.header.n_sig
+
+    @property
+    def sig_name(self):
+        return self.header.sig_name
+
+    def _group_signals(self):
+        """Map each dat file to the header indices of the signals it stores, in column order."""
+        groups = {}
+        for idx, sig in enumerate(self.header.signals):
+            groups.setdefault(sig.file_name, []).append(idx)
+        for fname, idxs in groups.items():
+            fmts = {self.header.signals[i].fmt for i in idxs}
+            if len(fmts) != 1:
+                raise NotImplementedError(f"mixed formats in {fname}")
+            fmt = fmts.pop()
+            if fmt not in VIEW_FORMATS and fmt not in PACKED_FORMATS:
+                raise NotImplementedError(f"format {fmt} is not supported")
+        return groups
+
+    def _dat_path(self, fname):
+        return os.path.join(os.path.dirname(self.base), fname)
+
+    def _member(self, fname):
+        """(ZipArchive, member) if the dat file is a deflated zip member (no mmap possible), else None."""
+        if fname not in self._members:
+            loc = zip_source.resolve(self._dat_path(fname))
+            self._members[fname] = None if loc is None or loc[0].is_stored(loc[1]) else loc
+        return self._members[fname]
+
+    def _frame_bytes(self, fname):
+        idxs = self._groups[fname]
+        fmt = self.header.signals[idxs[0]].fmt
+        if fmt in PACKED_FORMATS:
+            return 1.5 * len(idxs)
+        return np.dtype(VIEW_FORMATS[fmt][0]).itemsize * len(idxs)
+
+    def _infer_n_samples(self):
+        if self.header.n_samples >= 0:
+            return self.header.n_samples
+        fname = next(iter(self._groups))
+        sig = self.header.signals[self._groups[fname][0]]
+        size = zip_source.getsize(self._dat_path(fname)) - sig.byte_offset
+        return int(size // self._frame_bytes(fname))
+
+    def _view(self, fname):
+        """Typed (n_samples, n_sig_in_file) memmap of one dat file (loose or stored zip member)."""
+        if fname not in self._views:
+            idxs = self._groups[fname]
+            sig = self.header.signals[idxs[0]]
+            path = self._dat_path(fname)
+            if sig.fmt in PACKED_FORMATS:
+                dtype, shape = "u1", None
+            else:
+                dtype, shape = VIEW_FORMATS[sig.fmt][0], (self.n_samples, len(idxs))
+            loc = zip_source.resolve(path)
+            if loc is None:
+                self._views[fname] = np.memmap(path, dtype=dtype, mode="r", offset=sig.byte_offset,
+                                               shape=shape)
+            else:
+                archive, member = loc
+                if shape is None:
+                    shape = (archive.size(member) - sig.byte_offset,)
+                self._views[fname] = archive.memmap(member, dtype, sig.byte_offset, shape)
+        return self._views[fname]
+
+    def _bytes(self, fname, start, stop):
+        """Bytes [start, stop) of the sample payload of a dat file."""
+        loc = self._member(fname)
+        if loc is None:
+            return self._view(fname)[start:stop]
+        offset = self.header.signals[self._groups[fname][0]].byte_offset
+        return np.frombuffer(loc[0].read_bytes(loc[1], offset + start, offset + stop), dtype="u1")
+
+    def _rows(self, fname, sampfrom, sampto):
+        """Typed (sampto - sampfrom, n_sig_in_file) rows of a fixed-width dat file."""
+        if self._member(fname) is None:
+            return self._view(fname)[sampfrom:sampto]
+        n_sig = len(self._groups[fname])
+        dtype = np.dtype(VIEW_FORMATS[self.header.signals[self._groups[fname][0]].fmt][0])
+        frame = dtype.itemsize * n_sig
+        raw = self._bytes(fname, sampfrom * frame, sampto * frame)
+        return np.frombuffer(raw, dtype=dtype).reshape(-1, n_sig)
+
+    def _read_212(self, fname, sampfrom, sampto):
+        """Decode only the byte range of a format-212 file that holds [sampfrom, sampto)."""
+        n_sig = len(self._groups[fname])
+        flat_from = sampfrom * n_sig
+        flat_to = sampto * n_sig
+        start = flat_from - flat_from % 2           # sample pairs start on byte triplets
+        stop = flat_to + flat_to % 2
+        raw = np.asarray(self._bytes(fname, start // 2 * 3, stop // 2 * 3), dtype=np.int16)
+        raw = np.concatenate([raw, np.zeros((-len(raw)) % 3, dtype=np.int16)])
+
+        sig = np.empty(len(raw) // 3 * 2, dtype=np.int16)
+        sig[0::2] = raw[0::3] + 256 * (raw[1::3] & 0x0F)
+        sig[1::2] = raw[2::3] + 256 * ((raw[1::3] >> 4) & 0x0F)
+        sig[sig > 2047] -= 4096
+        sig = sig[flat_from - start:flat_from - start + (flat_to - flat_from)]
+        return sig.reshape(-1, n_sig)
+
+    def _resolve(self, channels, sampfrom, sampto):
+        if channels is None:
+            channels = list(range(self.n_channels))
+        elif np.isscalar(channels):
+            channels = [int(channels)]
+        sampto = self.n_samples if sampto is None else min(int(sampto), self.n_samples)
+        sampfrom = max(int(sampfrom), 0)
+        if sampfrom > sampto:
+            raise ValueError(f"sampfrom ({sampfrom}) > sampto ({sampto})")
+        return list(channels), sampfrom, sampto
+
+    def _columns(self, channels, sampfrom, sampto):
+        """Yield (output column, header index, raw column view) for each requested channel."""
+        rows = {}   # each dat file is decoded / decompressed once, however many channels it holds
+        for out_col, idx in enumerate(channels):
+            fname = self.header.signals[idx].file_name
+            col = self._groups[fname].index(idx)
+            if fname not in rows:
+                if self.header.signals[idx].fmt in PACKED_FORMATS:
+                    rows[fname] = self._read_212(fname, sampfrom, sampto)
+                else:
+                    rows[fname] = self._rows(fname, sampfrom, sampto)
+            yield out_col, idx, rows[fname][:, col]
+
+    def digital(self, channels=None, sampfrom=0, sampto=None):
+        """
+        Raw ADC values of the selected channels as an int array.
+
+        For a single format-16 channel, or all channels of one format-16
+        file in file order, this is a view into the memmap; only pages
+        covering [sampfrom, sampto) are ever faulted in.
+        """
+        channels, sampfrom, sampto = self._resolve(channels, sampfrom, sampto)
+        sig = self.header.signals[channels[0]]
+        if VIEW_FORMATS.get(sig.fmt, (None, None))[1] == 0:
+            group = self._groups[sig.file_name]
+            if len(channels) == 1:
+                col = group.index(channels[0])
+                return self._rows(sig.file_name, sampfrom, sampto)[:, col:col + 1]
+            if channels == group:
+                return self._rows(sig.file_name, sampfrom, sampto)
+        out = np.empty((sampto - sampfrom, len(channels)), dtype=np.int32)
+        for out_col, idx, raw in self._columns(channels, sampfrom, sampto):
+            shift = VIEW_FORMATS.get(self.header.signals[idx].fmt, (None, 0))[1]
+            out[:, out_col] = raw
+            out[:, out_col] -= shift
+        return out
+
+    def physical(self, channels=None, sampfrom=0, sampto=None, dtype=np.float64):
+        """
+        Physical units of the selected channels, (digital - baseline) / gain.
+
+        Invalid-sample sentinels are returned as NaN, matching wfdb's p_signal.
+        """
+        channels, sampfrom, sampto = self._resolve(channels, sampfrom, sampto)
+        out = np.empty((sampto - sampfrom, len(channels)), dtype=dtype)
+        for out_col, idx, raw in self._columns(channels, sampfrom, sampto):
+            sig = self.header.signals[idx]
+            shift = VIEW_FORMATS.get(sig.fmt, (None, 0))[1]
+            col = out[:, out_col]
+            col[:] = raw
+            col -= shift + sig.baseline
+            col /= sig.gain
+            invalid = raw == (INVALID_SAMPLE_VALUE[sig.fmt] + shift)
+            if invalid.any():
+                col[invalid] = np.nan
+        return out
+
+
+def open_record(base):
+    """Open `<base>.hea` / `.dat` lazily. `base` may include the `.dat` / `.hea` extension."""
+    base = os.path.splitext(base)[0] if base.endswith((".dat", ".hea")) else base
+    return LazyRecord(base)
+
+
+def read_record(base, channels=None, sampfrom=0, sampto=None, physical=True, dtype=np.float64):
+    """Read a channel / sample-range slice of a WFDB record. Returns (data, fs)."""
+    rec = open_record(base)
+    if physical:
+        data = rec.physical(channels, sampfrom, sampto, dtype=dtype)
+    else:
+        data = rec.digital(channels, sampfrom, sampto)
+    return data, rec.fs
+
+
+# === SHARED ENTRY POINT FOR THE PIPELINES ===
+def read_dat_file(filepath, channels=None, sampfrom=0, sampto=None):
+    """
+    Reads PhysioNet .dat + .hea files via the memory-mapped reader,
+    else wfdb, else raw numeric/binary.
+    """
+    base = os.path.splitext(filepath)[0]
+
+    if has_header(base):
+        try:
+            data, fs = read_record(base, channels, sampfrom, sampto)
+            print(f"  -> Loaded {data.shape[0]} samples, {data.shape[1]} channels, fs={fs} Hz")
+            return data, fs
+        except NotImplementedError as e:
+            print(f"  -> mmap reader: {e}, falling back to wfdb")
+        except Exception as e:
+            print(f"⚠️ mmap reader failed for {filepath}: {e}")
+
+        if USE_WFDB:
+            try:
+                import wfdb
+                record = wfdb.rdrecord(base, sampfrom=sampfrom, sampto=sampto, channels=channels)
+                data = record.p_signal
+                fs = record.fs
+                print(f"  -> Loaded {data.shape[0]} samples, {data.shape[1]} channels, fs={fs} Hz")
+                return data, fs
+            except Exception as e:
+                print(f"⚠️ WFDB failed for {filepath}: {e}")
+
+    # Fallback: try ASCII or binary float32
+    try:
+        data = np.loadtxt(filepath)
+    except Exception:
+        data = np.fromfile(filepath, dtype=np.float32)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)  # assume single channel if not rectangular
+    data = data[sampfrom:sampto]
+    if channels is not None:
+        data = data[:, np.atleast_1d(channels)]
+    fs = default_fs
+
+    print(f"  -> Loaded {data.shape[0]} samples (fallback mode), fs={fs} Hz")
+    return data, fs
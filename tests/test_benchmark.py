@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: baseline comparison flags and a reproducible synthetic cohort."""
+
+import os
+
+import pytest
+
+from aging import benchmark
+from aging.synthetic_cohort import make_cohort
+
+
+def run_with(stages, **extra):
+    run = {"cohort": {"n_records": 2}, "fingerprint": {"cpus": 1}, "threads": 1,
+           "stages": {name: {"seconds": s, "peak_rss_mb": rss} for name, (s, rss) in stages.items()}}
+    run.update(extra)
+    return run
+
+
+def test_compare_flags_slower_and_heavier_stages():
+    baseline = run_with({"read": (1.0, 100.0), "stft": (0.01, 100.0), "filter": (1.0, 100.0),
+                         "render": (1.0, None)})
+    run = run_with({"read": (1.2, 100.0),       # 20 % slower: beyond the 15 % tolerance
+                    "stft": (0.02, 100.0),      # twice as slow, but under the 0.05 s noise floor
+                    "filter": (1.1, 130.0),     # within time tolerance, 30 % more memory
+                    "render": (1.0, 500.0),     # no baseline RSS: not comparable
+                    "features": (9.0, 100.0)})  # not in the baseline: skipped
+    rows, caveats = benchmark.compare(run, baseline)
+    flags = {r["stage"]: (r["slower"], r["heavier"]) for r in rows}
+    assert flags == {"read": (True, False), "stft": (False, False), "filter": (False, True),
+                     "render": (False, False)}
+    assert caveats == []
+    assert {r["stage"]: r["time_ratio"] for r in rows}["read"] == pytest.approx(1.2)
+
+    rows, caveats = benchmark.compare(run, baseline, tolerance=0.25, rss_tolerance=0.5)
+    assert not any(r["slower"] or r["heavier"] for r in rows)
+
+    _, caveats = benchmark.compare(run_with({}, threads=4, cohort={"n_records": 3}), baseline)
+    assert caveats == ["cohort", "threads"]
+
+
+def test_cohort_is_reproducible(tmp_path):
+    kw = dict(n_records=3, duration_s=20.0, fs=250.0, n_channels=3)
+    files = make_cohort(str(tmp_path / "a"), seed=7, **kw)
+    assert files == ["0001.dat", "0002.dat", "0003.dat"]
+    make_cohort(str(tmp_path / "b"), seed=7, **kw)
+    make_cohort(str(tmp_path / "c"), seed=8, **kw)
+    names = sorted(os.listdir(tmp_path / "a"))
+    read = lambda d, n: (tmp_path / d / n).read_bytes()
+    assert names == sorted(os.listdir(tmp_path / "b"))
+    assert all(read("a", n) == read("b", n) for n in names)
+    assert read("a", "0001.dat") != read("c", "0001.dat")
+
+    # Same spec again: reused as is; --force (or another spec) rewrites
+    stamp = os.stat(tmp_path / "a" / "0001.dat").st_mtime_ns
+    make_cohort(str(tmp_path / "a"), seed=7, **kw)
+    assert os.stat(tmp_path / "a" / "0001.dat").st_mtime_ns == stamp
+    make_cohort(str(tmp_path / "a"), seed=7, force=True, **kw)
+    assert os.stat(tmp_path / "a" / "0001.dat").st_mtime_ns != stamp
+    assert read("a", "0001.dat") == read("b", "0001.dat")
+
+
+def test_run_benchmark_small_cohort(tmp_path):
+    run = benchmark.run_benchmark(("read", "features"), n_records=2, duration_s=60.0, fs=250.0,
+                                  repeat=1, folder=str(tmp_path / "cohort"))
+    assert set(run["stages"]) == {"read", "features"}
+    for res in run["stages"].values():
+        assert res["seconds"] > 0 and res["records_per_s"] > 0
+    assert run["cohort"] == {"n_records": 2, "duration_s": 60.0, "fs": 250.0, "n_channels": 3, "seed": 0}
+    rows, caveats = benchmark.compare(run, run)
+    assert caveats == [] and not any(r["slower"] or r["heavier"] for r in rows)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""ECG band shares: disjoint bands, mains hum ignored, EMG bursts flagged."""
+
+import numpy as np
+
+from aging import ecg_anomaly
+from aging.spectrogram_engine import iter_spectrogram
+
+fs = 500.0
+
+
+def ecg_like(seconds, rng):
+    t = np.arange(int(seconds * fs)) / fs
+    beats = np.exp(-((t % 0.8) - 0.4) ** 2 / (2 * 0.01 ** 2))      # QRS-like spikes
+    return t, beats + 0.2 * np.sin(2 * np.pi * 0.3 * t) + 0.01 * rng.standard_normal(len(t))
+
+
+def segments(x):
+    nperseg, hop = int(ecg_anomaly.window_s * fs), int(ecg_anomaly.hop_s * fs)
+    f = np.fft.rfftfreq(nperseg, 1 / fs)
+    scorer = ecg_anomaly.AnomalyScorer(hop=hop / fs)
+    out = []
+    for t, Sxx in iter_spectrogram(iter([x]), fs, nperseg, nperseg - hop, window="hann"):
+        out.extend(scorer.push(t, Sxx, f))
+    return out + list(scorer.close())
+
+
+def test_bands_are_disjoint_and_skip_mains():
+    f = np.fft.rfftfreq(2000, 1 / fs)
+    M = ecg_anomaly.band_matrix(f)
+    assert M.sum(axis=1).max() == 1                            # no bin in two bands
+    for k in (1, 2, 3, 4):
+        assert not M[np.abs(f - 50.0 * k) <= ecg_anomaly.mains_notch_hz].any()
+    shares = 10 ** ecg_anomaly.band_log_ratios(np.random.default_rng(0).random((len(f), 5)), M)
+    np.testing.assert_allclose(shares.sum(axis=1), 1.0, rtol=1e-9)
+
+
+def test_mains_hum_is_not_emg():
+    rng = np.random.default_rng(1)
+    t, x = ecg_like(300, rng)
+    hum = np.clip((t - 150) / 10, 0, 1) * 0.5 * (np.sin(2 * np.pi * 50 * t) + 0.3 * np.sin(2 * np.pi * 100 * t))
+    assert segments(x + hum) == []
+
+    burst = (t > 150) & (t < 170)
+    emg = burst * 0.3 * np.random.default_rng(2).standard_normal(len(t))
+    found = segments(x + emg)
+    assert [s.band for s in found] == ["emg+"]
+    assert 145 <= found[0].start_s and found[0].end_s <= 175
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Cohort features and HRV trajectories from one per-record job, resumable on both outputs."""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aging import feature_exytraction as fe
+from aging.synthetic_cohort import make_cohort
+
+
+@pytest.fixture(scope="module")
+def cohort(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("cohort"))
+    files = make_cohort(folder, n_records=2, duration_s=300.0, fs=500.0, n_channels=2)
+    return folder, [os.path.splitext(f)[0] for f in files]
+
+
+def test_trajectory_comes_from_the_feature_job(cohort, monkeypatch):
+    folder, ids = cohort
+    reads = []
+    real_load = fe.load_record
+    monkeypatch.setattr(fe, "load_record", lambda *a: reads.append(a) or real_load(*a))
+    features, windows = fe.extract_record_features(ids[0], folder, trajectory=True)
+    assert len(reads) == 1                                     # one read, filter and QRS pass
+    assert features["HRV_windows"] == len(windows) > 0
+    standalone = fe.record_hrv_trajectory(ids[0], folder)
+    pd.testing.assert_frame_equal(windows, standalone, rtol=1e-6)
+
+
+def test_run_cohort_resumes_both_outputs(cohort, tmp_path):
+    folder, ids = cohort
+    features_dir, hrv_dir = str(tmp_path / "features"), str(tmp_path / "hrv")
+    fe.write_part([{"ID": ids[0], "RR_mean_ms": 1.0}], features_dir)   # feature-only run
+
+    fe.run_cohort(ids, folder, features_dir, n_workers=1, hrv_dir=hrv_dir)
+    features, trajectories = fe.load_features(features_dir), fe.load_trajectories(hrv_dir)
+    assert sorted(features["ID"]) == ids and features["HRV_windows"].notna().all()
+    assert sorted(trajectories["ID"].unique()) == ids
+    assert trajectories.groupby("ID").size().to_dict() == dict(zip(features["ID"], features["HRV_windows"]))
+    assert fe.completed_ids(features_dir, trajectories=True) == set(ids)
+
+    parts = glob.glob(os.path.join(features_dir, "part-*")) + glob.glob(os.path.join(hrv_dir, "part-*"))
+    fe.run_cohort(ids, folder, features_dir, n_workers=1, hrv_dir=hrv_dir)       # nothing left to do
+    assert sorted(parts) == sorted(glob.glob(os.path.join(features_dir, "part-*"))
+                                   + glob.glob(os.path.join(hrv_dir, "part-*")))
+    assert np.isfinite(trajectories["RMSSD_ms"]).all()
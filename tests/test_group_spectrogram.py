@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Group spectra: records count only when they contributed a spectrum."""
+
+import os
+
+from aging import group_spectrogram as gs
+from aging.synthetic_cohort import make_cohort
+
+
+def test_records_counted_only_when_accumulated(tmp_path):
+    folder = str(tmp_path / "cohort")
+    files = make_cohort(folder, n_records=2, duration_s=60, fs=250.0, n_channels=2)
+    paths = [os.path.join(folder, f) for f in files]
+
+    result = gs.GroupSpectra(gs.uniform_grid(30.0, 60.0))
+    assert result.add_record(paths[0], 3, channel="ECG")
+    assert not result.add_record(paths[1], 3, channel="RESP")      # no matching channel
+    assert result.records == {3: 1}
+    assert set(result.stats) == {(3, "ECG")}
+
+    late = gs.GroupSpectra(gs.phase_grid([("late", 100.0, 200.0)]))  # past the end of the record
+    assert not late.add_record(paths[0], 3)
+    assert late.records == {}
+
+    merged = gs.aggregate([(f, 3) for f in files] + [(files[0], 5)], gs.uniform_grid(30.0, 60.0),
+                          folder=folder, channel="BP")
+    assert merged.records == {3: 2, 5: 1}
+    assert int(merged.stats[(3, "BP")].count.max()) == 2
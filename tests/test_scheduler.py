@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Record cost estimates used for longest-first ordering, and worker thread caps."""
+
+import os
+
+from aging import scheduler
+
+
+def write_record(folder, name, header, dat_bytes):
+    (folder / f"{name}.hea").write_text(header)
+    (folder / f"{name}.dat").write_bytes(b"\0" * dat_bytes)
+    return str(folder / f"{name}.dat")
+
+
+def test_cost_from_header(tmp_path):
+    path = write_record(tmp_path, "a", "a 2 1000 5000\na.dat 16 1 16 0 0 0 0 ECG\na.dat 16 1 16 0 0 0 0 BP\n", 10)
+    assert scheduler.record_cost(path) == 10_000
+
+
+def test_cost_falls_back_to_file_size(tmp_path):
+    unknown = write_record(tmp_path, "b", "b 1 1000\nb.dat 16 1 16 0 0 0 0 ECG\n", 300)
+    multi_segment = write_record(tmp_path, "c", "c/2 1 1000 9000\n", 200)
+    multi_frequency = write_record(tmp_path, "d", "d 1 1000 9000\nd.dat 16x4 1 16 0 0 0 0 ECG\n", 100)
+    no_header = str(tmp_path / "e.dat")
+    (tmp_path / "e.dat").write_bytes(b"\0" * 50)
+    assert [scheduler.record_cost(p) for p in (unknown, multi_segment, multi_frequency, no_header)] \
+        == [300, 200, 100, 50]
+    assert scheduler.record_cost(str(tmp_path / "missing.dat")) == 0
+    assert scheduler.longest_first([no_header, unknown, multi_segment], scheduler.record_cost) \
+        == [unknown, multi_segment, no_header]
+
+
+def test_worker_init_caps_loaded_fft_workers(monkeypatch):
+    from aging import spectrogram_engine
+    for name, value in scheduler.thread_env(1).items():
+        monkeypatch.setenv(name, value)                      # restored after the test
+    monkeypatch.setattr(spectrogram_engine, "default_workers", -1)
+    scheduler._init_worker(3)
+    assert spectrogram_engine.default_workers == 3
+    assert os.environ["AA_FFT_WORKERS"] == "3"
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Spectrogram cache: corrupt entries are misses, eviction keeps a running total."""
+
+import os
+
+import numpy as np
+
+from aging import spectrogram_cache
+from aging.spectrogram_cache import SpectrogramCache
+
+
+def spectra(seed, n=2000):
+    rng = np.random.default_rng(seed)
+    return [(np.arange(10.0), np.arange(n / 10), rng.random((10, n // 10)))]
+
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    cache = SpectrogramCache(str(tmp_path))
+    cache.put("ab" * 32, spectra(0))
+    path = cache._entry_path("ab" * 32)
+    with open(path, "r+b") as fh:
+        fh.truncate(os.path.getsize(path) // 2)
+    assert cache.get("ab" * 32) is None
+    assert cache.stats()["misses"] == 1
+
+    cache.put("ab" * 32, spectra(0))                        # recomputed entry replaces it
+    np.testing.assert_array_equal(cache.get("ab" * 32)[0][2], spectra(0)[0][2])
+
+
+def test_eviction_rescans_only_when_over_budget(tmp_path, monkeypatch):
+    cache = SpectrogramCache(str(tmp_path), max_bytes=10 ** 9, compress=False)
+    cache.put("00" * 32, spectra(0))
+    entry = os.path.getsize(cache._entry_path("00" * 32))
+    cache.max_bytes = int(entry * 10.5)
+
+    os.utime(cache._entry_path("00" * 32), (0, 0))
+    scans = []
+    real_entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or real_entries())
+    keys = [f"{i:02d}" * 32 for i in range(1, 30)]
+    for i, key in enumerate(keys):
+        cache.put(key, spectra(i + 1))
+    # 29 more entries into a 10.5-entry budget that is freed down to 90%:
+    # a rescan every second put at most, not one per put
+    assert 0 < len(scans) <= 15
+    assert cache.size_bytes() <= cache.max_bytes
+    assert cache.evictions == 30 - len(list(real_entries()))
+    assert cache.get("00" * 32) is None                      # least recently used went first
+    assert cache.get(keys[-1]) is not None
+
+
+def test_pipeline_reuses_one_cache_per_process(tmp_path, monkeypatch):
+    from aging import spectrogram_plot
+    from aging.synthetic_cohort import make_cohort
+    folder = str(tmp_path / "cohort")
+    files = make_cohort(folder, n_records=3, duration_s=20, fs=250.0, n_channels=1)
+    monkeypatch.setattr(spectrogram_plot, "input_folder", folder)
+    monkeypatch.setattr(spectrogram_plot, "output_folder", str(tmp_path / "out"))
+    monkeypatch.setattr(spectrogram_plot, "cache_folder", str(tmp_path / "cache"))
+    monkeypatch.setattr(spectrogram_plot, "export_dtype", None)
+    monkeypatch.setattr(spectrogram_plot, "save_spectrogram_figure", lambda spectra, file: None)
+    scans = []
+    real_size = SpectrogramCache.size_bytes
+    monkeypatch.setattr(SpectrogramCache, "size_bytes", lambda self: scans.append(1) or real_size(self))
+
+    cold = [spectrogram_plot.process_record(f) for f in files]
+    warm = [spectrogram_plot.process_record(f) for f in files]
+    assert spectrogram_plot._get_cache() is spectrogram_plot._get_cache()
+    assert len(scans) == 1                                   # first put only, then the running total
+    assert [(s["hits"], s["misses"]) for s in cold] == [(0, 1)] * 3
+    assert [(s["hits"], s["misses"]) for s in warm] == [(1, 0)] * 3
+    total = spectrogram_cache.merge_stats(cold + warm)
+    assert (total["hits"], total["misses"], total["hit_rate"]) == (3, 3, 0.5)
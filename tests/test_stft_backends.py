@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Every STFT backend against scipy.signal.spectrogram, and the backend selection."""
+
+import os
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from aging import spectrogram_engine, stft_backends
+
+FS = 1000.0
+WINDOWS = [("tukey", 0.25), "hann"]
+
+
+def reference(x, nperseg, noverlap, window):
+    return signal.spectrogram(x, FS, window=window, nperseg=nperseg, noverlap=noverlap)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("nperseg", [255, 256])          # odd / even (Nyquist bin)
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("backend", stft_backends.available_backends())
+def test_backend_matches_scipy(backend, window, nperseg, dtype):
+    rng = np.random.default_rng(0)
+    x = (rng.standard_normal((2, 20 * nperseg + 17)) + 0.5).astype(dtype)
+    f, t, Sxx = spectrogram_engine.spectrogram(x, FS, nperseg, nperseg // 2, window, backend=backend)
+    f_ref, t_ref, ref = reference(x, nperseg, nperseg // 2, window)
+
+    assert Sxx.dtype == ref.dtype
+    assert Sxx.shape == ref.shape
+    np.testing.assert_allclose(f, f_ref)
+    np.testing.assert_allclose(t, t_ref)
+    err = np.max(np.abs(Sxx - ref)) / np.max(np.abs(ref))
+    assert err <= stft_backends.check_rtol[np.dtype(dtype)]
+
+
+@pytest.mark.parametrize("backend", stft_backends.available_backends())
+def test_streamed_and_batched_match_scipy(backend):
+    rng = np.random.default_rng(1)
+    signals = [rng.standard_normal(n) for n in (9000, 9000, 7000)]
+    f, times, spectra = spectrogram_engine.batch_spectrogram(signals, FS, 256, 128, backend=backend)
+    for x, t, Sxx in zip(signals, times, spectra):
+        _, t_ref, ref = reference(x, 256, 128, ("tukey", 0.25))
+        np.testing.assert_allclose(t, t_ref)
+        np.testing.assert_allclose(Sxx, ref, rtol=1e-9, atol=1e-12 * ref.max())
+
+    blocks = np.array_split(signals[0], 7)
+    t, Sxx = spectrogram_engine.collect(spectrogram_engine.iter_spectrogram(blocks, FS, 256, 128,
+                                                                            backend=backend))
+    np.testing.assert_allclose(Sxx, spectra[0], rtol=1e-9, atol=1e-12 * spectra[0].max())
+
+
+@pytest.mark.skipif(os.environ.get("AA_STFT_BACKEND") == "auto", reason="auto selected by the environment")
+def test_default_backend_never_probes(tmp_path, monkeypatch):
+    cache = tmp_path / "stft_probe.json"
+    monkeypatch.setattr(stft_backends, "probe_cache_path", str(cache))
+    monkeypatch.setattr(stft_backends, "probe", lambda *a, **k: pytest.fail("default backend probed"))
+    spectrogram_engine.spectrogram(np.random.default_rng(2).standard_normal(4096), FS, 256)
+    assert not cache.exists()
+
+
+def test_auto_probes_in_memory_and_only_the_command_saves(tmp_path, monkeypatch):
+    cache = tmp_path / "stft_probe.json"
+    monkeypatch.setattr(stft_backends, "probe_cache_path", str(cache))
+    monkeypatch.setattr(stft_backends, "_choices", {})
+    x = np.random.default_rng(3).standard_normal(8192)
+    f, t, Sxx = spectrogram_engine.spectrogram(x, FS, 256, backend="auto")
+    assert not cache.exists()
+    np.testing.assert_allclose(Sxx, reference(x, 256, None, ("tukey", 0.25))[2], rtol=1e-9)
+
+    stft_backends.main(["--nperseg", "256", "--batch", "1"])
+    assert cache.exists()
+
+
+def test_probe_key_depends_on_window():
+    keys = {stft_backends._probe_key(256, 3, 256, np.float64, None, w)
+            for w in WINDOWS + [np.hanning(256)]}
+    assert len(keys) == 3
+
+
+def test_saved_choice_is_found_by_batched_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(stft_backends, "probe_cache_path", str(tmp_path / "stft_probe.json"))
+    monkeypatch.setattr(stft_backends, "_choices", {})
+    probed = []
+
+    def fake_probe(nperseg, n_signals=1, n_frames=256, dtype=np.float64, workers=None, **kw):
+        probed.append(workers)
+        return {name: (0.001 if name == "numpy" else 1.0) for name in stft_backends.available_backends()}
+    monkeypatch.setattr(stft_backends, "probe", fake_probe)
+    stft_backends.main(["--nperseg", "256", "--batch", "3"])
+    assert probed == [spectrogram_engine.default_workers]        # timed as the pipelines run
+
+    # A new process: no in-process choice, and probing again would be a cache miss
+    monkeypatch.setattr(stft_backends, "_choices", {})
+    monkeypatch.setattr(stft_backends, "probe", lambda *a, **k: pytest.fail("saved choice not found"))
+    x = np.random.default_rng(4).standard_normal((3, 60_000))
+    f, t, spectra = spectrogram_engine.batch_spectrogram(x, FS, 256, backend="auto")
+    assert set(stft_backends._choices.values()) == {"numpy"}
+    np.testing.assert_allclose(spectra[0], reference(x[0], 256, 32, ("tukey", 0.25))[2], rtol=1e-9)
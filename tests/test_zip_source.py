@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Reads from inside zip archives: deflated members and archives that appear later."""
+
+import zipfile
+
+import numpy as np
+
+from aging import zip_source
+
+
+def make_zip(path, payload, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression) as zf:
+        zf.writestr("ds/0001.dat", payload)
+
+
+def test_deflated_block_reads_continue_forward(tmp_path, monkeypatch):
+    payload = np.random.default_rng(0).integers(0, 255, 1_000_000, dtype=np.uint8).tobytes()
+    make_zip(tmp_path / "a.zip", payload)
+    archive = zip_source.ZipArchive(str(tmp_path / "a.zip"))
+    opens = []
+    real_open = archive._zf.open
+    monkeypatch.setattr(archive._zf, "open", lambda m: opens.append(m) or real_open(m))
+
+    blocks = [archive.read_bytes("ds/0001.dat", lo, lo + 65536) for lo in range(0, len(payload), 65536)]
+    assert b"".join(blocks) == payload
+    assert len(opens) == 1                                  # one stream, read front to back
+
+    # Two interleaved readers (e.g. two channels) get a stream each
+    for lo in range(0, 300_000, 100_000):
+        assert archive.read_bytes("ds/0001.dat", lo, lo + 10) == payload[lo:lo + 10]
+        assert archive.read_bytes("ds/0001.dat", lo + 5, lo + 15) == payload[lo + 5:lo + 15]
+    assert len(opens) <= 1 + 2
+    # Backwards still works (new stream)
+    assert archive.read_bytes("ds/0001.dat", 10, 20) == payload[10:20]
+    archive.close()
+
+
+def test_archive_found_once_it_exists(tmp_path):
+    path = str(tmp_path / "late.zip")
+    member = path + "/ds/0001.dat"
+    assert zip_source.resolve(member) is None              # not downloaded yet
+    make_zip(path, b"abc", zipfile.ZIP_STORED)
+    archive, name = zip_source.resolve(member)
+    assert archive.read_bytes(name) == b"abc"
+
+    make_zip(path, b"abcdef", zipfile.ZIP_STORED)          # replaced archive is reopened
+    archive, name = zip_source.resolve(member)
+    assert archive.read_bytes(name) == b"abcdef"